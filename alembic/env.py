@@ -7,7 +7,8 @@ from alembic import context
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 from sqlmodel import SQLModel  # use o caminho correto
-from projeto_2.config.database import DATABASE_URL
+from config.settings import Settings
+import models.models  # noqa: F401 - registra as tabelas no metadata
 
 config = context.config
 if config.config_file_name is not None:
@@ -16,7 +17,7 @@ if config.config_file_name is not None:
 target_metadata = SQLModel.metadata
 
 def get_url():
-    return DATABASE_URL
+    return Settings.from_env().database_url
 
 def run_migrations_offline():
     url = get_url()
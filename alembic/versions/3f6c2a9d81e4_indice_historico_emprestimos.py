@@ -0,0 +1,36 @@
+"""Índice composto para o histórico de empréstimos do usuário
+
+Revision ID: 3f6c2a9d81e4
+Revises: 5d8f2b6e9a07
+Create Date: 2026-10-19 09:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = '3f6c2a9d81e4'
+down_revision: Union[str, None] = '5d8f2b6e9a07'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index(
+        'ix_emprestimo_usuario_data_status',
+        'emprestimo',
+        ['usuario_id', 'data_emprestimo', 'status', 'id'],
+        unique=False,
+        postgresql_include=[
+            'livro_id',
+            'data_devolucao_prevista',
+            'data_devolucao_real',
+        ],
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_emprestimo_usuario_data_status', table_name='emprestimo')
@@ -0,0 +1,53 @@
+"""Fila de tarefas em segundo plano
+
+Revision ID: 4b9e2c7d1f85
+Revises: e7d3a1f4b692
+Create Date: 2026-10-19 14:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = '4b9e2c7d1f85'
+down_revision: Union[str, None] = 'e7d3a1f4b692'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'tarefa',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('tipo', sa.String(length=100), nullable=False),
+        sa.Column('dados', sa.JSON(), nullable=True),
+        sa.Column(
+            'status',
+            sa.Enum('PENDENTE', 'EXECUTANDO', 'CONCLUIDA', 'FALHOU', name='statustarefa'),
+            nullable=False,
+        ),
+        sa.Column('executar_em', sa.DateTime(), nullable=False),
+        sa.Column('tentativas', sa.Integer(), nullable=False),
+        sa.Column('max_tentativas', sa.Integer(), nullable=False),
+        sa.Column('chave', sa.String(length=200), nullable=True),
+        sa.Column('erro', sa.String(), nullable=True),
+        sa.Column('data_criacao', sa.DateTime(), nullable=False),
+        sa.Column('data_conclusao', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index(
+        'ix_tarefa_status_executar_em', 'tarefa', ['status', 'executar_em'], unique=False
+    )
+    op.create_index(op.f('ix_tarefa_chave'), 'tarefa', ['chave'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_tarefa_chave'), table_name='tarefa')
+    op.drop_index('ix_tarefa_status_executar_em', table_name='tarefa')
+    op.drop_table('tarefa')
+    sa.Enum(name='statustarefa').drop(op.get_bind(), checkfirst=True)
@@ -0,0 +1,33 @@
+"""Mescla o esquema inicial com b1b996635e8b
+
+Revision ID: 5d8f2b6e9a07
+Revises: b1b996635e8b, a7e2c4f90d13
+Create Date: 2026-10-19 18:30:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import context
+
+# revision identifiers, used by Alembic.
+revision: str = '5d8f2b6e9a07'
+# Nesta ordem o Alembic aplica a7e2c4f90d13 antes de b1b996635e8b
+down_revision: Union[str, Sequence[str], None] = ('b1b996635e8b', 'a7e2c4f90d13')
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _esquema_inicial():
+    return context.script.get_revision('a7e2c4f90d13').module
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Recria as tabelas base que b1b996635e8b removeu (banco vazio)
+    _esquema_inicial().upgrade()
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # Volta ao estado deixado por b1b996635e8b, sem as tabelas base
+    _esquema_inicial().downgrade()
@@ -0,0 +1,172 @@
+"""Particionamento de emprestimo por data e tabela de arquivo
+
+Revision ID: 6c1f8e2a7b49
+Revises: 9d05b3e8c6a1
+Create Date: 2026-10-19 16:00:00.000000
+
+"""
+from datetime import date
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = '6c1f8e2a7b49'
+down_revision: Union[str, None] = '9d05b3e8c6a1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Partições mensais criadas além do mês corrente (as seguintes são criadas
+# por "python -m services.particao_service criar")
+MESES_ADIANTE = 3
+
+COLUNAS = (
+    'id, data_emprestimo, data_devolucao_prevista, data_devolucao_real, status, '
+    'observacoes, usuario_id, livro_id'
+)
+
+
+def _criar_indice_historico():
+    op.create_index(
+        'ix_emprestimo_usuario_data_status',
+        'emprestimo',
+        ['usuario_id', 'data_emprestimo', 'status', 'id'],
+        unique=False,
+        postgresql_include=[
+            'livro_id',
+            'data_devolucao_prevista',
+            'data_devolucao_real',
+        ],
+    )
+
+
+def _restricoes(chave_primaria: str):
+    op.execute(
+        'ALTER TABLE emprestimo ADD CONSTRAINT emprestimo_pkey '
+        f'PRIMARY KEY ({chave_primaria})'
+    )
+    op.execute(
+        'ALTER TABLE emprestimo ADD CONSTRAINT emprestimo_usuario_id_fkey '
+        'FOREIGN KEY (usuario_id) REFERENCES usuario (id)'
+    )
+    op.execute(
+        'ALTER TABLE emprestimo ADD CONSTRAINT emprestimo_livro_id_fkey '
+        'FOREIGN KEY (livro_id) REFERENCES livro (id)'
+    )
+
+
+def _particionar():
+    """Recria emprestimo como tabela particionada por data_emprestimo"""
+    bind = op.get_bind()
+    op.execute('ALTER TABLE emprestimo RENAME TO emprestimo_antigo')
+    op.execute('ALTER SEQUENCE emprestimo_id_seq OWNED BY NONE')
+    # A chave primária de uma tabela particionada inclui a coluna da partição
+    op.execute(
+        'CREATE TABLE emprestimo (LIKE emprestimo_antigo INCLUDING DEFAULTS) '
+        'PARTITION BY RANGE (data_emprestimo)'
+    )
+
+    # Anos anteriores: uma partição por ano; do ano corrente em diante, por mês
+    hoje = date.today()
+    primeiro_ano = bind.execute(
+        sa.text('SELECT EXTRACT(YEAR FROM MIN(data_emprestimo)) FROM emprestimo_antigo')
+    ).scalar()
+    for ano in range(int(primeiro_ano or hoje.year), hoje.year):
+        op.execute(
+            f'CREATE TABLE emprestimo_{ano} PARTITION OF emprestimo '
+            f"FOR VALUES FROM ('{ano}-01-01') TO ('{ano + 1}-01-01')"
+        )
+    for mes in range(hoje.month + MESES_ADIANTE):
+        inicio = date(hoje.year + mes // 12, mes % 12 + 1, 1)
+        fim = date(hoje.year + (mes + 1) // 12, (mes + 1) % 12 + 1, 1)
+        op.execute(
+            f'CREATE TABLE emprestimo_{inicio:%Y_%m} PARTITION OF emprestimo '
+            f"FOR VALUES FROM ('{inicio}') TO ('{fim}')"
+        )
+    # Datas fora das faixas (ex.: meses ainda sem partição) não falham; o
+    # "particao_service criar" move essas linhas quando cria a partição do mês
+    op.execute('CREATE TABLE emprestimo_padrao PARTITION OF emprestimo DEFAULT')
+
+    op.execute(
+        f'INSERT INTO emprestimo ({COLUNAS}) SELECT {COLUNAS} FROM emprestimo_antigo'
+    )
+    op.execute('DROP TABLE emprestimo_antigo')
+    op.execute('ALTER SEQUENCE emprestimo_id_seq OWNED BY emprestimo.id')
+    _restricoes('id, data_emprestimo')
+    _criar_indice_historico()
+
+
+def _desparticionar():
+    op.execute('ALTER TABLE emprestimo RENAME TO emprestimo_particionado')
+    op.execute('ALTER SEQUENCE emprestimo_id_seq OWNED BY NONE')
+    op.execute(
+        'CREATE TABLE emprestimo (LIKE emprestimo_particionado INCLUDING DEFAULTS)'
+    )
+    op.execute(
+        f'INSERT INTO emprestimo ({COLUNAS}) '
+        f'SELECT {COLUNAS} FROM emprestimo_particionado'
+    )
+    # Remove também as partições
+    op.execute('DROP TABLE emprestimo_particionado')
+    op.execute('ALTER SEQUENCE emprestimo_id_seq OWNED BY emprestimo.id')
+    _restricoes('id')
+    _criar_indice_historico()
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    status = sa.Enum('ATIVO', 'DEVOLVIDO', 'ATRASADO', name='statusemprestimo')
+    if op.get_bind().dialect.name == 'postgresql':
+        status = postgresql.ENUM(
+            'ATIVO', 'DEVOLVIDO', 'ATRASADO', name='statusemprestimo', create_type=False
+        )
+    op.create_table(
+        'emprestimo_arquivo',
+        sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column('data_emprestimo', sa.DateTime(), nullable=False),
+        sa.Column('data_devolucao_prevista', sa.Date(), nullable=False),
+        sa.Column('data_devolucao_real', sa.Date(), nullable=True),
+        sa.Column('status', status, nullable=False),
+        sa.Column('observacoes', sa.String(), nullable=True),
+        sa.Column('usuario_id', sa.Integer(), nullable=False),
+        sa.Column('livro_id', sa.Integer(), nullable=False),
+        sa.Column('data_arquivamento', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['livro_id'], ['livro.id']),
+        sa.ForeignKeyConstraint(['usuario_id'], ['usuario.id']),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index(
+        op.f('ix_emprestimo_arquivo_usuario_id'),
+        'emprestimo_arquivo',
+        ['usuario_id'],
+        unique=False,
+    )
+    op.create_index(
+        op.f('ix_emprestimo_arquivo_livro_id'),
+        'emprestimo_arquivo',
+        ['livro_id'],
+        unique=False,
+    )
+
+    # Particionamento nativo só no PostgreSQL
+    if op.get_bind().dialect.name == 'postgresql':
+        _particionar()
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if op.get_bind().dialect.name == 'postgresql':
+        _desparticionar()
+
+    # Os empréstimos arquivados voltam para a tabela principal
+    op.execute(
+        f'INSERT INTO emprestimo ({COLUNAS}) SELECT {COLUNAS} FROM emprestimo_arquivo'
+    )
+    op.drop_index(op.f('ix_emprestimo_arquivo_livro_id'), table_name='emprestimo_arquivo')
+    op.drop_index(
+        op.f('ix_emprestimo_arquivo_usuario_id'), table_name='emprestimo_arquivo'
+    )
+    op.drop_table('emprestimo_arquivo')
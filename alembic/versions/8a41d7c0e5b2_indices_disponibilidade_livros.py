@@ -0,0 +1,55 @@
+"""Índice parcial de livros disponíveis e índices inversos das associações
+
+Revision ID: 8a41d7c0e5b2
+Revises: 3f6c2a9d81e4
+Create Date: 2026-10-19 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = '8a41d7c0e5b2'
+down_revision: Union[str, None] = '3f6c2a9d81e4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index(
+        'ix_livro_disponivel',
+        'livro',
+        ['id'],
+        unique=False,
+        postgresql_where=sa.text('quantidade_disponivel > 0'),
+        sqlite_where=sa.text('quantidade_disponivel > 0'),
+        postgresql_include=[
+            'titulo',
+            'ano_publicacao',
+            'editora',
+            'quantidade_disponivel',
+        ],
+    )
+    op.create_index(
+        'ix_livro_categoria_categoria_livro',
+        'livro_categoria',
+        ['categoria_id', 'livro_id'],
+        unique=False,
+    )
+    op.create_index(
+        'ix_livro_autor_autor_livro',
+        'livro_autor',
+        ['autor_id', 'livro_id'],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_livro_autor_autor_livro', table_name='livro_autor')
+    op.drop_index('ix_livro_categoria_categoria_livro', table_name='livro_categoria')
+    op.drop_index('ix_livro_disponivel', table_name='livro')
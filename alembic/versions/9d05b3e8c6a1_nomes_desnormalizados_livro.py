@@ -0,0 +1,82 @@
+"""Nomes de autores e categorias desnormalizados em livro
+
+Revision ID: 9d05b3e8c6a1
+Revises: 4b9e2c7d1f85
+Create Date: 2026-10-19 15:00:00.000000
+
+"""
+from collections import defaultdict
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = '9d05b3e8c6a1'
+down_revision: Union[str, None] = '4b9e2c7d1f85'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column(
+        'livro',
+        sa.Column('autores_nomes', sa.JSON(), server_default='[]', nullable=False),
+    )
+    op.add_column(
+        'livro',
+        sa.Column('categorias_nomes', sa.JSON(), server_default='[]', nullable=False),
+    )
+
+    # Preenche os nomes dos livros existentes
+    bind = op.get_bind()
+    livro = sa.table(
+        'livro',
+        sa.column('id', sa.Integer),
+        sa.column('autores_nomes', sa.JSON),
+        sa.column('categorias_nomes', sa.JSON),
+    )
+    autores = defaultdict(list)
+    for livro_id, nome, sobrenome in bind.execute(
+        sa.text(
+            'SELECT la.livro_id, a.nome, a.sobrenome FROM livro_autor la '
+            'JOIN autor a ON a.id = la.autor_id ORDER BY la.livro_id, a.id'
+        )
+    ):
+        autores[livro_id].append(f'{nome} {sobrenome}')
+
+    categorias = defaultdict(list)
+    for livro_id, nome in bind.execute(
+        sa.text(
+            'SELECT lc.livro_id, c.nome FROM livro_categoria lc '
+            'JOIN categoria c ON c.id = lc.categoria_id ORDER BY lc.livro_id, c.id'
+        )
+    ):
+        categorias[livro_id].append(nome)
+
+    livro_ids = set(autores) | set(categorias)
+    if livro_ids:
+        bind.execute(
+            livro.update()
+            .where(livro.c.id == sa.bindparam('livro_id'))
+            .values(
+                autores_nomes=sa.bindparam('autores'),
+                categorias_nomes=sa.bindparam('categorias'),
+            ),
+            [
+                {
+                    'livro_id': livro_id,
+                    'autores': autores[livro_id],
+                    'categorias': categorias[livro_id],
+                }
+                for livro_id in livro_ids
+            ],
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('livro', 'categorias_nomes')
+    op.drop_column('livro', 'autores_nomes')
@@ -0,0 +1,135 @@
+"""Esquema inicial das tabelas
+
+Raiz própria, ao lado de b1b996635e8b (que só remove as tabelas base): num
+banco vazio roda antes dela, criando as tabelas que ela remove, e a mesclagem
+5d8f2b6e9a07 as cria de novo. Bancos que já passaram por b1b996635e8b recebem
+as tabelas aqui.
+
+Revision ID: a7e2c4f90d13
+Revises:
+Create Date: 2026-10-19 18:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = 'a7e2c4f90d13'
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _tabelas():
+    """Tabelas base, na ordem das chaves estrangeiras"""
+    return {
+        'autor': (
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('nome', sa.String(length=100), nullable=False),
+            sa.Column('sobrenome', sa.String(length=100), nullable=False),
+            sa.Column('data_nascimento', sa.Date(), nullable=False),
+            sa.Column('nacionalidade', sa.String(length=50), nullable=False),
+            sa.Column('biografia', sa.String(), nullable=True),
+            sa.Column('data_criacao', sa.DateTime(), nullable=False),
+            sa.Column('cpf', sa.String(), nullable=True),
+            sa.PrimaryKeyConstraint('id'),
+        ),
+        'categoria': (
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('nome', sa.String(length=50), nullable=False),
+            sa.Column('descricao', sa.String(), nullable=True),
+            sa.Column('ativa', sa.Boolean(), nullable=False),
+            sa.Column('data_criacao', sa.DateTime(), nullable=False),
+            sa.PrimaryKeyConstraint('id'),
+            sa.UniqueConstraint('nome'),
+        ),
+        'usuario': (
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('nome', sa.String(length=100), nullable=False),
+            sa.Column('email', sa.String(), nullable=False),
+            sa.Column('telefone', sa.String(length=20), nullable=True),
+            sa.Column('endereco', sa.String(), nullable=True),
+            sa.Column('data_cadastro', sa.DateTime(), nullable=False),
+            sa.Column('ativo', sa.Boolean(), nullable=False),
+            sa.PrimaryKeyConstraint('id'),
+            sa.UniqueConstraint('email'),
+        ),
+        'livro': (
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('titulo', sa.String(length=200), nullable=False),
+            sa.Column('isbn', sa.String(length=20), nullable=False),
+            sa.Column('ano_publicacao', sa.Integer(), nullable=False),
+            sa.Column('editora', sa.String(length=100), nullable=False),
+            sa.Column('numero_paginas', sa.Integer(), nullable=False),
+            sa.Column('quantidade_total', sa.Integer(), nullable=False),
+            sa.Column('quantidade_disponivel', sa.Integer(), nullable=False),
+            sa.Column('data_adicao', sa.DateTime(), nullable=False),
+            sa.PrimaryKeyConstraint('id'),
+            sa.UniqueConstraint('isbn'),
+        ),
+        'livro_autor': (
+            sa.Column('livro_id', sa.Integer(), nullable=False),
+            sa.Column('autor_id', sa.Integer(), nullable=False),
+            sa.ForeignKeyConstraint(['autor_id'], ['autor.id']),
+            sa.ForeignKeyConstraint(['livro_id'], ['livro.id']),
+            sa.PrimaryKeyConstraint('livro_id', 'autor_id'),
+        ),
+        'livro_categoria': (
+            sa.Column('livro_id', sa.Integer(), nullable=False),
+            sa.Column('categoria_id', sa.Integer(), nullable=False),
+            sa.ForeignKeyConstraint(['categoria_id'], ['categoria.id']),
+            sa.ForeignKeyConstraint(['livro_id'], ['livro.id']),
+            sa.PrimaryKeyConstraint('livro_id', 'categoria_id'),
+        ),
+        'emprestimo': (
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('data_emprestimo', sa.DateTime(), nullable=False),
+            sa.Column('data_devolucao_prevista', sa.Date(), nullable=False),
+            sa.Column('data_devolucao_real', sa.Date(), nullable=True),
+            sa.Column(
+                'status',
+                sa.Enum('ATIVO', 'DEVOLVIDO', 'ATRASADO', name='statusemprestimo'),
+                nullable=False,
+            ),
+            sa.Column('observacoes', sa.String(), nullable=True),
+            sa.Column('usuario_id', sa.Integer(), nullable=False),
+            sa.Column('livro_id', sa.Integer(), nullable=False),
+            sa.ForeignKeyConstraint(['livro_id'], ['livro.id']),
+            sa.ForeignKeyConstraint(['usuario_id'], ['usuario.id']),
+            sa.PrimaryKeyConstraint('id'),
+        ),
+        'perfil_usuario': (
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('foto_url', sa.String(), nullable=True),
+            sa.Column('profissao', sa.String(length=100), nullable=True),
+            sa.Column('interesses_literarios', sa.String(), nullable=True),
+            sa.Column('livros_favoritos', sa.String(), nullable=True),
+            sa.Column('data_criacao', sa.DateTime(), nullable=False),
+            sa.Column('usuario_id', sa.Integer(), nullable=False),
+            sa.ForeignKeyConstraint(['usuario_id'], ['usuario.id']),
+            sa.PrimaryKeyConstraint('id'),
+            sa.UniqueConstraint('usuario_id'),
+        ),
+    }
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Bancos criados antes por create_all já têm as tabelas base
+    existentes = set(sa.inspect(op.get_bind()).get_table_names())
+    for nome, colunas in _tabelas().items():
+        if nome in existentes:
+            continue
+        op.create_table(nome, *colunas)
+        if nome == 'autor':
+            op.create_index(op.f('ix_autor_cpf'), 'autor', ['cpf'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for nome in reversed(list(_tabelas())):
+        op.drop_table(nome)
+    sa.Enum(name='statusemprestimo').drop(op.get_bind(), checkfirst=True)
@@ -0,0 +1,64 @@
+"""Fila de reservas de livros
+
+Revision ID: c52e9b7f1a30
+Revises: 8a41d7c0e5b2
+Create Date: 2026-10-19 11:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = 'c52e9b7f1a30'
+down_revision: Union[str, None] = '8a41d7c0e5b2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'reserva',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('posicao', sa.Integer(), nullable=False),
+        sa.Column(
+            'status',
+            sa.Enum(
+                'AGUARDANDO',
+                'DISPONIVEL',
+                'ATENDIDA',
+                'CANCELADA',
+                'EXPIRADA',
+                name='statusreserva',
+            ),
+            nullable=False,
+        ),
+        sa.Column('data_criacao', sa.DateTime(), nullable=False),
+        sa.Column('data_disponibilidade', sa.DateTime(), nullable=True),
+        sa.Column('expira_em', sa.DateTime(), nullable=True),
+        sa.Column('usuario_id', sa.Integer(), nullable=False),
+        sa.Column('livro_id', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['livro_id'], ['livro.id']),
+        sa.ForeignKeyConstraint(['usuario_id'], ['usuario.id']),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index(
+        'ix_reserva_livro_status_posicao',
+        'reserva',
+        ['livro_id', 'status', 'posicao'],
+        unique=False,
+    )
+    op.create_index(
+        op.f('ix_reserva_usuario_id'), 'reserva', ['usuario_id'], unique=False
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_reserva_usuario_id'), table_name='reserva')
+    op.drop_index('ix_reserva_livro_status_posicao', table_name='reserva')
+    op.drop_table('reserva')
+    sa.Enum(name='statusreserva').drop(op.get_bind(), checkfirst=True)
@@ -0,0 +1,44 @@
+"""Tabela de eventos do feed de mudanças
+
+Revision ID: e7d3a1f4b692
+Revises: c52e9b7f1a30
+Create Date: 2026-10-19 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = 'e7d3a1f4b692'
+down_revision: Union[str, None] = 'c52e9b7f1a30'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'evento',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('entidade', sa.String(length=50), nullable=False),
+        sa.Column('entidade_id', sa.Integer(), nullable=False),
+        sa.Column(
+            'operacao',
+            sa.Enum('CREATE', 'UPDATE', 'DELETE', name='operacaoevento'),
+            nullable=False,
+        ),
+        sa.Column('dados', sa.JSON(), nullable=True),
+        sa.Column('data_criacao', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_evento_entidade_id', 'evento', ['entidade', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_evento_entidade_id', table_name='evento')
+    op.drop_table('evento')
+    sa.Enum(name='operacaoevento').drop(op.get_bind(), checkfirst=True)
@@ -0,0 +1,263 @@
+"""Registro de consultas lentas com plano de execução.
+
+Instalado em cada engine por ``build_engine`` (``CONSULTA_LENTA_MS``; 0
+desativa). Toda instrução que demora ``limite_ms`` ou mais é gravada em JSON,
+uma por linha, no log rotativo ``CONSULTA_LENTA_LOG``, com:
+
+- a impressão digital da instrução (literais e listas de ``IN`` normalizados);
+- os parâmetros redigidos (só o tipo e o tamanho, nunca o valor);
+- o método de serviço que a executou e a rota da requisição;
+- o plano (``EXPLAIN`` no PostgreSQL, ``EXPLAIN QUERY PLAN`` no SQLite),
+  capturado na primeira ocorrência lenta de cada impressão digital e no
+  máximo a cada ``INTERVALO_PLANO`` segundos depois disso.
+
+``estatisticas`` acumula, por processo, contagem e tempo total por impressão
+digital (``GET /metricas/consultas-lentas``).
+"""
+
+import hashlib
+import json
+import logging
+import logging.handlers
+import os
+import re
+import sys
+import threading
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from sqlalchemy import event
+
+from config.logging_config import logger
+from middleware.contexto import rota_atual
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DIR_SERVICOS = os.path.join(BASE_DIR, 'services') + os.sep
+
+# Intervalo mínimo entre capturas do plano da mesma impressão digital
+INTERVALO_PLANO = 600
+# Instruções com plano (DDL, COMMIT etc. não têm)
+_COM_PLANO = re.compile(r'^\s*(SELECT|WITH|INSERT|UPDATE|DELETE)\b', re.IGNORECASE)
+
+_LITERAIS = (
+    (re.compile(r"'(?:[^']|'')*'"), '?'),
+    (re.compile(r'%\(\w+\)s|(?<!:):\w+|\$\d+|__\[POSTCOMPILE_\w+\]'), '?'),
+    (re.compile(r'\b\d+(?:\.\d+)?\b'), '?'),
+    (re.compile(r'\(\s*\?(?:\s*,\s*\?)+\s*\)'), '(?, ...)'),
+    (re.compile(r'\s+'), ' '),
+)
+
+
+def normalizar(statement: str) -> str:
+    """Instrução sem literais nem parâmetros, para agrupar as execuções"""
+    for padrao, troca in _LITERAIS:
+        statement = padrao.sub(troca, statement)
+    return statement.strip()
+
+
+def impressao_digital(normalizada: str) -> str:
+    return hashlib.sha1(normalizada.encode()).hexdigest()[:12]
+
+
+def _redigir_valor(valor):
+    if valor is None or isinstance(valor, bool):
+        return valor
+    if isinstance(valor, (str, bytes, list, tuple)):
+        return f'<{type(valor).__name__}:{len(valor)}>'
+    return f'<{type(valor).__name__}>'
+
+
+def redigir(parametros, executemany: bool):
+    """Tipos (e tamanhos) dos parâmetros, sem os valores"""
+    if executemany:
+        return f'<{len(parametros)} conjuntos>'
+    if isinstance(parametros, dict):
+        return {chave: _redigir_valor(valor) for chave, valor in parametros.items()}
+    return [_redigir_valor(valor) for valor in parametros or ()]
+
+
+def servico_chamador() -> Optional[str]:
+    """Método de serviço na pilha: ``livro_service.LivroService.search_livros``.
+
+    Prefere o método de uma classe ``*Service`` a funções auxiliares de
+    ``services/`` (como a paginação) chamadas por ele.
+    """
+    frame = sys._getframe(2)
+    auxiliar = None
+    while frame is not None:
+        codigo = frame.f_code
+        if codigo.co_filename.startswith(DIR_SERVICOS):
+            modulo = os.path.splitext(os.path.basename(codigo.co_filename))[0]
+            nome = f'{modulo}.{getattr(codigo, "co_qualname", codigo.co_name)}'
+            if 'Service.' in nome:
+                return nome
+            auxiliar = auxiliar or nome
+        frame = frame.f_back
+    return auxiliar
+
+
+class EstatisticasConsultas:
+    """Consultas lentas por impressão digital, desde o início do processo"""
+
+    def __init__(self):
+        self._por_digital: Dict[str, dict] = {}
+        self._lock = threading.Lock()
+
+    def registrar(self, registro: dict) -> bool:
+        """Acumula a ocorrência; True se for hora de capturar o plano"""
+        agora = time.monotonic()
+        with self._lock:
+            item = self._por_digital.get(registro['digital'])
+            if item is None:
+                item = self._por_digital[registro['digital']] = {
+                    'digital': registro['digital'],
+                    'sql': registro['sql'],
+                    'contagem': 0,
+                    'total_ms': 0.0,
+                    'max_ms': 0.0,
+                    'servicos': [],
+                    'rotas': [],
+                    'plano': None,
+                    '_plano_em': -INTERVALO_PLANO,
+                }
+            item['contagem'] += 1
+            item['total_ms'] += registro['duracao_ms']
+            item['max_ms'] = max(item['max_ms'], registro['duracao_ms'])
+            item['ultima'] = registro['data']
+            for chave, lista in (('servico', 'servicos'), ('rota', 'rotas')):
+                # Alguns exemplos de origem bastam
+                if registro[chave] and registro[chave] not in item[lista][:5]:
+                    item[lista] = [*item[lista], registro[chave]][:5]
+            capturar = agora - item['_plano_em'] >= INTERVALO_PLANO
+            if capturar:
+                item['_plano_em'] = agora
+            return capturar
+
+    def definir_plano(self, digital: str, plano: str):
+        with self._lock:
+            if digital in self._por_digital:
+                self._por_digital[digital]['plano'] = plano
+
+    def top(self, limit: int = 20, ordem: str = 'total_ms') -> List[dict]:
+        with self._lock:
+            itens = [
+                {
+                    chave: valor
+                    for chave, valor in item.items()
+                    if not chave.startswith('_')
+                }
+                for item in self._por_digital.values()
+            ]
+        for item in itens:
+            item['total_ms'] = round(item['total_ms'], 1)
+            item['media_ms'] = round(item['total_ms'] / item['contagem'], 1)
+        itens.sort(key=lambda item: item[ordem], reverse=True)
+        return itens[:limit]
+
+    def limpar(self):
+        with self._lock:
+            self._por_digital.clear()
+
+
+estatisticas = EstatisticasConsultas()
+
+_log = logging.getLogger('consultas_lentas')
+_log_lock = threading.Lock()
+
+
+def _gravar(registro: dict, caminho: str):
+    # Handler próprio, instalado no primeiro registro: o log geral não recebe
+    # os planos, que podem ser longos
+    if not _log.handlers:
+        with _log_lock:
+            if not _log.handlers:
+                os.makedirs(os.path.dirname(caminho) or '.', exist_ok=True)
+                handler = logging.handlers.RotatingFileHandler(
+                    caminho, maxBytes=10485760, backupCount=5, encoding='utf-8'
+                )
+                handler.setFormatter(logging.Formatter('%(message)s'))
+                _log.addHandler(handler)
+                _log.setLevel(logging.INFO)
+                _log.propagate = False
+    _log.info(json.dumps(registro, ensure_ascii=False, default=str))
+
+
+def capturar_plano(cursor, dialeto: str, statement: str, parametros) -> Optional[str]:
+    """Plano da instrução, sem executá-la, no mesmo DBAPI connection"""
+    if not _COM_PLANO.match(statement):
+        return None
+    conexao = cursor.connection
+    plano_cursor = conexao.cursor()
+    try:
+        if dialeto == 'postgresql':
+            # Um erro no EXPLAIN não pode abortar a transação da requisição
+            plano_cursor.execute('SAVEPOINT consulta_lenta_plano')
+            try:
+                plano_cursor.execute(f'EXPLAIN (ANALYZE off) {statement}', parametros)
+                linhas = [linha[0] for linha in plano_cursor.fetchall()]
+            finally:
+                plano_cursor.execute('ROLLBACK TO SAVEPOINT consulta_lenta_plano')
+                plano_cursor.execute('RELEASE SAVEPOINT consulta_lenta_plano')
+            return '\n'.join(linhas)
+        if dialeto == 'sqlite':
+            plano_cursor.execute(f'EXPLAIN QUERY PLAN {statement}', parametros)
+            return '\n'.join(str(linha[-1]) for linha in plano_cursor.fetchall())
+        return None
+    finally:
+        plano_cursor.close()
+
+
+def instalar(engine, limite_ms: float, explain: bool = True, caminho_log: str = ''):
+    """Registra os eventos de consulta lenta no engine"""
+    limite = limite_ms / 1000
+    caminho_log = caminho_log or os.path.join('logs', 'consultas_lentas.log')
+
+    # Assinaturas definidas pelos eventos do SQLAlchemy
+    @event.listens_for(engine, 'before_cursor_execute')
+    def _antes(  # noqa: PLR0913, PLR0917
+        conn, cursor, statement, parameters, context, executemany
+    ):
+        conn.info.setdefault('consulta_inicio', []).append(time.perf_counter())
+
+    @event.listens_for(engine, 'after_cursor_execute')
+    def _depois(  # noqa: PLR0913, PLR0917
+        conn, cursor, statement, parameters, context, executemany
+    ):
+        duracao = time.perf_counter() - conn.info['consulta_inicio'].pop()
+        if duracao < limite:
+            return
+        try:
+            normalizada = normalizar(statement)
+            registro = {
+                'data': datetime.now().isoformat(timespec='milliseconds'),
+                'duracao_ms': round(duracao * 1000, 1),
+                'digital': impressao_digital(normalizada),
+                'sql': normalizada,
+                'parametros': redigir(parameters, executemany),
+                'servico': servico_chamador(),
+                'rota': rota_atual(),
+                'banco': engine.url.database,
+            }
+            capturar = estatisticas.registrar(registro)
+            if explain and capturar and not executemany:
+                registro['plano'] = capturar_plano(
+                    cursor, engine.dialect.name, statement, parameters
+                )
+                estatisticas.definir_plano(registro['digital'], registro['plano'])
+            _gravar(registro, caminho_log)
+            logger.warning(
+                f'Consulta lenta ({registro["duracao_ms"]} ms, {registro["digital"]}) '
+                f'em {registro["servico"] or "?"} [{registro["rota"] or "-"}]'
+            )
+        except Exception as e:
+            # O registro nunca derruba a consulta que o disparou
+            logger.error(f'Erro ao registrar consulta lenta: {str(e)}')
+
+    @event.listens_for(engine, 'handle_error')
+    def _erro(context):
+        # Consulta que falhou: descarta a marca de início
+        if context.connection is not None and context.cursor is not None:
+            inicios = context.connection.info.get('consulta_inicio')
+            if inicios:
+                inicios.pop()
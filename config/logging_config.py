@@ -1,9 +1,18 @@
 import logging
 import os
 from datetime import datetime
+from functools import lru_cache
 
 import logging.config
 
+# Logger da aplicação. Importar este módulo não configura nada: os handlers
+# (arquivo e console) só são instalados quando setup_logging() é chamado pela
+# fábrica da aplicação ou por uma ferramenta de linha de comando.
+logger = logging.getLogger(__name__)
+
+
+# Em cache: as chamadas seguintes não reconfiguram os handlers
+@lru_cache(maxsize=None)
 def setup_logging():
     # --- Passo 1: Criar o diretório de logs se não existir ---
     log_directory = 'logs'
@@ -85,11 +94,7 @@ def setup_logging():
     logging.config.dictConfig(LOGGING_CONFIG)
 
     # --- Passo 5: Retornar o logger para o módulo atual (seu logger) ---
-    return logging.getLogger(__name__)
-
-# Chamada para configurar o logging quando o arquivo é importado ou executado
-# Isso garante que a configuração seja aplicada logo que o módulo é carregado.
-logger = setup_logging()
+    return logger
 
 # Exemplo de como usar o logger (no seu main.py ou em outros arquivos):
 # import logging
@@ -0,0 +1,89 @@
+import asyncio
+import os
+import time
+from typing import Callable, List
+
+from sqlalchemy import text
+
+from config.logging_config import logger
+from config.settings import Settings
+
+# Instante de referência para medir o tempo de inicialização a frio do worker
+PROCESS_STARTED_AT = time.perf_counter()
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Tarefas de aquecimento (ex.: priming de caches) executadas em paralelo na
+# inicialização; cada uma recebe a aplicação (engine e settings em app.state)
+_startup_tasks: List[Callable] = []
+
+
+def register_startup_task(task: Callable) -> Callable:
+    if task not in _startup_tasks:
+        _startup_tasks.append(task)
+    return task
+
+
+def elapsed_ms() -> float:
+    return (time.perf_counter() - PROCESS_STARTED_AT) * 1000
+
+
+def check_migration_head(engine) -> bool:
+    """Compara a revisão do banco com a head do Alembic (uma única consulta)"""
+    # Alembic só é importado quando a verificação roda (inicialização a frio)
+    from alembic.config import Config  # noqa: PLC0415
+    from alembic.runtime.migration import MigrationContext  # noqa: PLC0415
+    from alembic.script import ScriptDirectory  # noqa: PLC0415
+
+    config = Config(os.path.join(BASE_DIR, 'alembic.ini'))
+    heads = set(ScriptDirectory.from_config(config).get_heads())
+
+    with engine.connect() as connection:
+        current = set(MigrationContext.configure(connection).get_current_heads())
+
+    if current != heads:
+        logger.warning(
+            f'Banco de dados fora da versão esperada: atual {sorted(current)}, '
+            f'head {sorted(heads)}. Execute "alembic upgrade head".'
+        )
+        return False
+    logger.info(f'Banco de dados na revisão head {sorted(heads)}')
+    return True
+
+
+def warm_pool(engine) -> int:
+    """Abre as conexões do pool antecipadamente para a primeira requisição"""
+    size = engine.pool.size() if hasattr(engine.pool, 'size') else 1
+    connections = []
+    try:
+        for _ in range(size):
+            connection = engine.connect()
+            connection.execute(text('SELECT 1'))
+            connections.append(connection)
+    finally:
+        for connection in connections:
+            connection.close()
+    return len(connections)
+
+
+async def run_startup(app, create_tables: Callable):
+    """Executa as verificações de inicialização em paralelo"""
+    engine = app.state.engine
+    settings: Settings = app.state.settings
+    if settings.db_create_all:
+        # Atalho opcional para desenvolvimento; em produção use o Alembic
+        await asyncio.to_thread(create_tables, engine)
+
+    tasks = [asyncio.to_thread(warm_pool, engine)]
+    if settings.app_env != 'production':
+        tasks.append(asyncio.to_thread(check_migration_head, engine))
+    tasks.extend(asyncio.to_thread(task, app) for task in _startup_tasks)
+
+    results = await asyncio.gather(*tasks, return_exceptions=True)
+    for result in results:
+        if isinstance(result, Exception):
+            logger.error(f'Erro em tarefa de inicialização: {str(result)}')
+
+    logger.info(
+        f'Aplicação pronta em {elapsed_ms():.0f} ms desde a importação da aplicação'
+    )
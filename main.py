@@ -1,39 +1,181 @@
-from config.database import create_db_and_tables
-from config.logging_config import logger
-from fastapi import FastAPI
-from routes import (
-    autor_routes,
-    categoria_routes,
-    emprestimo_routes,
-    livro_routes,
-    perfil_usuario_routes,
-    usuario_routes,
-)
-
-# Criar aplicação FastAPI
-app = FastAPI(
-    title='Sistema de Biblioteca Digital',
-    description='API para gerenciamento de biblioteca com SQLModel e FastAPI',
-    version='1.0.0',
-)
-
-# Incluir todas as rotas
-app.include_router(autor_routes.router)
-app.include_router(livro_routes.router)
-app.include_router(categoria_routes.router)
-app.include_router(usuario_routes.router)
-app.include_router(emprestimo_routes.router)
-app.include_router(perfil_usuario_routes.router)
-
-
-@app.on_event('startup')
-def on_startup():
-    """Criar tabelas do banco de dados na inicialização"""
-    create_db_and_tables()
-    logger.info('Aplicação iniciada e tabelas criadas')
-
-
-@app.get('/')
-def read_root():
-    """Endpoint raiz"""
-    return {'message': 'Sistema de Biblioteca Digital'}
+"""Aplicação FastAPI do Sistema de Biblioteca Digital.
+
+Importar este módulo é barato: rotas, serviços, schemas, engine e logging só
+são carregados por ``create_app()``. O atributo ``main:app`` (usado pelo
+uvicorn e pelo ``fastapi dev``) é criado no primeiro acesso, com as
+configurações lidas do ambiente.
+"""
+
+from contextlib import asynccontextmanager
+
+
+@asynccontextmanager
+async def lifespan(app):
+    """Inicialização e desligamento da aplicação.
+
+    As tabelas não são mais criadas aqui: o esquema é responsabilidade do
+    Alembic, e a inicialização só confere a revisão (fora de produção),
+    aquece o pool e executa as tarefas de priming em paralelo.
+    """
+    from config.database import create_db_and_tables, dispose_engine
+    from config.logging_config import logger
+    from config.startup import run_startup
+
+    await run_startup(app, create_db_and_tables)
+    logger.info('Aplicação iniciada')
+    yield
+    executor = getattr(app.state, 'executor_tarefas', None)
+    if executor is not None:
+        executor.parar()
+    dispose_engine(app.state.engine)
+    if app.state.roteador_leitura is not None:
+        app.state.roteador_leitura.dispose()
+    logger.info('Aplicação finalizada e conexões encerradas')
+
+
+def create_app(settings=None, engine=None):
+    """Cria a aplicação, configurando o logging e registrando as rotas.
+
+    Cada aplicação tem o seu próprio engine (``app.state.engine``), usado
+    pela dependência ``get_session``; os testes podem passar ``settings``
+    apontando para um banco isolado ou um ``engine`` já construído.
+    """
+    # Importações adiadas de propósito (ver docstring do módulo)
+    from config.database import build_engine, build_roteador_leitura
+    from config.logging_config import logger, setup_logging
+    from config.settings import Settings
+    from config.startup import elapsed_ms, register_startup_task
+    from fastapi import FastAPI, Request
+    from middleware.admissao import AdmissaoMiddleware, ControleAdmissao
+    from middleware.compressao import CompressaoMiddleware, MetricasPayload
+    from middleware.contexto import ContextoRequisicaoMiddleware
+    from middleware.limites import LimiteTaxaMiddleware, criar_backend
+    from middleware.perfilamento import ArmazemPerfis, PerfilamentoMiddleware
+    from routes import (
+        analise_routes,
+        autor_routes,
+        categoria_routes,
+        emprestimo_routes,
+        evento_routes,
+        exportacao_routes,
+        livro_routes,
+        metricas_routes,
+        perfil_usuario_routes,
+        perfilamento_routes,
+        recomendacao_routes,
+        reserva_routes,
+        usuario_routes,
+    )
+    from services.livro_service import LivroService
+    from services.recomendacao_service import RecomendacaoService
+    from services.tarefa_service import TarefaService
+
+    setup_logging()
+    settings = settings or Settings.from_env()
+
+    # Criar aplicação FastAPI
+    app = FastAPI(
+        title='Sistema de Biblioteca Digital',
+        description='API para gerenciamento de biblioteca com SQLModel e FastAPI',
+        version='1.0.0',
+        lifespan=lifespan,
+    )
+    app.state.settings = settings
+    app.state.engine = engine or build_engine(settings)
+    # Réplicas de leitura (DATABASE_REPLICA_URLS), usadas por get_session
+    app.state.roteador_leitura = build_roteador_leitura(settings)
+    app.state.first_request_served = False
+
+    # Incluir todas as rotas
+    for modulo in (
+        autor_routes,
+        livro_routes,
+        categoria_routes,
+        usuario_routes,
+        emprestimo_routes,
+        perfil_usuario_routes,
+        recomendacao_routes,
+        reserva_routes,
+        evento_routes,
+        exportacao_routes,
+        analise_routes,
+        perfilamento_routes,
+        metricas_routes,
+    ):
+        app.include_router(modulo.router)
+
+    # Abre o índice de recomendações e pré-carrega a disponibilidade do
+    # catálogo antes da primeira requisição
+    register_startup_task(RecomendacaoService.carregar_na_inicializacao)
+    register_startup_task(LivroService.carregar_disponiveis_na_inicializacao)
+    # Executor de tarefas em segundo plano, se TAREFAS_NO_PROCESSO estiver ativo
+    register_startup_task(TarefaService.iniciar_na_aplicacao)
+
+    # Rota da requisição no log de consultas lentas
+    if settings.consulta_lenta_ms > 0:
+        app.add_middleware(ContextoRequisicaoMiddleware)
+
+    # Compressão negociada e bytes por rota; com COMPRESSAO=false só as métricas
+    app.state.metricas_payload = MetricasPayload()
+    app.add_middleware(
+        CompressaoMiddleware,
+        minimo=settings.compressao_minimo,
+        codificacoes=None if settings.compressao else (),
+        metricas=app.state.metricas_payload,
+    )
+
+    # Perfis de uma amostra das requisições (PERFILAMENTO), em /perfilamento/
+    app.state.armazem_perfis = ArmazemPerfis(
+        settings.perfilamento_dir, settings.perfilamento_maximo
+    )
+    if settings.perfilamento:
+        app.add_middleware(
+            PerfilamentoMiddleware,
+            armazem=app.state.armazem_perfis,
+            amostragem=settings.perfilamento_amostragem,
+            token=settings.perfilamento_token,
+        )
+
+    # Sob carga: primeiro o limite por cliente (429), depois a admissão por
+    # concorrência (503), que descarta buscas e contagens antes das demais
+    if settings.admissao:
+        app.state.controle_admissao = ControleAdmissao(
+            settings.admissao_concorrencia
+            or (settings.db_pool_size + settings.db_max_overflow)
+            * (1 + len(settings.database_replica_urls)),
+            fila_maxima=settings.admissao_fila,
+            espera_maxima=settings.admissao_espera,
+        )
+        app.add_middleware(AdmissaoMiddleware, controle=app.state.controle_admissao)
+    if settings.rate_limit:
+        app.add_middleware(
+            LimiteTaxaMiddleware, backend=criar_backend(settings.rate_limit_backend)
+        )
+
+    @app.middleware('http')
+    async def log_first_request(request: Request, call_next):
+        """Registrar o tempo entre o início do processo e a primeira resposta"""
+        response = await call_next(request)
+        if not request.app.state.first_request_served:
+            request.app.state.first_request_served = True
+            logger.info(
+                f'Primeira requisição atendida em {elapsed_ms():.0f} ms '
+                'desde a importação'
+            )
+        return response
+
+    @app.get('/')
+    def read_root():
+        """Endpoint raiz"""
+        return {'message': 'Sistema de Biblioteca Digital'}
+
+    return app
+
+
+def __getattr__(name):
+    # ``main:app`` sob demanda: criado uma única vez no primeiro acesso
+    if name == 'app':
+        app = create_app()
+        globals()['app'] = app
+        return app
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
@@ -0,0 +1,138 @@
+"""Controle de admissão por concorrência, com descarte de carga.
+
+No máximo ``concorrencia`` requisições são atendidas ao mesmo tempo; o
+padrão é a capacidade do pool de conexões, então esperar por uma vaga aqui
+equivale a esperar por uma conexão, sem ocupar threads nem o pool. As demais
+aguardam numa fila limitada: com a fila cheia, ou após ``espera_maxima``
+segundos na fila, a resposta é um 503 imediato em vez de uma requisição
+lenta que também atrasa as outras.
+
+Buscas e contagens (rotas caras) nunca entram na fila e só são admitidas
+enquanto há folga (``fracao_cara`` das vagas): sob carga elas são
+recusadas primeiro, preservando as consultas por ID e as escritas. Rotas
+leves e conexões longas (SSE, long-poll) não passam pelo controle.
+"""
+
+import asyncio
+from collections import deque
+from typing import Optional
+
+from starlette.responses import JSONResponse
+
+from config.logging_config import logger
+from middleware.rotas import ClasseRota, classificar
+
+# Intervalo mínimo entre avisos de descarte no log
+INTERVALO_AVISO = 10
+
+
+class ControleAdmissao:
+    def __init__(
+        self,
+        concorrencia: int,
+        fila_maxima: int = 100,
+        espera_maxima: float = 1.0,
+        fracao_cara: float = 0.5,
+    ):
+        self.concorrencia = concorrencia
+        self.fila_maxima = fila_maxima
+        self.espera_maxima = espera_maxima
+        self.limite_caras = max(1, int(concorrencia * fracao_cara))
+        self.em_uso = 0
+        self.recusadas = 0
+        self._fila = deque()
+        self._ultimo_aviso = 0.0
+
+    @property
+    def fila(self) -> int:
+        return len(self._fila)
+
+    async def entrar(self, classe: ClasseRota) -> Optional[str]:
+        """Ocupa uma vaga; devolve o motivo da recusa ou None se admitida"""
+        if classe == ClasseRota.CARA:
+            if self._fila or self.em_uso >= self.limite_caras:
+                return 'servidor ocupado; buscas e contagens temporariamente suspensas'
+            self.em_uso += 1
+            return None
+
+        if not self._fila and self.em_uso < self.concorrencia:
+            self.em_uso += 1
+            return None
+
+        if len(self._fila) >= self.fila_maxima:
+            return 'servidor ocupado; fila de espera cheia'
+
+        vaga = asyncio.get_running_loop().create_future()
+        self._fila.append(vaga)
+        try:
+            await asyncio.wait_for(asyncio.shield(vaga), self.espera_maxima)
+        except asyncio.TimeoutError:
+            # Se a vaga chegou no limite do prazo, a requisição está admitida
+            if not vaga.done():
+                self._desistir(vaga)
+                return 'servidor ocupado; tempo de espera esgotado'
+        except asyncio.CancelledError:
+            if vaga.done():
+                self.sair()
+            else:
+                self._desistir(vaga)
+            raise
+        return None
+
+    def sair(self):
+        # A vaga passa direto para o próximo da fila
+        while self._fila:
+            vaga = self._fila.popleft()
+            if not vaga.done():
+                vaga.set_result(True)
+                return
+        self.em_uso -= 1
+
+    def _desistir(self, vaga: asyncio.Future):
+        vaga.cancel()
+        try:
+            self._fila.remove(vaga)
+        except ValueError:
+            pass
+
+    def registrar_recusa(self, motivo: str):
+        self.recusadas += 1
+        agora = asyncio.get_running_loop().time()
+        if agora - self._ultimo_aviso >= INTERVALO_AVISO:
+            self._ultimo_aviso = agora
+            logger.warning(
+                f'Descarte de carga: {motivo} (em uso {self.em_uso}, fila {self.fila}, '
+                f'{self.recusadas} recusadas no total)'
+            )
+
+
+class AdmissaoMiddleware:
+    """Middleware ASGI: 503 com ``Retry-After`` quando a requisição é recusada"""
+
+    def __init__(self, app, controle: ControleAdmissao):
+        self.app = app
+        self.controle = controle
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        classe = classificar(scope['method'], scope['path'])
+        if classe in {ClasseRota.LEVE, ClasseRota.STREAM}:
+            await self.app(scope, receive, send)
+            return
+
+        motivo = await self.controle.entrar(classe)
+        if motivo:
+            self.controle.registrar_recusa(motivo)
+            response = JSONResponse(
+                {'detail': motivo}, status_code=503, headers={'Retry-After': '1'}
+            )
+            await response(scope, receive, send)
+            return
+
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.controle.sair()
@@ -0,0 +1,278 @@
+"""Compressão negociada das respostas e métricas de payload por rota.
+
+A codificação é escolhida pelo ``Accept-Encoding`` do cliente entre as
+disponíveis: ``br`` e ``zstd`` quando os pacotes ``brotli``/``zstandard``
+estão instalados, e ``gzip`` sempre. Respostas menores que ``minimo`` bytes,
+de tipos já comprimidos ou já codificadas seguem como estão.
+
+Respostas em streaming (exportações) são comprimidas à medida que os blocos
+chegam, sem acumular o corpo inteiro na memória; só os primeiros ``minimo``
+bytes são retidos para decidir se vale comprimir. Eventos SSE nunca são
+comprimidos, pois cada evento precisa chegar assim que é enviado.
+"""
+
+import zlib
+from typing import Dict, Optional, Sequence, Tuple
+
+from starlette.datastructures import Headers, MutableHeaders
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Tipos de conteúdo que compensam comprimir
+TIPOS_COMPRESSIVEIS = (
+    'application/json',
+    'application/x-ndjson',
+    'application/xml',
+    'application/javascript',
+    'text/',
+)
+TIPOS_SEM_COMPRESSAO = ('text/event-stream',)
+
+
+class _Gzip:
+    def __init__(self, nivel: int = 6):
+        self._obj = zlib.compressobj(nivel, zlib.DEFLATED, 31)
+
+    def comprimir(self, dados: bytes) -> bytes:
+        return self._obj.compress(dados)
+
+    def finalizar(self) -> bytes:
+        return self._obj.flush()
+
+
+class _Brotli:
+    def __init__(self):
+        # Qualidade 4: bem mais rápida que a padrão (11) e ainda melhor que gzip
+        self._obj = brotli.Compressor(quality=4)
+
+    def comprimir(self, dados: bytes) -> bytes:
+        return self._obj.process(dados)
+
+    def finalizar(self) -> bytes:
+        return self._obj.finish()
+
+
+class _Zstd:
+    def __init__(self):
+        self._obj = zstandard.ZstdCompressor(level=3).compressobj()
+
+    def comprimir(self, dados: bytes) -> bytes:
+        return self._obj.compress(dados)
+
+    def finalizar(self) -> bytes:
+        return self._obj.flush()
+
+
+def codificacoes_disponiveis() -> Tuple[str, ...]:
+    """Codificações suportadas neste ambiente, em ordem de preferência"""
+    disponiveis = []
+    if brotli is not None:
+        disponiveis.append('br')
+    if zstandard is not None:
+        disponiveis.append('zstd')
+    disponiveis.append('gzip')
+    return tuple(disponiveis)
+
+
+COMPRESSORES = {'br': _Brotli, 'zstd': _Zstd, 'gzip': _Gzip}
+
+
+def negociar(accept_encoding: str, codificacoes: Sequence[str]) -> Optional[str]:
+    """Codificação de maior ``q`` aceita pelo cliente; empates pela ordem dada"""
+    aceitas = {}
+    for item in accept_encoding.split(','):
+        nome, _, params = item.strip().partition(';')
+        q = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        aceitas[nome.strip().lower()] = q
+
+    melhor, melhor_q = None, 0.0
+    for codificacao in codificacoes:
+        q = aceitas.get(codificacao, aceitas.get('*', 0.0))
+        if q > melhor_q:
+            melhor, melhor_q = codificacao, q
+    return melhor
+
+
+def _compressivel(headers: Headers) -> bool:
+    if 'content-encoding' in headers:
+        return False
+    tipo = headers.get('content-type', '')
+    return tipo.startswith(TIPOS_COMPRESSIVEIS) and not tipo.startswith(
+        TIPOS_SEM_COMPRESSAO
+    )
+
+
+class MetricasPayload:
+    """Totais por rota: requisições, bytes gerados e bytes enviados (por processo)"""
+
+    def __init__(self):
+        self._rotas: Dict[Tuple[str, str], Dict[str, int]] = {}
+
+    def registrar(
+        self, metodo: str, rota: str, original: int, enviado: int, comprimida: bool
+    ):
+        totais = self._rotas.get((metodo, rota))
+        if totais is None:
+            totais = self._rotas[metodo, rota] = {
+                'requisicoes': 0,
+                'comprimidas': 0,
+                'bytes_originais': 0,
+                'bytes_enviados': 0,
+            }
+        totais['requisicoes'] += 1
+        totais['comprimidas'] += comprimida
+        totais['bytes_originais'] += original
+        totais['bytes_enviados'] += enviado
+
+    def resumo(self) -> list:
+        """Rotas ordenadas pelo volume enviado, com a taxa de compressão"""
+        itens = []
+        for (metodo, rota), totais in self._rotas.items():
+            originais = totais['bytes_originais']
+            itens.append({
+                'metodo': metodo,
+                'rota': rota,
+                **totais,
+                'media_bytes_enviados': totais['bytes_enviados'] // totais['requisicoes'],
+                'taxa_compressao': round(totais['bytes_enviados'] / originais, 3)
+                if originais
+                else 1.0,
+            })
+        itens.sort(key=lambda item: item['bytes_enviados'], reverse=True)
+        return itens
+
+
+def _rota(scope) -> str:
+    # Caminho com parâmetros (/livros/{livro_id}): agrupa as requisições da rota
+    route = scope.get('route')
+    return getattr(route, 'path', None) or 'sem rota'
+
+
+class CompressaoMiddleware:
+    """Middleware ASGI de compressão negociada e métricas de payload"""
+
+    def __init__(
+        self,
+        app,
+        minimo: int = 1024,
+        codificacoes: Optional[Sequence[str]] = None,
+        metricas: Optional[MetricasPayload] = None,
+    ):
+        self.app = app
+        self.minimo = minimo
+        self.codificacoes = (
+            codificacoes_disponiveis() if codificacoes is None else tuple(codificacoes)
+        )
+        self.metricas = metricas
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        codificacao = negociar(
+            Headers(scope=scope).get('accept-encoding', ''), self.codificacoes
+        )
+        resposta = _Resposta(send, codificacao, self.minimo)
+        try:
+            await self.app(scope, receive, resposta.enviar)
+        finally:
+            if self.metricas is not None and resposta.iniciada:
+                self.metricas.registrar(
+                    scope['method'],
+                    _rota(scope),
+                    resposta.bytes_originais,
+                    resposta.bytes_enviados,
+                    resposta.compressor is not None,
+                )
+
+
+class _Resposta:
+    """Estado de uma resposta: retém o início do corpo até decidir se comprime"""
+
+    def __init__(self, send, codificacao: Optional[str], minimo: int):
+        self.send = send
+        self.codificacao = codificacao
+        self.minimo = minimo
+        self.iniciada = False
+        self.compressor = None
+        self.bytes_originais = 0
+        self.bytes_enviados = 0
+        self._inicio = None
+        self._retido = []
+        self._tamanho_retido = 0
+
+    async def enviar(self, message):
+        if message['type'] == 'http.response.start':
+            self.iniciada = True
+            headers = Headers(raw=message['headers'])
+            if _compressivel(headers):
+                MutableHeaders(raw=message['headers']).add_vary_header('Accept-Encoding')
+                if self.codificacao is not None:
+                    # Decide no primeiro bloco do corpo
+                    self._inicio = message
+                    return
+            await self.send(message)
+            return
+
+        if message['type'] != 'http.response.body':
+            await self.send(message)
+            return
+
+        corpo = message.get('body', b'')
+        mais = message.get('more_body', False)
+        self.bytes_originais += len(corpo)
+
+        if self._inicio is not None:
+            self._retido.append(corpo)
+            self._tamanho_retido += len(corpo)
+            if mais and self._tamanho_retido < self.minimo:
+                return
+            await self._decidir(comprimir=self._tamanho_retido >= self.minimo, mais=mais)
+            return
+
+        if self.compressor is not None:
+            corpo = self.compressor.comprimir(corpo)
+            if not mais:
+                corpo += self.compressor.finalizar()
+            if not corpo and mais:
+                return
+            message = {'type': 'http.response.body', 'body': corpo, 'more_body': mais}
+        self.bytes_enviados += len(corpo)
+        await self.send(message)
+
+    async def _decidir(self, comprimir: bool, mais: bool):
+        inicio, self._inicio = self._inicio, None
+        corpo = b''.join(self._retido)
+        self._retido = []
+        headers = MutableHeaders(raw=inicio['headers'])
+
+        if comprimir:
+            self.compressor = COMPRESSORES[self.codificacao]()
+            corpo = self.compressor.comprimir(corpo)
+            if not mais:
+                corpo += self.compressor.finalizar()
+            headers['Content-Encoding'] = self.codificacao
+            if mais:
+                # Tamanho final desconhecido: transferência em blocos
+                del headers['Content-Length']
+            else:
+                headers['Content-Length'] = str(len(corpo))
+
+        await self.send(inicio)
+        self.bytes_enviados += len(corpo)
+        await self.send({'type': 'http.response.body', 'body': corpo, 'more_body': mais})
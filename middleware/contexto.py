@@ -0,0 +1,37 @@
+"""Requisição em atendimento, acessível fora das rotas (ex.: eventos do engine).
+
+O ``scope`` ASGI fica numa ``ContextVar``, copiada para o threadpool onde as
+rotas síncronas rodam; a rota (``/livros/{livro_id}``) é lida do ``scope``
+quando necessária, depois do roteamento.
+"""
+
+from contextvars import ContextVar
+from typing import Optional
+
+_requisicao: ContextVar[Optional[dict]] = ContextVar('requisicao', default=None)
+
+
+def rota_atual() -> Optional[str]:
+    """``GET /livros/search`` da requisição atual, ou None fora de requisições"""
+    scope = _requisicao.get()
+    if scope is None:
+        return None
+    route = scope.get('route')
+    return f'{scope["method"]} {getattr(route, "path", None) or scope["path"]}'
+
+
+class ContextoRequisicaoMiddleware:
+    """Middleware ASGI que publica o ``scope`` da requisição em ``rota_atual``"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+        token = _requisicao.set(scope)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _requisicao.reset(token)
@@ -0,0 +1,150 @@
+"""Limite de taxa por cliente e classe de rota (token bucket).
+
+Cada par (cliente, classe de rota) tem um balde com ``capacidade`` fichas,
+reabastecido a ``taxa`` fichas por segundo; cada requisição consome uma.
+Sem fichas, a resposta é 429 com ``Retry-After``. O estado dos baldes fica
+num backend plugável: ``MemoriaBackend`` (por processo) ou ``SQLiteBackend``
+(um arquivo compartilhado pelos workers da máquina). Outros backends
+compartilhados (ex.: Redis) só precisam implementar ``consumir``.
+"""
+
+import math
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Tuple
+
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import JSONResponse
+
+from config.logging_config import logger
+from middleware.rotas import ClasseRota, classificar
+
+# (fichas por segundo, capacidade) por classe de rota e cliente
+TAXAS: Dict[ClasseRota, Tuple[float, float]] = {
+    ClasseRota.LEVE: (20, 40),
+    ClasseRota.LEITURA: (20, 50),
+    ClasseRota.CARA: (2, 10),
+    ClasseRota.ESCRITA: (5, 20),
+    ClasseRota.STREAM: (1, 5),
+}
+
+
+def _reabastecer(fichas, atualizado, agora, taxa, capacidade):
+    fichas = min(capacidade, fichas + (agora - atualizado) * taxa)
+    if fichas >= 1:
+        return fichas - 1, 0.0
+    return fichas, (1 - fichas) / taxa
+
+
+class MemoriaBackend:
+    """Baldes em memória, por processo (descarta os menos usados além de ``maxsize``)"""
+
+    bloqueante = False
+
+    def __init__(self, maxsize: int = 100_000):
+        self.maxsize = maxsize
+        self._baldes: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def consumir(self, chave: str, taxa: float, capacidade: float) -> float:
+        """Consome uma ficha; devolve 0 ou os segundos até a próxima ficha"""
+        agora = time.monotonic()
+        with self._lock:
+            fichas, atualizado = self._baldes.get(chave, (capacidade, agora))
+            fichas, espera = _reabastecer(fichas, atualizado, agora, taxa, capacidade)
+            self._baldes[chave] = (fichas, agora)
+            self._baldes.move_to_end(chave)
+            while len(self._baldes) > self.maxsize:
+                self._baldes.popitem(last=False)
+        return espera
+
+
+class SQLiteBackend:
+    """Baldes num arquivo SQLite, compartilhados pelos processos da máquina"""
+
+    # Acessa o disco: chamado fora do event loop
+    bloqueante = True
+
+    def __init__(self, caminho: str):
+        self._conexao = sqlite3.connect(
+            caminho, isolation_level=None, check_same_thread=False, timeout=1
+        )
+        self._conexao.execute('PRAGMA journal_mode=WAL')
+        self._conexao.execute(
+            'CREATE TABLE IF NOT EXISTS balde '
+            '(chave TEXT PRIMARY KEY, fichas REAL NOT NULL, atualizado REAL NOT NULL)'
+        )
+        self._lock = threading.Lock()
+
+    def consumir(self, chave: str, taxa: float, capacidade: float) -> float:
+        agora = time.time()
+        with self._lock:
+            self._conexao.execute('BEGIN IMMEDIATE')
+            try:
+                row = self._conexao.execute(
+                    'SELECT fichas, atualizado FROM balde WHERE chave = ?', (chave,)
+                ).fetchone()
+                fichas, atualizado = row or (capacidade, agora)
+                fichas, espera = _reabastecer(fichas, atualizado, agora, taxa, capacidade)
+                self._conexao.execute(
+                    'INSERT INTO balde (chave, fichas, atualizado) VALUES (?, ?, ?) '
+                    'ON CONFLICT (chave) DO UPDATE SET '
+                    'fichas = excluded.fichas, atualizado = excluded.atualizado',
+                    (chave, fichas, agora),
+                )
+                self._conexao.execute('COMMIT')
+            except Exception:
+                self._conexao.execute('ROLLBACK')
+                raise
+        return espera
+
+
+def criar_backend(url: str):
+    """``memoria`` ou ``sqlite:///caminho/arquivo.db``"""
+    if url == 'memoria':
+        return MemoriaBackend()
+    if url.startswith('sqlite:///'):
+        return SQLiteBackend(url.removeprefix('sqlite:///'))
+    raise ValueError(f'Backend de limite de taxa desconhecido: {url}')
+
+
+class LimiteTaxaMiddleware:
+    """Middleware ASGI: 429 quando o cliente esgota as fichas da classe da rota"""
+
+    def __init__(self, app, backend, taxas: Dict[ClasseRota, Tuple[float, float]] = None):
+        self.app = app
+        self.backend = backend
+        self.taxas = taxas or TAXAS
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        classe = classificar(scope['method'], scope['path'])
+        cliente = scope['client'][0] if scope.get('client') else 'anonimo'
+        taxa, capacidade = self.taxas[classe]
+        chave = f'{cliente}:{classe.value}'
+        try:
+            if self.backend.bloqueante:
+                espera = await run_in_threadpool(
+                    self.backend.consumir, chave, taxa, capacidade
+                )
+            else:
+                espera = self.backend.consumir(chave, taxa, capacidade)
+        except Exception as e:
+            # Falha no backend não derruba a API: a requisição segue sem limite
+            logger.error(f'Erro no backend de limite de taxa: {str(e)}')
+            espera = 0
+
+        if espera > 0:
+            response = JSONResponse(
+                {'detail': 'Limite de requisições excedido'},
+                status_code=429,
+                headers={'Retry-After': str(math.ceil(espera))},
+            )
+            await response(scope, receive, send)
+            return
+        await self.app(scope, receive, send)
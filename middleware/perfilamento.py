@@ -0,0 +1,341 @@
+"""Perfilamento por amostragem de requisições em produção.
+
+Uma fração ``amostragem`` das requisições, e toda requisição com o header
+``X-Perfilar`` igual ao token de administração, é perfilada: enquanto ela é
+atendida, uma thread amostra a pilha das threads ocupadas a cada
+``intervalo`` segundos (incluindo as do threadpool, onde rodam as rotas
+síncronas). Cada perfil é gravado em ``diretorio`` em dois formatos:
+
+- ``<nome>.speedscope.json``: abre direto em https://www.speedscope.app;
+- ``<nome>.folded``: pilhas agregadas (``a;b;c 12``), para ``flamegraph.pl``.
+
+O índice ``indice.jsonl`` guarda rota, duração e o tempo por camada (banco,
+ORM, serialização, logging e aplicação), pela função mais interna de cada
+amostra. Só uma requisição é perfilada por vez; sob concorrência, amostras
+de outras requisições atendidas no mesmo threadpool podem aparecer no perfil.
+Com ``PERFILAMENTO=false`` (padrão) o middleware nem é instalado.
+"""
+
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from typing import List, Optional
+
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers, MutableHeaders
+
+from config.logging_config import logger
+
+HEADER_PERFILAR = 'x-perfilar'
+HEADER_PERFIL = 'X-Perfil'
+INDICE = 'indice.jsonl'
+FORMATOS = {'speedscope': '.speedscope.json', 'folded': '.folded'}
+
+# Camada pela função mais interna da amostra (caminho relativo do arquivo)
+CAMADAS = (
+    ('banco', ('sqlalchemy/engine/', 'sqlalchemy/pool/', 'sqlalchemy/dialects/')),
+    ('orm', ('sqlalchemy/', 'sqlmodel/')),
+    ('serializacao', ('pydantic/', 'pydantic_core/', 'fastapi/encoders', 'json/')),
+    ('logging', ('logging/',)),
+)
+# Threads ociosas (esperando trabalho ou eventos) não entram nas amostras
+ARQUIVOS_OCIOSOS = (
+    'selectors.py',
+    'threading.py',
+    'queue.py',
+    os.path.join('futures', 'thread.py'),
+)
+
+_NOME_PERFIL = re.compile(r'^[\w.-]+$')
+
+
+def _ocioso(frame) -> bool:
+    return frame.f_code.co_filename.endswith(ARQUIVOS_OCIOSOS)
+
+
+class Amostrador(threading.Thread):
+    """Thread que amostra as pilhas das demais threads até ``parar()``"""
+
+    def __init__(self, intervalo: float):
+        super().__init__(name='perfilamento', daemon=True)
+        self.intervalo = intervalo
+        # (thread, pilha de code objects da raiz à folha, segundos)
+        self.amostras = []
+        self.nomes_threads = {}
+        self._parar = threading.Event()
+
+    def run(self):
+        proprio = threading.get_ident()
+        anterior = time.perf_counter()
+        while not self._parar.wait(self.intervalo):
+            agora = time.perf_counter()
+            peso, anterior = agora - anterior, agora
+            for ident, folha in sys._current_frames().items():
+                if ident == proprio or _ocioso(folha):
+                    continue
+                pilha, frame = [], folha
+                while frame is not None:
+                    pilha.append(frame.f_code)
+                    frame = frame.f_back
+                pilha.reverse()
+                self.amostras.append((ident, tuple(pilha), peso))
+
+    def parar(self):
+        self._parar.set()
+        self.join()
+        self.nomes_threads = {t.ident: t.name for t in threading.enumerate()}
+
+
+class _Rotulos:
+    """Nome, arquivo (relativo ao sys.path) e camada de cada code object"""
+
+    def __init__(self):
+        self._raizes = sorted(
+            (os.path.abspath(p) + os.sep for p in sys.path if p),
+            key=len,
+            reverse=True,
+        )
+        self._cache = {}
+
+    def arquivo(self, codigo) -> str:
+        caminho = codigo.co_filename
+        for raiz in self._raizes:
+            if caminho.startswith(raiz):
+                return caminho[len(raiz) :].replace(os.sep, '/')
+        return caminho
+
+    def __call__(self, codigo):
+        rotulo = self._cache.get(codigo)
+        if rotulo is None:
+            arquivo = self.arquivo(codigo)
+            camada = next(
+                (nome for nome, prefixos in CAMADAS if arquivo.startswith(prefixos)),
+                None,
+            )
+            rotulo = self._cache[codigo] = (
+                codigo.co_name,
+                arquivo,
+                codigo.co_firstlineno,
+                camada,
+            )
+        return rotulo
+
+
+def montar_perfil(amostrador: Amostrador, nome: str, duracao: float):
+    """Perfil speedscope, pilhas agregadas e segundos por camada"""
+    rotulos = _Rotulos()
+    frames, indices = [], {}
+    por_thread = {}
+    agregadas = Counter()
+    camadas = Counter()
+
+    for ident, pilha, peso in amostrador.amostras:
+        thread = amostrador.nomes_threads.get(ident, str(ident))
+        amostra = []
+        for codigo in pilha:
+            indice = indices.get(codigo)
+            if indice is None:
+                indice = indices[codigo] = len(frames)
+                frames.append(dict(zip(('name', 'file', 'line'), rotulos(codigo))))
+            amostra.append(indice)
+        amostras, pesos = por_thread.setdefault(thread, ([], []))
+        amostras.append(amostra)
+        pesos.append(round(peso * 1000, 3))
+
+        agregadas[thread, tuple(amostra)] += peso
+        camada = next(
+            (rotulos(c)[3] for c in reversed(pilha) if rotulos(c)[3]), 'aplicacao'
+        )
+        camadas[camada] += peso
+
+    return (
+        _speedscope(nome, frames, por_thread, duracao),
+        _folded(frames, agregadas),
+        camadas,
+    )
+
+
+def _speedscope(nome: str, frames: list, por_thread: dict, duracao: float) -> dict:
+    # Um perfil por thread, com os frames compartilhados
+    return {
+        '$schema': 'https://www.speedscope.app/file-format-schema.json',
+        'name': nome,
+        'exporter': 'biblioteca-api',
+        'activeProfileIndex': 0,
+        'shared': {'frames': frames},
+        'profiles': [
+            {
+                'type': 'sampled',
+                'name': thread,
+                'unit': 'milliseconds',
+                'startValue': 0,
+                'endValue': round(duracao * 1000, 3),
+                'samples': amostras,
+                'weights': pesos,
+            }
+            for thread, (amostras, pesos) in por_thread.items()
+        ],
+    }
+
+
+def _folded(frames: list, agregadas: Counter) -> str:
+    # flamegraph.pl espera contagens inteiras: microssegundos
+    nomes = [f'{f["name"]} ({f["file"]}:{f["line"]})' for f in frames]
+    return ''.join(
+        f'{";".join([thread, *(nomes[i] for i in amostra)])} '
+        f'{max(1, round(segundos * 1e6))}\n'
+        for (thread, amostra), segundos in agregadas.items()
+    )
+
+
+class ArmazemPerfis:
+    """Perfis gravados em disco, com índice e retenção dos ``maximo`` mais novos"""
+
+    def __init__(self, diretorio: str, maximo: int = 200):
+        self.diretorio = diretorio
+        self.maximo = maximo
+        self._lock = threading.Lock()
+
+    def salvar(self, amostrador: Amostrador, metadados: dict):
+        nome = metadados['nome']
+        duracao = metadados.pop('duracao')
+        speedscope, folded, camadas = montar_perfil(
+            amostrador, f'{metadados["metodo"]} {metadados["rota"]}', duracao
+        )
+        total = sum(camadas.values()) or 1
+        registro = {
+            **metadados,
+            'duracao_ms': round(duracao * 1000, 1),
+            'amostras': len(amostrador.amostras),
+            'camadas': {
+                camada: {
+                    'ms': round(segundos * 1000, 1),
+                    'fracao': round(segundos / total, 3),
+                }
+                for camada, segundos in camadas.most_common()
+            },
+        }
+        os.makedirs(self.diretorio, exist_ok=True)
+        base = os.path.join(self.diretorio, nome)
+        with open(base + FORMATOS['speedscope'], 'w', encoding='utf-8') as f:
+            json.dump(speedscope, f)
+        with open(base + FORMATOS['folded'], 'w', encoding='utf-8') as f:
+            f.write(folded)
+        with self._lock:
+            with open(os.path.join(self.diretorio, INDICE), 'a', encoding='utf-8') as f:
+                f.write(json.dumps(registro, default=str) + '\n')
+            self._reter()
+
+    def _reter(self):
+        registros = self._ler_indice()
+        if len(registros) <= self.maximo:
+            return
+        antigos, registros = registros[: -self.maximo], registros[-self.maximo :]
+        for registro in antigos:
+            for extensao in FORMATOS.values():
+                caminho = os.path.join(self.diretorio, registro['nome'] + extensao)
+                if os.path.exists(caminho):
+                    os.remove(caminho)
+        tmp = os.path.join(self.diretorio, f'.{INDICE}.tmp')
+        with open(tmp, 'w', encoding='utf-8') as f:
+            f.writelines(json.dumps(registro) + '\n' for registro in registros)
+        os.replace(tmp, os.path.join(self.diretorio, INDICE))
+
+    def _ler_indice(self) -> List[dict]:
+        try:
+            with open(os.path.join(self.diretorio, INDICE), encoding='utf-8') as f:
+                return [json.loads(linha) for linha in f if linha.strip()]
+        except FileNotFoundError:
+            return []
+
+    def listar(self, limit: int = 50, rota: Optional[str] = None) -> List[dict]:
+        """Perfis mais recentes primeiro"""
+        with self._lock:
+            registros = self._ler_indice()
+        if rota:
+            registros = [r for r in registros if r['rota'] == rota]
+        return registros[::-1][:limit]
+
+    def caminho(self, nome: str, formato: str) -> Optional[str]:
+        """Arquivo do perfil, ou None se o nome ou o formato forem inválidos"""
+        if formato not in FORMATOS or not _NOME_PERFIL.match(nome):
+            return None
+        caminho = os.path.join(self.diretorio, nome + FORMATOS[formato])
+        return caminho if os.path.isfile(caminho) else None
+
+
+def _rota(scope) -> str:
+    route = scope.get('route')
+    return getattr(route, 'path', None) or scope['path']
+
+
+class PerfilamentoMiddleware:
+    """Middleware ASGI: perfila requisições amostradas ou pedidas pelo header"""
+
+    def __init__(
+        self,
+        app,
+        armazem: ArmazemPerfis,
+        amostragem: float = 0.0,
+        token: Optional[str] = None,
+        intervalo: float = 0.002,
+    ):
+        self.app = app
+        self.armazem = armazem
+        self.amostragem = amostragem
+        self.token = token
+        self.intervalo = intervalo
+        self._ocupado = False
+
+    def _perfilar(self, scope) -> bool:
+        if self._ocupado:
+            return False
+        if self.token and Headers(scope=scope).get(HEADER_PERFILAR) == self.token:
+            return True
+        return self.amostragem > 0 and random.random() < self.amostragem
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http' or not self._perfilar(scope):
+            await self.app(scope, receive, send)
+            return
+
+        self._ocupado = True
+        inicio = datetime.now()
+        nome = f'{inicio:%Y%m%dT%H%M%S%f}-{scope["method"].lower()}'
+        status = None
+
+        async def enviar(message):
+            nonlocal status
+            if message['type'] == 'http.response.start':
+                status = message['status']
+                MutableHeaders(raw=message['headers'])[HEADER_PERFIL] = nome
+            await send(message)
+
+        amostrador = Amostrador(self.intervalo)
+        amostrador.start()
+        comeco = time.perf_counter()
+        try:
+            await self.app(scope, receive, enviar)
+        finally:
+            duracao = time.perf_counter() - comeco
+            amostrador.parar()
+            self._ocupado = False
+            metadados = {
+                'nome': nome,
+                'data': inicio.isoformat(),
+                'metodo': scope['method'],
+                'rota': _rota(scope),
+                'caminho': scope['path'],
+                'status': status,
+                'duracao': duracao,
+            }
+            try:
+                await run_in_threadpool(self.armazem.salvar, amostrador, metadados)
+            except Exception as e:
+                logger.error(f'Erro ao gravar perfil {nome}: {str(e)}')
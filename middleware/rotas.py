@@ -0,0 +1,43 @@
+from enum import Enum
+
+
+class ClasseRota(str, Enum):
+    """Custo aproximado de uma rota, usado nos limites de taxa e na admissão"""
+
+    LEVE = 'leve'
+    LEITURA = 'leitura'
+    CARA = 'cara'
+    ESCRITA = 'escrita'
+    STREAM = 'stream'
+
+
+# Respondidas sem banco de dados
+ROTAS_LEVES = {
+    '/',
+    '/docs',
+    '/redoc',
+    '/openapi.json',
+    '/metricas/payload',
+    '/metricas/consultas-lentas',
+    '/perfilamento/',
+}
+# Buscas e contagens: as primeiras a serem recusadas sob carga
+SUFIXOS_CAROS = ('/search', '/count')
+# Análises: a primeira chamada de cada fonte carrega todos os empréstimos
+PREFIXOS_CAROS = ('/analytics/',)
+# Conexões longas (SSE e long-poll), que passam a maior parte do tempo ociosas
+SUFIXOS_STREAM = ('/stream', '/eventos', '/aguardar')
+
+METODOS_LEITURA = {'GET', 'HEAD', 'OPTIONS'}
+
+
+def classificar(method: str, path: str) -> ClasseRota:
+    if method not in METODOS_LEITURA:
+        return ClasseRota.ESCRITA
+    if path in ROTAS_LEVES:
+        return ClasseRota.LEVE
+    if path.endswith(SUFIXOS_CAROS) or path.startswith(PREFIXOS_CAROS):
+        return ClasseRota.CARA
+    if path.endswith(SUFIXOS_STREAM):
+        return ClasseRota.STREAM
+    return ClasseRota.LEITURA
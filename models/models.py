@@ -2,12 +2,18 @@ from datetime import date, datetime
 from enum import Enum
 from typing import List, Optional
 
+from sqlalchemy import JSON, Column, Index, text
 from sqlmodel import Field, Relationship, SQLModel
 
 
 # Tabela de associação para relacionamento N:N entre Livro e Autor
 class LivroAutorLink(SQLModel, table=True):
     __tablename__ = 'livro_autor'
+    __table_args__ = (
+        # A chave primária começa por livro_id; este índice atende o caminho
+        # inverso (livros de um autor)
+        Index('ix_livro_autor_autor_livro', 'autor_id', 'livro_id'),
+    )
 
     livro_id: Optional[int] = Field(
         default=None, foreign_key='livro.id', primary_key=True
@@ -20,6 +26,10 @@ class LivroAutorLink(SQLModel, table=True):
 # Tabela de associação para relacionamento N:N entre Livro e Categoria
 class LivroCategoriaLink(SQLModel, table=True):
     __tablename__ = 'livro_categoria'
+    __table_args__ = (
+        # Caminho inverso da chave primária (livros de uma categoria)
+        Index('ix_livro_categoria_categoria_livro', 'categoria_id', 'livro_id'),
+    )
 
     livro_id: Optional[int] = Field(
         default=None, foreign_key='livro.id', primary_key=True
@@ -35,6 +45,27 @@ class StatusEmprestimo(str, Enum):
     ATRASADO = 'atrasado'
 
 
+class OperacaoEvento(str, Enum):
+    CREATE = 'create'
+    UPDATE = 'update'
+    DELETE = 'delete'
+
+
+class StatusReserva(str, Enum):
+    AGUARDANDO = 'aguardando'
+    DISPONIVEL = 'disponivel'
+    ATENDIDA = 'atendida'
+    CANCELADA = 'cancelada'
+    EXPIRADA = 'expirada'
+
+
+class StatusTarefa(str, Enum):
+    PENDENTE = 'pendente'
+    EXECUTANDO = 'executando'
+    CONCLUIDA = 'concluida'
+    FALHOU = 'falhou'
+
+
 # Entidade 1: Autor
 class Autor(SQLModel, table=True):
     __tablename__ = 'autor'
@@ -91,6 +122,21 @@ class Usuario(SQLModel, table=True):
 # Entidade 4: Livro
 class Livro(SQLModel, table=True):
     __tablename__ = 'livro'
+    __table_args__ = (
+        # Índice parcial só com os livros disponíveis (GET /livros/disponiveis)
+        Index(
+            'ix_livro_disponivel',
+            'id',
+            postgresql_where=text('quantidade_disponivel > 0'),
+            sqlite_where=text('quantidade_disponivel > 0'),
+            postgresql_include=[
+                'titulo',
+                'ano_publicacao',
+                'editora',
+                'quantidade_disponivel',
+            ],
+        ),
+    )
 
     id: Optional[int] = Field(default=None, primary_key=True)
     titulo: str = Field(max_length=200)
@@ -101,6 +147,16 @@ class Livro(SQLModel, table=True):
     quantidade_total: int = Field(default=1)
     quantidade_disponivel: int = Field(default=1)
     data_adicao: datetime = Field(default_factory=datetime.now)
+    # Cópia dos nomes de autores e categorias para listagens sem joins;
+    # mantida por LivroService, AutorService e CategoriaService
+    autores_nomes: List[str] = Field(
+        default_factory=list,
+        sa_column=Column(JSON, nullable=False, server_default='[]'),
+    )
+    categorias_nomes: List[str] = Field(
+        default_factory=list,
+        sa_column=Column(JSON, nullable=False, server_default='[]'),
+    )
 
     # Relacionamentos N:N
     autores: List[Autor] = Relationship(
@@ -117,6 +173,24 @@ class Livro(SQLModel, table=True):
 # Entidade 5: Emprestimo
 class Emprestimo(SQLModel, table=True):
     __tablename__ = 'emprestimo'
+    __table_args__ = (
+        # Histórico do usuário (GET /usuarios/{id}/emprestimos): uma varredura
+        # de faixa no índice, em ordem decrescente de data (o id no fim da
+        # chave desempata a paginação sem ordenação extra); no PostgreSQL as
+        # demais colunas do resumo ficam no INCLUDE (index-only scan)
+        Index(
+            'ix_emprestimo_usuario_data_status',
+            'usuario_id',
+            'data_emprestimo',
+            'status',
+            'id',
+            postgresql_include=[
+                'livro_id',
+                'data_devolucao_prevista',
+                'data_devolucao_real',
+            ],
+        ),
+    )
 
     id: Optional[int] = Field(default=None, primary_key=True)
     data_emprestimo: datetime = Field(default_factory=datetime.now)
@@ -134,6 +208,44 @@ class Emprestimo(SQLModel, table=True):
     livro: Livro = Relationship(back_populates='emprestimos')
 
 
+# Armazenamento frio: empréstimos devolvidos há anos, movidos de ``emprestimo``
+# pelo arquivamento (services/particao_service.py) com o mesmo id
+class EmprestimoArquivo(SQLModel, table=True):
+    __tablename__ = 'emprestimo_arquivo'
+
+    id: int = Field(primary_key=True, sa_column_kwargs={'autoincrement': False})
+    data_emprestimo: datetime
+    data_devolucao_prevista: date
+    data_devolucao_real: Optional[date] = Field(default=None)
+    status: StatusEmprestimo
+    observacoes: Optional[str] = Field(default=None)
+    usuario_id: int = Field(foreign_key='usuario.id', index=True)
+    livro_id: int = Field(foreign_key='livro.id', index=True)
+    data_arquivamento: datetime = Field(default_factory=datetime.now)
+
+
+# Fila de espera por livros indisponíveis
+class Reserva(SQLModel, table=True):
+    __tablename__ = 'reserva'
+    __table_args__ = (
+        # Próximo da fila de um livro: primeira entrada do índice na faixa
+        # (livro_id, 'aguardando')
+        Index('ix_reserva_livro_status_posicao', 'livro_id', 'status', 'posicao'),
+    )
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    posicao: int
+    status: StatusReserva = Field(default=StatusReserva.AGUARDANDO)
+    data_criacao: datetime = Field(default_factory=datetime.now)
+    # Quando um exemplar foi separado para o usuário e até quando fica separado
+    data_disponibilidade: Optional[datetime] = Field(default=None)
+    expira_em: Optional[datetime] = Field(default=None)
+
+    # Foreign Keys
+    usuario_id: int = Field(foreign_key='usuario.id', index=True)
+    livro_id: int = Field(foreign_key='livro.id')
+
+
 # Entidade adicional para relacionamento 1:1
 class PerfilUsuario(SQLModel, table=True):
     __tablename__ = 'perfil_usuario'
@@ -150,3 +262,43 @@ class PerfilUsuario(SQLModel, table=True):
 
     # Relacionamento 1:1
     usuario: Usuario = Relationship(back_populates='perfil')
+
+
+# Registro de alterações (outbox), gravado na mesma transação da alteração;
+# o id é o offset do feed de mudanças
+class Evento(SQLModel, table=True):
+    __tablename__ = 'evento'
+    __table_args__ = (Index('ix_evento_entidade_id', 'entidade', 'id'),)
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    entidade: str = Field(max_length=50)
+    entidade_id: int
+    operacao: OperacaoEvento
+    # Estado da linha após a alteração (None em exclusões)
+    dados: Optional[dict] = Field(default=None, sa_column=Column(JSON))
+    data_criacao: datetime = Field(default_factory=datetime.now)
+
+
+# Trabalho em segundo plano, enfileirado na mesma transação de quem o pede e
+# executado pelo executor de tarefas (services/tarefa_service.py)
+class Tarefa(SQLModel, table=True):
+    __tablename__ = 'tarefa'
+    __table_args__ = (
+        # Próximas tarefas a executar: faixa (status, executar_em <= agora)
+        Index('ix_tarefa_status_executar_em', 'status', 'executar_em'),
+    )
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    tipo: str = Field(max_length=100)
+    dados: Optional[dict] = Field(default=None, sa_column=Column(JSON))
+    status: StatusTarefa = Field(default=StatusTarefa.PENDENTE)
+    # Pendente: quando pode ser executada; executando: fim do prazo de
+    # execução, após o qual outro executor pode retomá-la
+    executar_em: datetime = Field(default_factory=datetime.now)
+    tentativas: int = Field(default=0)
+    max_tentativas: int = Field(default=5)
+    # Evita enfileirar de novo uma tarefa que já está pendente
+    chave: Optional[str] = Field(default=None, max_length=200, index=True)
+    erro: Optional[str] = Field(default=None)
+    data_criacao: datetime = Field(default_factory=datetime.now)
+    data_conclusao: Optional[datetime] = Field(default=None)
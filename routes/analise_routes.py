@@ -0,0 +1,107 @@
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from sqlmodel import Session
+
+from config.database import get_session
+from config.logging_config import logger
+from schemas.schemas import (
+    AnaliseResponse,
+    AtrasosUsuarios,
+    CirculacaoCategoriaItem,
+    DuracaoEmprestimos,
+)
+from services import analise_service
+from services.analise_service import AnaliseService
+
+router = APIRouter(prefix='/analytics', tags=['analytics'])
+
+MES = r'^\d{4}-\d{2}$'
+
+
+def _calcular(request: Request, session: Session, metrica, fonte: str, **parametros):
+    settings = request.app.state.settings
+    return AnaliseService.calcular(
+        session,
+        metrica,
+        fonte,
+        settings.exportacao_dir,
+        settings.exportacao_formato,
+        **parametros,
+    )
+
+
+@router.get(
+    '/circulacao-categorias',
+    response_model=AnaliseResponse[List[CirculacaoCategoriaItem]],
+)
+def circulacao_categorias(
+    request: Request,
+    desde: Optional[str] = Query(None, pattern=MES, description='Mês inicial (AAAA-MM)'),
+    ate: Optional[str] = Query(None, pattern=MES, description='Mês final (AAAA-MM)'),
+    fonte: str = Query('banco', pattern='^(banco|snapshot)$'),
+    session: Session = Depends(get_session),
+):
+    """Empréstimos por categoria e mês"""
+    try:
+        return _calcular(
+            request,
+            session,
+            analise_service.circulacao_por_categoria,
+            fonte,
+            desde=desde,
+            ate=ate,
+        )
+    except Exception as e:
+        logger.error(f'Erro no endpoint circulacao_categorias: {str(e)}')
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.get('/duracao-emprestimos', response_model=AnaliseResponse[DuracaoEmprestimos])
+def duracao_emprestimos(
+    request: Request,
+    desde: Optional[str] = Query(None, pattern=MES, description='Mês inicial (AAAA-MM)'),
+    ate: Optional[str] = Query(None, pattern=MES, description='Mês final (AAAA-MM)'),
+    fonte: str = Query('banco', pattern='^(banco|snapshot)$'),
+    session: Session = Depends(get_session),
+):
+    """Duração dos empréstimos devolvidos: média, mediana, p90 e média por mês"""
+    try:
+        return _calcular(
+            request,
+            session,
+            analise_service.duracao_emprestimos,
+            fonte,
+            desde=desde,
+            ate=ate,
+        )
+    except Exception as e:
+        logger.error(f'Erro no endpoint duracao_emprestimos: {str(e)}')
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.get('/atrasos-usuarios', response_model=AnaliseResponse[AtrasosUsuarios])
+def atrasos_usuarios(
+    request: Request,
+    minimo: int = Query(5, ge=1, description='Devoluções mínimas do usuário'),
+    limit: int = Query(50, ge=1, le=500, description='Quantidade de usuários'),
+    desde: Optional[str] = Query(None, pattern=MES, description='Mês inicial (AAAA-MM)'),
+    ate: Optional[str] = Query(None, pattern=MES, description='Mês final (AAAA-MM)'),
+    fonte: str = Query('banco', pattern='^(banco|snapshot)$'),
+    session: Session = Depends(get_session),
+):
+    """Usuários com maior fração de devoluções em atraso"""
+    try:
+        return _calcular(
+            request,
+            session,
+            analise_service.atrasos_por_usuario,
+            fonte,
+            minimo=minimo,
+            limit=limit,
+            desde=desde,
+            ate=ate,
+        )
+    except Exception as e:
+        logger.error(f'Erro no endpoint atrasos_usuarios: {str(e)}')
+        raise HTTPException(status_code=400, detail=str(e))
@@ -1,4 +1,4 @@
-from typing import List, Optional
+from typing import Optional
 
 from config.database import get_session
 from config.logging_config import logger
@@ -7,10 +7,14 @@ from schemas.schemas import (
     AutorCreate,
     AutorResponse,
     AutorUpdate,
+    ChangesResponse,
     CountResponse,
     PaginatedResponse,
+    SearchResponse,
 )
 from services.autor_service import AutorService
+from services.evento_service import EventoService
+from services.pagination import SEARCH_MAX_LIMIT
 from sqlmodel import Session
 
 router = APIRouter(prefix='/autores', tags=['autores'])
@@ -64,21 +68,62 @@ def count_autores(session: Session = Depends(get_session)):
         raise HTTPException(status_code=400, detail=str(e))
 
 
-@router.get('/search', response_model=List[AutorResponse])
+@router.get('/search', response_model=SearchResponse[AutorResponse])
 def search_autores(
     nome: Optional[str] = Query(None, description='Buscar por nome ou sobrenome'),
     nacionalidade: Optional[str] = Query(None, description='Filtrar por nacionalidade'),
+    page: int = Query(1, ge=1, description='Número da página'),
+    limit: int = Query(
+        10, ge=1, le=SEARCH_MAX_LIMIT, description='Limite de itens por página'
+    ),
+    cursor: Optional[str] = Query(
+        None, description='Cursor retornado em next_cursor (substitui page)'
+    ),
+    include_total: bool = Query(
+        False, description='Calcular o total de resultados (consulta extra)'
+    ),
     session: Session = Depends(get_session),
 ):
     """F6: Filtrar autores por atributos específicos"""
     try:
-        autores = AutorService.search_autores(session, nome, nacionalidade)
-        return [AutorResponse.model_validate(autor) for autor in autores]
+        skip = (page - 1) * limit
+        result = AutorService.search_autores(
+            session,
+            nome,
+            nacionalidade,
+            skip=skip,
+            limit=limit,
+            cursor=cursor,
+            include_total=include_total,
+        )
+        return SearchResponse[AutorResponse](
+            items=[AutorResponse.model_validate(item) for item in result['items']],
+            page=result['page'],
+            limit=result['limit'],
+            has_more=result['has_more'],
+            next_cursor=result['next_cursor'],
+            total=result['total'],
+            total_pages=result['total_pages'],
+        )
     except Exception as e:
         logger.error(f'Erro no endpoint search_autores: {str(e)}')
         raise HTTPException(status_code=400, detail=str(e))
 
 
+@router.get('/changes', response_model=ChangesResponse)
+def changes_autores(
+    since: int = Query(0, ge=0, description='Token da última sincronização'),
+    limit: int = Query(500, ge=1, le=1000, description='Limite de eventos lidos'),
+    session: Session = Depends(get_session),
+):
+    """Sincronização incremental: autores criados, alterados e excluídos"""
+    try:
+        return ChangesResponse(**EventoService.alteracoes(session, 'autor', since, limit))
+    except Exception as e:
+        logger.error(f'Erro no endpoint changes_autores: {str(e)}')
+        raise HTTPException(status_code=400, detail=str(e))
+
+
 @router.get('/{autor_id}', response_model=AutorResponse)
 def get_autor(autor_id: int, session: Session = Depends(get_session)):
     """F3: Ler um autor específico"""
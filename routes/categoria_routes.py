@@ -1,4 +1,4 @@
-from typing import List, Optional
+from typing import Optional
 
 from config.database import get_session
 from config.logging_config import logger
@@ -7,10 +7,14 @@ from schemas.schemas import (
     CategoriaCreate,
     CategoriaResponse,
     CategoriaUpdate,
+    ChangesResponse,
     CountResponse,
     PaginatedResponse,
+    SearchResponse,
 )
 from services.categoria_service import CategoriaService
+from services.evento_service import EventoService
+from services.pagination import SEARCH_MAX_LIMIT
 from sqlmodel import Session
 
 router = APIRouter(prefix='/categorias', tags=['categorias'])
@@ -63,21 +67,64 @@ def count_categorias(session: Session = Depends(get_session)):
         raise HTTPException(status_code=400, detail=str(e))
 
 
-@router.get('/search', response_model=List[CategoriaResponse])
+@router.get('/search', response_model=SearchResponse[CategoriaResponse])
 def search_categorias(
     nome: Optional[str] = Query(None, description='Buscar por nome'),
     ativa: Optional[bool] = Query(None, description='Filtrar por status ativo'),
+    page: int = Query(1, ge=1, description='Número da página'),
+    limit: int = Query(
+        10, ge=1, le=SEARCH_MAX_LIMIT, description='Limite de itens por página'
+    ),
+    cursor: Optional[str] = Query(
+        None, description='Cursor retornado em next_cursor (substitui page)'
+    ),
+    include_total: bool = Query(
+        False, description='Calcular o total de resultados (consulta extra)'
+    ),
     session: Session = Depends(get_session),
 ):
     """F6: Filtrar categorias por atributos específicos"""
     try:
-        categorias = CategoriaService.search_categorias(session, nome, ativa)
-        return [CategoriaResponse.model_validate(categoria) for categoria in categorias]
+        skip = (page - 1) * limit
+        result = CategoriaService.search_categorias(
+            session,
+            nome,
+            ativa,
+            skip=skip,
+            limit=limit,
+            cursor=cursor,
+            include_total=include_total,
+        )
+        return SearchResponse[CategoriaResponse](
+            items=[CategoriaResponse.model_validate(item) for item in result['items']],
+            page=result['page'],
+            limit=result['limit'],
+            has_more=result['has_more'],
+            next_cursor=result['next_cursor'],
+            total=result['total'],
+            total_pages=result['total_pages'],
+        )
     except Exception as e:
         logger.error(f'Erro no endpoint search_categorias: {str(e)}')
         raise HTTPException(status_code=400, detail=str(e))
 
 
+@router.get('/changes', response_model=ChangesResponse)
+def changes_categorias(
+    since: int = Query(0, ge=0, description='Token da última sincronização'),
+    limit: int = Query(500, ge=1, le=1000, description='Limite de eventos lidos'),
+    session: Session = Depends(get_session),
+):
+    """Sincronização incremental: categorias criados, alterados e excluídos"""
+    try:
+        return ChangesResponse(
+            **EventoService.alteracoes(session, 'categoria', since, limit)
+        )
+    except Exception as e:
+        logger.error(f'Erro no endpoint changes_categorias: {str(e)}')
+        raise HTTPException(status_code=400, detail=str(e))
+
+
 @router.get('/{categoria_id}', response_model=CategoriaResponse)
 def get_categoria(categoria_id: int, session: Session = Depends(get_session)):
     """F3: Ler uma categoria específica"""
@@ -1,18 +1,25 @@
 from datetime import date
-from typing import List, Optional
+from typing import Optional
 
 from config.database import get_session
 from config.logging_config import logger
 from fastapi import APIRouter, Depends, HTTPException, Query
 from models.models import StatusEmprestimo
 from schemas.schemas import (
+    ChangesResponse,
     CountResponse,
+    DevolucaoLote,
     EmprestimoCreate,
+    EmprestimoLoteCreate,
     EmprestimoResponse,
     EmprestimoUpdate,
+    LoteResponse,
     PaginatedResponse,
+    SearchResponse,
 )
 from services.emprestimo_service import EmprestimoService
+from services.evento_service import EventoService
+from services.pagination import SEARCH_MAX_LIMIT
 from sqlmodel import Session
 
 router = APIRouter(prefix='/emprestimos', tags=['emprestimos'])
@@ -30,7 +37,29 @@ def create_emprestimo(
         raise HTTPException(status_code=400, detail=str(e))
 
 
-@router.get('/', response_model=PaginatedResponse)
+@router.post('/lote', response_model=LoteResponse)
+def create_emprestimos_lote(
+    lote: EmprestimoLoteCreate, session: Session = Depends(get_session)
+):
+    """Emprestar vários livros a um usuário em uma única transação"""
+    try:
+        return LoteResponse(**EmprestimoService.create_emprestimos_lote(session, lote))
+    except Exception as e:
+        logger.error(f'Erro no endpoint create_emprestimos_lote: {str(e)}')
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.post('/lote/devolucao', response_model=LoteResponse)
+def devolver_lote(lote: DevolucaoLote, session: Session = Depends(get_session)):
+    """Devolver vários empréstimos em uma única transação"""
+    try:
+        return LoteResponse(**EmprestimoService.devolver_lote(session, lote))
+    except Exception as e:
+        logger.error(f'Erro no endpoint devolver_lote: {str(e)}')
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.get('/', response_model=PaginatedResponse[EmprestimoResponse])
 def list_emprestimos(
     page: int = Query(1, ge=1, description='Número da página'),
     limit: int = Query(10, ge=1, le=100, description='Limite de itens por página'),
@@ -39,18 +68,8 @@ def list_emprestimos(
     """F2 e F5: Listar todos os empréstimos com paginação"""
     try:
         skip = (page - 1) * limit
-        result = EmprestimoService.get_all_emprestimos(session, skip, limit)
-
-        return PaginatedResponse(
-            items=[
-                EmprestimoResponse.model_validate(emprestimo)
-                for emprestimo in result['items']
-            ],
-            total=result['total'],
-            page=result['page'],
-            limit=result['limit'],
-            total_pages=result['total_pages'],
-        )
+        # Dicts lidos direto das colunas, validados uma vez pelo response_model
+        return EmprestimoService.get_all_emprestimos(session, skip, limit, leve=True)
     except Exception as e:
         logger.error(f'Erro no endpoint list_emprestimos: {str(e)}')
         raise HTTPException(status_code=400, detail=str(e))
@@ -67,28 +86,68 @@ def count_emprestimos(session: Session = Depends(get_session)):
         raise HTTPException(status_code=400, detail=str(e))
 
 
-@router.get('/search', response_model=List[EmprestimoResponse])
+@router.get('/search', response_model=SearchResponse[EmprestimoResponse])
 def search_emprestimos(
     usuario_id: Optional[int] = Query(None, description='Filtrar por usuário'),
     livro_id: Optional[int] = Query(None, description='Filtrar por livro'),
     status: Optional[StatusEmprestimo] = Query(None, description='Filtrar por status'),
     data_inicio: Optional[date] = Query(None, description='Data início do período'),
     data_fim: Optional[date] = Query(None, description='Data fim do período'),
+    page: int = Query(1, ge=1, description='Número da página'),
+    limit: int = Query(
+        10, ge=1, le=SEARCH_MAX_LIMIT, description='Limite de itens por página'
+    ),
+    cursor: Optional[str] = Query(
+        None, description='Cursor retornado em next_cursor (substitui page)'
+    ),
+    include_total: bool = Query(
+        False, description='Calcular o total de resultados (consulta extra)'
+    ),
+    incluir_arquivados: bool = Query(
+        False, description='Incluir empréstimos antigos movidos para o arquivo'
+    ),
     session: Session = Depends(get_session),
 ):
     """F6: Filtrar empréstimos por atributos específicos"""
     try:
-        emprestimos = EmprestimoService.search_emprestimos(
-            session, usuario_id, livro_id, status, data_inicio, data_fim
+        skip = (page - 1) * limit
+        result = EmprestimoService.search_emprestimos(
+            session,
+            usuario_id,
+            livro_id,
+            status,
+            data_inicio,
+            data_fim,
+            skip=skip,
+            limit=limit,
+            cursor=cursor,
+            include_total=include_total,
+            incluir_arquivados=incluir_arquivados,
+            leve=True,
         )
-        return [
-            EmprestimoResponse.model_validate(emprestimo) for emprestimo in emprestimos
-        ]
+        # Dicts lidos direto das colunas, validados uma vez pelo response_model
+        return result
     except Exception as e:
         logger.error(f'Erro no endpoint search_emprestimos: {str(e)}')
         raise HTTPException(status_code=400, detail=str(e))
 
 
+@router.get('/changes', response_model=ChangesResponse)
+def changes_emprestimos(
+    since: int = Query(0, ge=0, description='Token da última sincronização'),
+    limit: int = Query(500, ge=1, le=1000, description='Limite de eventos lidos'),
+    session: Session = Depends(get_session),
+):
+    """Sincronização incremental: empréstimos criados, alterados e excluídos"""
+    try:
+        return ChangesResponse(
+            **EventoService.alteracoes(session, 'emprestimo', since, limit)
+        )
+    except Exception as e:
+        logger.error(f'Erro no endpoint changes_emprestimos: {str(e)}')
+        raise HTTPException(status_code=400, detail=str(e))
+
+
 @router.get('/{emprestimo_id}', response_model=EmprestimoResponse)
 def get_emprestimo(emprestimo_id: int, session: Session = Depends(get_session)):
     """F3: Ler um empréstimo específico"""
@@ -0,0 +1,145 @@
+import asyncio
+from typing import List, Optional
+
+from fastapi import (
+    APIRouter,
+    Depends,
+    Header,
+    HTTPException,
+    Query,
+    Request,
+    WebSocket,
+    WebSocketDisconnect,
+)
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from sqlmodel import Session
+
+from config.database import get_session
+from config.logging_config import logger
+from schemas.schemas import EventoResponse, EventosResponse
+from services.evento_service import (
+    CHAVE_NOTIFICACAO,
+    EventoService,
+    notificador_eventos,
+)
+
+router = APIRouter(prefix='/eventos', tags=['eventos'])
+
+# Eventos por lote enviados no stream
+LOTE_STREAM = 100
+# Intervalo para reconsultar o banco sem aviso (eventos de outros workers)
+INTERVALO_VERIFICACAO = 2
+# Comentário enviado no SSE para manter a conexão aberta em proxies
+INTERVALO_HEARTBEAT = 15
+
+
+def _ler(session: Session, desde: int, entidades: Optional[List[str]]):
+    try:
+        eventos, proximo = EventoService.listar(session, desde, LOTE_STREAM, entidades)
+        return [EventoResponse.model_validate(evento) for evento in eventos], proximo
+    finally:
+        # Encerra a transação: libera a conexão e a próxima leitura vê mudanças
+        session.rollback()
+
+
+async def _feed(session: Session, desde: int, entidades: Optional[List[str]]):
+    """Gera lotes de eventos a partir de ``desde``; lote vazio = sem novidades"""
+    while True:
+        eventos, desde = await run_in_threadpool(_ler, session, desde, entidades)
+        yield eventos
+        if len(eventos) < LOTE_STREAM:
+            await notificador_eventos.aguardar(CHAVE_NOTIFICACAO, INTERVALO_VERIFICACAO)
+
+
+@router.get('/', response_model=EventosResponse)
+def list_eventos(
+    desde: int = Query(0, ge=0, description='Último offset recebido'),
+    limit: int = Query(100, ge=1, le=1000, description='Limite de eventos'),
+    entidade: Optional[List[str]] = Query(None, description='Filtrar por entidade'),
+    session: Session = Depends(get_session),
+):
+    """Eventos de criação, alteração e exclusão após o offset ``desde``"""
+    try:
+        eventos, proximo = EventoService.listar(session, desde, limit, entidade)
+        return EventosResponse(
+            items=[EventoResponse.model_validate(evento) for evento in eventos],
+            proximo=proximo,
+        )
+    except Exception as e:
+        logger.error(f'Erro no endpoint list_eventos: {str(e)}')
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.get('/stream')
+async def stream_eventos(
+    request: Request,
+    desde: Optional[int] = Query(None, ge=0, description='Último offset recebido'),
+    entidade: Optional[List[str]] = Query(None, description='Filtrar por entidade'),
+    last_event_id: Optional[int] = Header(None),
+):
+    """SSE: eventos a partir do offset; reconexões retomam pelo Last-Event-ID"""
+    inicio = last_event_id if last_event_id is not None else (desde or 0)
+
+    async def stream():
+        # Sessão própria: o stream continua depois que as dependências terminam
+        session = Session(request.app.state.engine)
+        loop = asyncio.get_running_loop()
+        ultimo_envio = loop.time()
+        try:
+            async for eventos in _feed(session, inicio, entidade):
+                if await request.is_disconnected():
+                    break
+                for evento in eventos:
+                    yield (
+                        f'id: {evento.id}\nevent: {evento.entidade}\n'
+                        f'data: {evento.model_dump_json()}\n\n'
+                    )
+                    ultimo_envio = loop.time()
+                if not eventos and loop.time() - ultimo_envio >= INTERVALO_HEARTBEAT:
+                    yield ': keep-alive\n\n'
+                    ultimo_envio = loop.time()
+        finally:
+            session.close()
+
+    return StreamingResponse(
+        stream(),
+        media_type='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'},
+    )
+
+
+@router.websocket('/ws')
+async def websocket_eventos(
+    websocket: WebSocket,
+    desde: int = Query(0, ge=0),
+    entidade: Optional[List[str]] = Query(None),
+):
+    """WebSocket: envia cada evento como JSON a partir do offset ``desde``"""
+    await websocket.accept()
+    session = Session(websocket.app.state.engine)
+
+    async def enviar():
+        async for eventos in _feed(session, desde, entidade):
+            for evento in eventos:
+                await websocket.send_text(evento.model_dump_json())
+
+    async def receber():
+        # Mensagens do cliente são ignoradas; serve para detectar o fechamento
+        while True:
+            await websocket.receive_text()
+
+    tarefas = [asyncio.create_task(enviar()), asyncio.create_task(receber())]
+    try:
+        done, _ = await asyncio.wait(tarefas, return_when=asyncio.FIRST_COMPLETED)
+        for tarefa in done:
+            tarefa.result()
+    except WebSocketDisconnect:
+        pass
+    except Exception as e:
+        logger.error(f'Erro no websocket de eventos: {str(e)}')
+        await websocket.close(code=1011)
+    finally:
+        for tarefa in tarefas:
+            tarefa.cancel()
+        session.close()
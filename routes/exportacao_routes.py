@@ -0,0 +1,22 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlmodel import Session
+
+from config.database import get_session
+from config.logging_config import logger
+from schemas.schemas import TarefaResponse
+from services.exportacao_service import ExportacaoService
+
+router = APIRouter(prefix='/exportacoes', tags=['exportacoes'])
+
+
+@router.post('/emprestimos', response_model=TarefaResponse, status_code=202)
+def exportar_emprestimos(
+    completo: bool = Query(False, description='Reexportar todos os dias'),
+    session: Session = Depends(get_session),
+):
+    """Agenda a exportação dos empréstimos para Parquet/Arrow (segundo plano)"""
+    try:
+        return ExportacaoService.agendar(session, completo)
+    except Exception as e:
+        logger.error(f'Erro no endpoint exportar_emprestimos: {str(e)}')
+        raise HTTPException(status_code=400, detail=str(e))
@@ -1,16 +1,22 @@
-from typing import List, Optional
+from typing import Optional
 
 from config.database import get_session
 from config.logging_config import logger
 from fastapi import APIRouter, Depends, HTTPException, Query
 from schemas.schemas import (
+    ChangesResponse,
     CountResponse,
     LivroCreate,
+    LivroDisponivel,
     LivroResponse,
+    LivroResumo,
     LivroUpdate,
     PaginatedResponse,
+    SearchResponse,
 )
+from services.evento_service import EventoService
 from services.livro_service import LivroService
+from services.pagination import SEARCH_MAX_LIMIT
 from sqlmodel import Session
 
 router = APIRouter(prefix='/livros', tags=['livros'])
@@ -40,19 +46,8 @@ def list_livros(
     """F2 e F5: Listar todos os livros com paginação"""
     try:
         skip = (page - 1) * limit
-        result = LivroService.get_all_livros(session, skip, limit)
-
-        livros_response = [
-            LivroResponse.model_validate(livro) for livro in result['items']
-        ]
-
-        return PaginatedResponse[LivroResponse](
-            items=livros_response,
-            total=result['total'],
-            page=result['page'],
-            limit=result['limit'],
-            total_pages=result['total_pages'],
-        )
+        # Dicts lidos direto das colunas, validados uma vez pelo response_model
+        return LivroService.get_all_livros(session, skip, limit, leve=True)
     except Exception as e:
         logger.error(f'Erro no endpoint list_livros: {str(e)}')
         raise HTTPException(status_code=400, detail=str(e))
@@ -69,26 +64,123 @@ def count_livros(session: Session = Depends(get_session)):
         raise HTTPException(status_code=400, detail=str(e))
 
 
-@router.get('/search', response_model=List[LivroResponse])
+@router.get('/search', response_model=SearchResponse[LivroResponse])
 def search_livros(
     titulo: Optional[str] = Query(None, description='Buscar por título'),
     autor: Optional[str] = Query(None, description='Filtrar por autor'),
     categoria: Optional[str] = Query(None, description='Filtrar por categoria'),
     ano_min: Optional[int] = Query(None, description='Ano mínimo de publicação'),
     ano_max: Optional[int] = Query(None, description='Ano máximo de publicação'),
+    page: int = Query(1, ge=1, description='Número da página'),
+    limit: int = Query(
+        10, ge=1, le=SEARCH_MAX_LIMIT, description='Limite de itens por página'
+    ),
+    cursor: Optional[str] = Query(
+        None, description='Cursor retornado em next_cursor (substitui page)'
+    ),
+    include_total: bool = Query(
+        False, description='Calcular o total de resultados (consulta extra)'
+    ),
     session: Session = Depends(get_session),
 ):
     """F6: Filtrar livros por atributos específicos"""
     try:
-        livros = LivroService.search_livros(
-            session, titulo, autor, categoria, ano_min, ano_max
+        skip = (page - 1) * limit
+        result = LivroService.search_livros(
+            session,
+            titulo,
+            autor,
+            categoria,
+            ano_min,
+            ano_max,
+            skip=skip,
+            limit=limit,
+            cursor=cursor,
+            include_total=include_total,
+            leve=True,
         )
-        return [LivroResponse.model_validate(livro) for livro in livros]
+        # Dicts lidos direto das colunas, validados uma vez pelo response_model
+        return result
     except Exception as e:
         logger.error(f'Erro no endpoint search_livros: {str(e)}')
         raise HTTPException(status_code=400, detail=str(e))
 
 
+@router.get('/resumo', response_model=SearchResponse[LivroResumo])
+def list_livros_resumo(
+    titulo: Optional[str] = Query(None, description='Buscar por título'),
+    page: int = Query(1, ge=1, description='Número da página'),
+    limit: int = Query(
+        20, ge=1, le=SEARCH_MAX_LIMIT, description='Limite de itens por página'
+    ),
+    cursor: Optional[str] = Query(
+        None, description='Cursor retornado em next_cursor (substitui page)'
+    ),
+    session: Session = Depends(get_session),
+):
+    """Listagem leve de livros, com nomes de autores e categorias e sem joins"""
+    try:
+        skip = (page - 1) * limit
+        result = LivroService.get_livros_resumo(
+            session, titulo, skip=skip, limit=limit, cursor=cursor
+        )
+        return SearchResponse[LivroResumo](
+            items=[LivroResumo.model_validate(item) for item in result['items']],
+            page=result['page'],
+            limit=result['limit'],
+            has_more=result['has_more'],
+            next_cursor=result['next_cursor'],
+        )
+    except Exception as e:
+        logger.error(f'Erro no endpoint list_livros_resumo: {str(e)}')
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.get('/disponiveis', response_model=SearchResponse[LivroDisponivel])
+def list_livros_disponiveis(
+    categoria_id: Optional[int] = Query(None, description='Filtrar por categoria'),
+    autor_id: Optional[int] = Query(None, description='Filtrar por autor'),
+    page: int = Query(1, ge=1, description='Número da página'),
+    limit: int = Query(
+        20, ge=1, le=SEARCH_MAX_LIMIT, description='Limite de itens por página'
+    ),
+    cursor: Optional[str] = Query(
+        None, description='Cursor retornado em next_cursor (substitui page)'
+    ),
+    session: Session = Depends(get_session),
+):
+    """Livros com exemplares disponíveis agora, por categoria e/ou autor"""
+    try:
+        skip = (page - 1) * limit
+        result = LivroService.get_livros_disponiveis(
+            session, categoria_id, autor_id, skip=skip, limit=limit, cursor=cursor
+        )
+        return SearchResponse[LivroDisponivel](
+            items=[LivroDisponivel.model_validate(item) for item in result['items']],
+            page=result['page'],
+            limit=result['limit'],
+            has_more=result['has_more'],
+            next_cursor=result['next_cursor'],
+        )
+    except Exception as e:
+        logger.error(f'Erro no endpoint list_livros_disponiveis: {str(e)}')
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.get('/changes', response_model=ChangesResponse)
+def changes_livros(
+    since: int = Query(0, ge=0, description='Token da última sincronização'),
+    limit: int = Query(500, ge=1, le=1000, description='Limite de eventos lidos'),
+    session: Session = Depends(get_session),
+):
+    """Sincronização incremental: livros criados, alterados e excluídos"""
+    try:
+        return ChangesResponse(**EventoService.alteracoes(session, 'livro', since, limit))
+    except Exception as e:
+        logger.error(f'Erro no endpoint changes_livros: {str(e)}')
+        raise HTTPException(status_code=400, detail=str(e))
+
+
 @router.get('/{livro_id}', response_model=LivroResponse)
 def get_livro(livro_id: int, session: Session = Depends(get_session)):
     """F3: Ler um livro específico"""
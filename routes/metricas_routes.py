@@ -0,0 +1,20 @@
+from fastapi import APIRouter, Query, Request
+
+from config import consultas_lentas
+
+router = APIRouter(prefix='/metricas', tags=['metricas'])
+
+
+@router.get('/payload')
+def read_metricas_payload(request: Request):
+    """Bytes gerados e enviados por rota desde o início deste processo"""
+    return request.app.state.metricas_payload.resumo()
+
+
+@router.get('/consultas-lentas')
+def read_consultas_lentas(
+    limit: int = Query(20, ge=1, le=200, description='Quantidade de instruções'),
+    ordem: str = Query('total_ms', pattern='^(total_ms|contagem|max_ms)$'),
+):
+    """Instruções lentas mais custosas desde o início deste processo"""
+    return consultas_lentas.estatisticas.top(limit, ordem)
@@ -1,15 +1,19 @@
-from typing import List, Optional
+from typing import Optional
 
 from config.database import get_session
 from config.logging_config import logger
 from fastapi import APIRouter, Depends, HTTPException, Query
 from schemas.schemas import (
+    ChangesResponse,
     CountResponse,
     PaginatedResponse,
     PerfilUsuarioCreate,
     PerfilUsuarioResponse,
     PerfilUsuarioUpdate,
+    SearchResponse,
 )
+from services.evento_service import EventoService
+from services.pagination import SEARCH_MAX_LIMIT
 from services.perfil_usuario_service import PerfilUsuarioService
 from sqlmodel import Session
 
@@ -64,18 +68,47 @@ def count_perfis_usuario(session: Session = Depends(get_session)):
         raise HTTPException(status_code=400, detail=str(e))
 
 
-@router.get('/search', response_model=List[PerfilUsuarioResponse])
+@router.get('/search', response_model=SearchResponse[PerfilUsuarioResponse])
 def search_perfis_usuario(
     profissao: Optional[str] = Query(None, description='Buscar por profissão'),
     interesses: Optional[str] = Query(
         None, description='Filtrar por interesses literários'
     ),
+    page: int = Query(1, ge=1, description='Número da página'),
+    limit: int = Query(
+        10, ge=1, le=SEARCH_MAX_LIMIT, description='Limite de itens por página'
+    ),
+    cursor: Optional[str] = Query(
+        None, description='Cursor retornado em next_cursor (substitui page)'
+    ),
+    include_total: bool = Query(
+        False, description='Calcular o total de resultados (consulta extra)'
+    ),
     session: Session = Depends(get_session),
 ):
     """F6: Filtrar perfis por atributos específicos"""
     try:
-        perfis = PerfilUsuarioService.search_perfis(session, profissao, interesses)
-        return [PerfilUsuarioResponse.model_validate(perfil) for perfil in perfis]
+        skip = (page - 1) * limit
+        result = PerfilUsuarioService.search_perfis(
+            session,
+            profissao,
+            interesses,
+            skip=skip,
+            limit=limit,
+            cursor=cursor,
+            include_total=include_total,
+        )
+        return SearchResponse[PerfilUsuarioResponse](
+            items=[
+                PerfilUsuarioResponse.model_validate(item) for item in result['items']
+            ],
+            page=result['page'],
+            limit=result['limit'],
+            has_more=result['has_more'],
+            next_cursor=result['next_cursor'],
+            total=result['total'],
+            total_pages=result['total_pages'],
+        )
     except Exception as e:
         logger.error(f'Erro no endpoint search_perfis_usuario: {str(e)}')
         raise HTTPException(status_code=400, detail=str(e))
@@ -99,6 +132,22 @@ def get_perfil_by_usuario(usuario_id: int, session: Session = Depends(get_sessio
         raise HTTPException(status_code=400, detail=str(e))
 
 
+@router.get('/changes', response_model=ChangesResponse)
+def changes_perfis(
+    since: int = Query(0, ge=0, description='Token da última sincronização'),
+    limit: int = Query(500, ge=1, le=1000, description='Limite de eventos lidos'),
+    session: Session = Depends(get_session),
+):
+    """Sincronização incremental: perfis de usuário criados, alterados e excluídos"""
+    try:
+        return ChangesResponse(
+            **EventoService.alteracoes(session, 'perfil_usuario', since, limit)
+        )
+    except Exception as e:
+        logger.error(f'Erro no endpoint changes_perfis: {str(e)}')
+        raise HTTPException(status_code=400, detail=str(e))
+
+
 @router.get('/{perfil_id}', response_model=PerfilUsuarioResponse)
 def get_perfil_usuario(perfil_id: int, session: Session = Depends(get_session)):
     """F3: Ler um perfil específico"""
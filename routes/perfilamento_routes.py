@@ -0,0 +1,54 @@
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request
+from fastapi.responses import FileResponse
+
+from config.logging_config import logger
+from schemas.schemas import PerfilRequisicaoResponse
+
+router = APIRouter(prefix='/perfilamento', tags=['perfilamento'])
+
+
+def _autorizar(request: Request, x_perfilar: Optional[str] = Header(None)):
+    # O mesmo header que pede o perfil; sem PERFILAMENTO_TOKEN os perfis (com
+    # rotas, parâmetros e código da aplicação) não são expostos
+    token = request.app.state.settings.perfilamento_token
+    if not token:
+        raise HTTPException(
+            status_code=403, detail='Defina PERFILAMENTO_TOKEN para acessar os perfis'
+        )
+    if x_perfilar != token:
+        raise HTTPException(status_code=403, detail='Token de perfilamento inválido')
+
+
+@router.get(
+    '/',
+    response_model=List[PerfilRequisicaoResponse],
+    dependencies=[Depends(_autorizar)],
+)
+def listar_perfis(
+    request: Request,
+    limit: int = Query(50, ge=1, le=500, description='Quantidade de perfis'),
+    rota: Optional[str] = Query(None, description='Ex.: /livros/search'),
+):
+    """Perfis de requisições gravados, mais recentes primeiro"""
+    try:
+        return request.app.state.armazem_perfis.listar(limit, rota)
+    except Exception as e:
+        logger.error(f'Erro no endpoint listar_perfis: {str(e)}')
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.get('/{nome}', dependencies=[Depends(_autorizar)])
+def baixar_perfil(
+    request: Request,
+    nome: str,
+    formato: str = Query('speedscope', pattern='^(speedscope|folded)$'),
+):
+    """Arquivo do perfil: speedscope (JSON) ou pilhas agregadas (flamegraph)"""
+    caminho = request.app.state.armazem_perfis.caminho(nome, formato)
+    if caminho is None:
+        raise HTTPException(status_code=404, detail='Perfil não encontrado')
+    if formato == 'folded':
+        return FileResponse(caminho, media_type='text/plain; charset=utf-8')
+    return FileResponse(caminho, media_type='application/json')
@@ -0,0 +1,70 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from sqlmodel import Session
+
+from config.database import get_session
+from config.logging_config import logger
+from schemas.schemas import RecomendacaoItem, RecomendacoesResponse
+from services.recomendacao_service import RecomendacaoService
+
+router = APIRouter(tags=['recomendacoes'])
+
+
+def _get_index(request: Request):
+    index = RecomendacaoService.get_index(request.app.state.settings.recomendacoes_dir)
+    if index is None:
+        raise HTTPException(
+            status_code=503,
+            detail='Índice de recomendações ainda não foi gerado',
+        )
+    return index
+
+
+@router.get('/livros/{livro_id}/recomendacoes', response_model=RecomendacoesResponse)
+def recomendar_para_livro(
+    request: Request,
+    livro_id: int,
+    limit: int = Query(10, ge=1, le=50, description='Quantidade de recomendações'),
+):
+    """Livros emprestados pelos mesmos usuários que pegaram este livro"""
+    try:
+        index = _get_index(request)
+        recomendacoes = RecomendacaoService.recomendar_para_livro(index, livro_id, limit)
+        return RecomendacoesResponse(
+            itens=[
+                RecomendacaoItem(livro_id=livro, pontuacao=pontuacao)
+                for livro, pontuacao in recomendacoes
+            ],
+            gerado_em=index.gerado_em,
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f'Erro no endpoint recomendar_para_livro: {str(e)}')
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.get('/usuarios/{usuario_id}/recomendacoes', response_model=RecomendacoesResponse)
+def recomendar_para_usuario(
+    request: Request,
+    usuario_id: int,
+    limit: int = Query(10, ge=1, le=50, description='Quantidade de recomendações'),
+    session: Session = Depends(get_session),
+):
+    """Recomendações pelo histórico de empréstimos e pelo perfil do usuário"""
+    try:
+        index = _get_index(request)
+        recomendacoes = RecomendacaoService.recomendar_para_usuario(
+            session, index, usuario_id, limit
+        )
+        return RecomendacoesResponse(
+            itens=[
+                RecomendacaoItem(livro_id=livro, pontuacao=pontuacao)
+                for livro, pontuacao in recomendacoes
+            ],
+            gerado_em=index.gerado_em,
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f'Erro no endpoint recomendar_para_usuario: {str(e)}')
+        raise HTTPException(status_code=400, detail=str(e))
@@ -0,0 +1,197 @@
+import asyncio
+import json
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from sqlmodel import Session
+
+from config.database import get_session, get_session_primario
+from config.logging_config import logger
+from models.models import StatusReserva
+from schemas.schemas import ReservaCreate, ReservaResponse, SearchResponse
+from services.pagination import SEARCH_MAX_LIMIT
+from services.reserva_service import (
+    STATUS_ABERTOS,
+    ReservaService,
+    notificador_reservas,
+)
+
+router = APIRouter(prefix='/reservas', tags=['reservas'])
+
+# Espera máxima de um long-poll
+ESPERA_MAXIMA = 60
+# Intervalo para reconsultar o banco enquanto aguarda: o aviso em memória só
+# cobre mudanças feitas neste processo, não nos demais workers
+INTERVALO_VERIFICACAO = 5
+# Comentário enviado no SSE para manter a conexão aberta em proxies
+INTERVALO_HEARTBEAT = 15
+
+
+def _estado(session: Session, reserva_id: int) -> Optional[ReservaResponse]:
+    try:
+        reserva = ReservaService.get_reserva_by_id(session, reserva_id)
+        return ReservaResponse.model_validate(reserva) if reserva else None
+    finally:
+        # Encerra a transação: libera a conexão e a próxima leitura vê mudanças
+        session.rollback()
+
+
+@router.post('/', response_model=ReservaResponse)
+def create_reserva(reserva: ReservaCreate, session: Session = Depends(get_session)):
+    """Entrar na fila de espera de um livro indisponível"""
+    try:
+        return ReservaService.create_reserva(session, reserva)
+    except Exception as e:
+        logger.error(f'Erro no endpoint create_reserva: {str(e)}')
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.get('/search', response_model=SearchResponse[ReservaResponse])
+def search_reservas(
+    usuario_id: Optional[int] = Query(None, description='Filtrar por usuário'),
+    livro_id: Optional[int] = Query(None, description='Filtrar por livro'),
+    status: Optional[StatusReserva] = Query(None, description='Filtrar por status'),
+    page: int = Query(1, ge=1, description='Número da página'),
+    limit: int = Query(
+        10, ge=1, le=SEARCH_MAX_LIMIT, description='Limite de itens por página'
+    ),
+    cursor: Optional[str] = Query(
+        None, description='Cursor retornado em next_cursor (substitui page)'
+    ),
+    include_total: bool = Query(
+        False, description='Calcular o total de resultados (consulta extra)'
+    ),
+    session: Session = Depends(get_session),
+):
+    """Filtrar reservas por usuário, livro e status"""
+    try:
+        skip = (page - 1) * limit
+        result = ReservaService.search_reservas(
+            session,
+            usuario_id,
+            livro_id,
+            status,
+            skip=skip,
+            limit=limit,
+            cursor=cursor,
+            include_total=include_total,
+        )
+        return SearchResponse[ReservaResponse](
+            items=[ReservaResponse.model_validate(item) for item in result['items']],
+            page=result['page'],
+            limit=result['limit'],
+            has_more=result['has_more'],
+            next_cursor=result['next_cursor'],
+            total=result['total'],
+            total_pages=result['total_pages'],
+        )
+    except Exception as e:
+        logger.error(f'Erro no endpoint search_reservas: {str(e)}')
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.get('/{reserva_id}', response_model=ReservaResponse)
+def get_reserva(reserva_id: int, session: Session = Depends(get_session)):
+    """Ler uma reserva específica"""
+    try:
+        reserva = ReservaService.get_reserva_by_id(session, reserva_id)
+        if not reserva:
+            raise HTTPException(status_code=404, detail='Reserva não encontrada')
+        return ReservaResponse.model_validate(reserva)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f'Erro no endpoint get_reserva: {str(e)}')
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.get('/{reserva_id}/aguardar', response_model=ReservaResponse)
+async def aguardar_reserva(
+    reserva_id: int,
+    status: StatusReserva = Query(
+        StatusReserva.AGUARDANDO,
+        description='Status conhecido pelo cliente; a resposta vem quando mudar',
+    ),
+    timeout: int = Query(30, ge=1, le=ESPERA_MAXIMA, description='Espera em segundos'),
+    session: Session = Depends(get_session_primario),
+):
+    """Long-poll: responde quando o status da reserva mudar ou no timeout"""
+    try:
+        loop = asyncio.get_running_loop()
+        prazo = loop.time() + timeout
+        while True:
+            reserva = await run_in_threadpool(_estado, session, reserva_id)
+            if not reserva:
+                raise HTTPException(status_code=404, detail='Reserva não encontrada')
+            restante = prazo - loop.time()
+            if reserva.status != status or restante <= 0:
+                return reserva
+            await notificador_reservas.aguardar(
+                reserva_id, min(restante, INTERVALO_VERIFICACAO)
+            )
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f'Erro no endpoint aguardar_reserva: {str(e)}')
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+def _evento_sse(reserva: ReservaResponse) -> str:
+    data = json.dumps(reserva.model_dump(mode='json'), ensure_ascii=False)
+    return f'event: reserva\ndata: {data}\n\n'
+
+
+@router.get('/{reserva_id}/eventos')
+async def eventos_reserva(request: Request, reserva_id: int):
+    """SSE: envia o estado atual e cada mudança de status até a reserva encerrar"""
+    # Sessão própria: o stream continua depois que as dependências terminam
+    session = Session(request.app.state.engine)
+    reserva = await run_in_threadpool(_estado, session, reserva_id)
+    if not reserva:
+        session.close()
+        raise HTTPException(status_code=404, detail='Reserva não encontrada')
+
+    async def stream(atual: ReservaResponse):
+        loop = asyncio.get_running_loop()
+        try:
+            yield _evento_sse(atual)
+            ultimo_envio = loop.time()
+            while atual.status in STATUS_ABERTOS:
+                if await request.is_disconnected():
+                    break
+                await notificador_reservas.aguardar(reserva_id, INTERVALO_VERIFICACAO)
+                novo = await run_in_threadpool(_estado, session, reserva_id)
+                if not novo:
+                    break
+                if novo.status != atual.status:
+                    atual = novo
+                    yield _evento_sse(atual)
+                    ultimo_envio = loop.time()
+                elif loop.time() - ultimo_envio >= INTERVALO_HEARTBEAT:
+                    yield ': keep-alive\n\n'
+                    ultimo_envio = loop.time()
+        finally:
+            session.close()
+
+    return StreamingResponse(
+        stream(reserva),
+        media_type='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'},
+    )
+
+
+@router.delete('/{reserva_id}', response_model=ReservaResponse)
+def cancel_reserva(reserva_id: int, session: Session = Depends(get_session)):
+    """Sair da fila; um exemplar já separado passa para o próximo"""
+    try:
+        reserva = ReservaService.cancel_reserva(session, reserva_id)
+        if not reserva:
+            raise HTTPException(status_code=404, detail='Reserva não encontrada')
+        return ReservaResponse.model_validate(reserva)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f'Erro no endpoint cancel_reserva: {str(e)}')
+        raise HTTPException(status_code=400, detail=str(e))
@@ -1,15 +1,23 @@
-from typing import List, Optional
+from typing import Optional
 
 from config.database import get_session
 from config.logging_config import logger
 from fastapi import APIRouter, Depends, HTTPException, Query
+from models.models import StatusEmprestimo
 from schemas.schemas import (
+    ChangesResponse,
     CountResponse,
+    CursorResponse,
+    EmprestimoResumo,
     PaginatedResponse,
+    SearchResponse,
     UsuarioCreate,
     UsuarioResponse,
     UsuarioUpdate,
 )
+from services.emprestimo_service import EmprestimoService
+from services.evento_service import EventoService
+from services.pagination import SEARCH_MAX_LIMIT
 from services.usuario_service import UsuarioService
 from sqlmodel import Session
 
@@ -62,22 +70,66 @@ def count_usuarios(session: Session = Depends(get_session)):
         raise HTTPException(status_code=400, detail=str(e))
 
 
-@router.get('/search', response_model=List[UsuarioResponse])
+@router.get('/search', response_model=SearchResponse[UsuarioResponse])
 def search_usuarios(
     nome: Optional[str] = Query(None, description='Buscar por nome'),
     email: Optional[str] = Query(None, description='Filtrar por email'),
     ativo: Optional[bool] = Query(None, description='Filtrar por status ativo'),
+    page: int = Query(1, ge=1, description='Número da página'),
+    limit: int = Query(
+        10, ge=1, le=SEARCH_MAX_LIMIT, description='Limite de itens por página'
+    ),
+    cursor: Optional[str] = Query(
+        None, description='Cursor retornado em next_cursor (substitui page)'
+    ),
+    include_total: bool = Query(
+        False, description='Calcular o total de resultados (consulta extra)'
+    ),
     session: Session = Depends(get_session),
 ):
     """F6: Filtrar usuários por atributos específicos"""
     try:
-        usuarios = UsuarioService.search_usuarios(session, nome, email, ativo)
-        return [UsuarioResponse.model_validate(usuario) for usuario in usuarios]
+        skip = (page - 1) * limit
+        result = UsuarioService.search_usuarios(
+            session,
+            nome,
+            email,
+            ativo,
+            skip=skip,
+            limit=limit,
+            cursor=cursor,
+            include_total=include_total,
+        )
+        return SearchResponse[UsuarioResponse](
+            items=[UsuarioResponse.model_validate(item) for item in result['items']],
+            page=result['page'],
+            limit=result['limit'],
+            has_more=result['has_more'],
+            next_cursor=result['next_cursor'],
+            total=result['total'],
+            total_pages=result['total_pages'],
+        )
     except Exception as e:
         logger.error(f'Erro no endpoint search_usuarios: {str(e)}')
         raise HTTPException(status_code=400, detail=str(e))
 
 
+@router.get('/changes', response_model=ChangesResponse)
+def changes_usuarios(
+    since: int = Query(0, ge=0, description='Token da última sincronização'),
+    limit: int = Query(500, ge=1, le=1000, description='Limite de eventos lidos'),
+    session: Session = Depends(get_session),
+):
+    """Sincronização incremental: usuários criados, alterados e excluídos"""
+    try:
+        return ChangesResponse(
+            **EventoService.alteracoes(session, 'usuario', since, limit)
+        )
+    except Exception as e:
+        logger.error(f'Erro no endpoint changes_usuarios: {str(e)}')
+        raise HTTPException(status_code=400, detail=str(e))
+
+
 @router.get('/{usuario_id}', response_model=UsuarioResponse)
 def get_usuario(usuario_id: int, session: Session = Depends(get_session)):
     """F3: Ler um usuário específico"""
@@ -93,6 +145,36 @@ def get_usuario(usuario_id: int, session: Session = Depends(get_session)):
         raise HTTPException(status_code=400, detail=str(e))
 
 
+@router.get('/{usuario_id}/emprestimos', response_model=CursorResponse[EmprestimoResumo])
+def list_emprestimos_usuario(
+    usuario_id: int,
+    status: Optional[StatusEmprestimo] = Query(None, description='Filtrar por status'),
+    limit: int = Query(
+        20, ge=1, le=SEARCH_MAX_LIMIT, description='Limite de itens por página'
+    ),
+    cursor: Optional[str] = Query(None, description='Cursor retornado em next_cursor'),
+    session: Session = Depends(get_session),
+):
+    """Histórico de empréstimos do usuário, do mais recente ao mais antigo"""
+    try:
+        result = EmprestimoService.get_historico_usuario(
+            session, usuario_id, limit=limit, cursor=cursor, status=status
+        )
+        if result is None:
+            raise HTTPException(status_code=404, detail='Usuário não encontrado')
+        return CursorResponse[EmprestimoResumo](
+            items=[EmprestimoResumo.model_validate(item) for item in result['items']],
+            limit=result['limit'],
+            has_more=result['has_more'],
+            next_cursor=result['next_cursor'],
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f'Erro no endpoint list_emprestimos_usuario: {str(e)}')
+        raise HTTPException(status_code=400, detail=str(e))
+
+
 @router.put('/{usuario_id}', response_model=UsuarioResponse)
 def update_usuario(
     usuario_id: int,
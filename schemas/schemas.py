@@ -1,9 +1,8 @@
 from datetime import date, datetime
-from typing import Generic, List, Optional, TypeVar
+from typing import Dict, Generic, List, Optional, TypeVar
 
-from models.models import StatusEmprestimo
-from pydantic import BaseModel, EmailStr
-from pydantic.generics import GenericModel
+from models.models import OperacaoEvento, StatusEmprestimo, StatusReserva, StatusTarefa
+from pydantic import BaseModel, EmailStr, Field
 
 
 # Schemas para Autor
@@ -128,6 +127,30 @@ class LivroResponse(BaseModel):
         from_attributes = True  # Para permitir criar a partir de ORM
 
 
+# Resumo de livro disponível (sem relacionamentos)
+class LivroDisponivel(BaseModel):
+    id: int
+    titulo: str
+    ano_publicacao: int
+    editora: str
+    quantidade_disponivel: int
+
+
+# Livro sem relacionamentos, com os nomes desnormalizados (GET /livros/resumo)
+class LivroResumo(BaseModel):
+    id: int
+    titulo: str
+    isbn: str
+    ano_publicacao: int
+    editora: str
+    quantidade_disponivel: int
+    autores_nomes: List[str]
+    categorias_nomes: List[str]
+
+    class Config:
+        from_attributes = True
+
+
 # Schemas para Emprestimo
 class EmprestimoCreate(BaseModel):
     usuario_id: int
@@ -157,6 +180,111 @@ class EmprestimoResponse(BaseModel):
         from_attributes = True
 
 
+# Resumo de empréstimo para o histórico do usuário (sem relacionamentos)
+class EmprestimoResumo(BaseModel):
+    id: int
+    livro_id: int
+    data_emprestimo: datetime
+    data_devolucao_prevista: date
+    data_devolucao_real: Optional[date]
+    status: StatusEmprestimo
+
+    class Config:
+        from_attributes = True
+
+
+# Schemas para empréstimos e devoluções em lote (balcão de circulação)
+LOTE_MAX_ITENS = 100
+
+
+class EmprestimoLoteCreate(BaseModel):
+    usuario_id: int
+    livro_ids: List[int] = Field(min_length=1, max_length=LOTE_MAX_ITENS)
+    data_devolucao_prevista: date
+    observacoes: Optional[str] = None
+
+
+class DevolucaoLote(BaseModel):
+    emprestimo_ids: List[int] = Field(min_length=1, max_length=LOTE_MAX_ITENS)
+    # Padrão: data de hoje
+    data_devolucao_real: Optional[date] = None
+
+
+class ItemLoteResponse(BaseModel):
+    # ID do livro (empréstimo) ou do empréstimo (devolução)
+    id: int
+    sucesso: bool
+    erro: Optional[str] = None
+    emprestimo: Optional[EmprestimoResumo] = None
+
+
+class LoteResponse(BaseModel):
+    items: List[ItemLoteResponse]
+    sucesso: int
+    falhas: int
+
+
+# Schemas para Reserva
+class ReservaCreate(BaseModel):
+    usuario_id: int
+    livro_id: int
+
+
+class ReservaResponse(BaseModel):
+    id: int
+    usuario_id: int
+    livro_id: int
+    posicao: int
+    status: StatusReserva
+    data_criacao: datetime
+    data_disponibilidade: Optional[datetime]
+    expira_em: Optional[datetime]
+
+    class Config:
+        from_attributes = True
+
+
+# Schemas para o feed de mudanças
+class EventoResponse(BaseModel):
+    id: int
+    entidade: str
+    entidade_id: int
+    operacao: OperacaoEvento
+    dados: Optional[dict]
+    data_criacao: datetime
+
+    class Config:
+        from_attributes = True
+
+
+class EventosResponse(BaseModel):
+    items: List[EventoResponse]
+    # Offset para a próxima leitura (parâmetro ``desde``)
+    proximo: int
+
+
+# Schema para sincronização incremental (GET /{entidade}/changes)
+class ChangesResponse(BaseModel):
+    created: List[dict]
+    updated: List[dict]
+    deleted: List[int]
+    # Token para a próxima sincronização (parâmetro ``since``)
+    next_since: int
+    has_more: bool
+
+
+# Schema de tarefa em segundo plano (ex.: exportação agendada)
+class TarefaResponse(BaseModel):
+    id: int
+    tipo: str
+    status: StatusTarefa
+    executar_em: datetime
+    data_criacao: datetime
+
+    class Config:
+        from_attributes = True
+
+
 # Schemas para PerfilUsuario
 class PerfilUsuarioCreate(BaseModel):
     usuario_id: int
@@ -186,11 +314,22 @@ class PerfilUsuarioResponse(BaseModel):
         from_attributes = True
 
 
+# Schemas para Recomendações
+class RecomendacaoItem(BaseModel):
+    livro_id: int
+    pontuacao: float
+
+
+class RecomendacoesResponse(BaseModel):
+    itens: List[RecomendacaoItem]
+    gerado_em: Optional[datetime]
+
+
 # Schema para paginação
 T = TypeVar('T')
 
 
-class PaginatedResponse(GenericModel, Generic[T]):
+class PaginatedResponse(BaseModel, Generic[T]):
     items: List[T]
     total: int
     page: int
@@ -198,7 +337,85 @@ class PaginatedResponse(GenericModel, Generic[T]):
     total_pages: int
 
 
+# Schema para buscas paginadas (total só é calculado quando solicitado)
+class SearchResponse(BaseModel, Generic[T]):
+    items: List[T]
+    page: int
+    limit: int
+    has_more: bool
+    next_cursor: Optional[str] = None
+    total: Optional[int] = None
+    total_pages: Optional[int] = None
+
+
+# Schema para listas paginadas só por cursor (sem page/total)
+class CursorResponse(BaseModel, Generic[T]):
+    items: List[T]
+    limit: int
+    has_more: bool
+    next_cursor: Optional[str] = None
+
+
 # Schema para contagem
 class CountResponse(BaseModel):
     total: int
     entidade: str
+
+
+# Schemas para Análises
+class CirculacaoCategoriaItem(BaseModel):
+    categoria: str
+    mes: str
+    emprestimos: int
+
+
+class DuracaoMesItem(BaseModel):
+    mes: str
+    devolvidos: int
+    media_dias: float
+
+
+class DuracaoEmprestimos(BaseModel):
+    devolvidos: int
+    media_dias: Optional[float]
+    mediana_dias: Optional[float]
+    p90_dias: Optional[float]
+    por_mes: List[DuracaoMesItem]
+
+
+class AtrasoUsuarioItem(BaseModel):
+    usuario_id: int
+    devolvidos: int
+    atrasados: int
+    taxa_atraso: float
+
+
+class AtrasosUsuarios(BaseModel):
+    devolvidos: int
+    taxa_geral: Optional[float]
+    usuarios: List[AtrasoUsuarioItem]
+
+
+class AnaliseResponse(BaseModel, Generic[T]):
+    fonte: str
+    emprestimos: int
+    gerado_em: datetime
+    resultado: T
+
+
+# Schemas para Perfilamento
+class CamadaPerfil(BaseModel):
+    ms: float
+    fracao: float
+
+
+class PerfilRequisicaoResponse(BaseModel):
+    nome: str
+    data: datetime
+    metodo: str
+    rota: str
+    caminho: str
+    status: Optional[int]
+    duracao_ms: float
+    amostras: int
+    camadas: Dict[str, CamadaPerfil]
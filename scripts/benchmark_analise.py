@@ -0,0 +1,106 @@
+"""Mede as métricas de análise com dados sintéticos de empréstimos.
+
+Gera as colunas de N empréstimos (10 milhões por padrão) distribuídos em 10
+anos, com livros e usuários de popularidade desigual e 1 a 3 categorias por
+livro, monta os arrays de ``services.analise_service`` e mede cada métrica.
+Não usa o banco de dados.
+
+Uso: ``python scripts/benchmark_analise.py [--emprestimos 10000000] [--runs 3]``
+(ou ``task benchmark_analise``).
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
+from services.analise_service import (  # noqa: E402
+    DadosAnalise,
+    atrasos_por_usuario,
+    circulacao_por_categoria,
+    duracao_emprestimos,
+)
+
+# Empréstimos ainda não devolvidos
+FRACAO_EM_ABERTO = 0.03
+
+
+def gerar(emprestimos: int, livros: int, usuarios: int, categorias: int, seed: int):
+    """Colunas brutas sintéticas, no formato aceito por ``DadosAnalise.montar``"""
+    rng = np.random.default_rng(seed)
+    # Popularidade de cauda longa (Zipf truncado)
+    livro_id = (rng.zipf(1.3, emprestimos) - 1) % livros + 1
+    usuario_id = (rng.zipf(1.2, emprestimos) - 1) % usuarios + 1
+    inicio = np.datetime64('2016-01-01')
+    data = inicio + rng.integers(0, 3650, emprestimos).astype('timedelta64[D]')
+    prevista = data + np.timedelta64(14, 'D')
+    real = data + rng.gamma(4.0, 3.5, emprestimos).astype('timedelta64[D]')
+    real[rng.random(emprestimos) < FRACAO_EM_ABERTO] = np.datetime64('NaT')
+
+    por_livro = rng.integers(1, 4, livros)
+    par_livro = np.repeat(np.arange(1, livros + 1), por_livro)
+    par_categoria = rng.integers(0, categorias, len(par_livro))
+    nomes = np.asarray([f'Categoria {i}' for i in range(categorias)])
+    return livro_id, usuario_id, data, prevista, real, par_livro, par_categoria, nomes
+
+
+def medir(funcao, runs: int):
+    """Melhor tempo (s) entre ``runs`` execuções e o último resultado"""
+    melhor = float('inf')
+    for _ in range(runs):
+        inicio = time.perf_counter()
+        resultado = funcao()
+        melhor = min(melhor, time.perf_counter() - inicio)
+    return melhor, resultado
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--emprestimos', type=int, default=10_000_000)
+    parser.add_argument('--livros', type=int, default=100_000)
+    parser.add_argument('--usuarios', type=int, default=200_000)
+    parser.add_argument('--categorias', type=int, default=40)
+    parser.add_argument('--runs', type=int, default=3, help='Execuções por métrica')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args(argv)
+
+    inicio = time.perf_counter()
+    colunas = gerar(
+        args.emprestimos, args.livros, args.usuarios, args.categorias, args.seed
+    )
+    print(f'dados sintéticos: {time.perf_counter() - inicio:.2f} s')
+
+    inicio = time.perf_counter()
+    dados = DadosAnalise.montar(*colunas)
+    segundos = time.perf_counter() - inicio
+    del colunas
+    memoria = sum(
+        getattr(dados, nome).nbytes
+        for nome in ('livro_idx', 'usuario_id', 'mes', 'duracao', 'devolucao')
+    )
+    print(
+        f'montar arrays: {segundos:.2f} s '
+        f'({len(dados)} empréstimos, {memoria / 2**20:.0f} MiB)'
+    )
+
+    metricas = {
+        'circulacao_por_categoria': lambda: circulacao_por_categoria(dados),
+        'circulacao_por_categoria (12 meses)': lambda: circulacao_por_categoria(
+            dados, desde='2025-01', ate='2025-12'
+        ),
+        'duracao_emprestimos': lambda: duracao_emprestimos(dados),
+        'atrasos_por_usuario': lambda: atrasos_por_usuario(dados),
+    }
+    for nome, funcao in metricas.items():
+        segundos, _ = medir(funcao, args.runs)
+        print(f'{nome}: {segundos * 1000:.0f} ms')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,169 @@
+"""Mede o custo por chamada das consultas mais frequentes dos serviços.
+
+Cria um banco SQLite em memória com livros, autores, usuários e empréstimos
+sintéticos e chama os métodos ``get_all_*``, ``search_*`` e ``count_*``
+repetidas vezes, alternando os valores dos filtros. Com o banco em memória e
+páginas pequenas, o tempo medido é quase todo montagem e compilação da
+instrução, ORM e Python: o custo que o cache de instruções reduz. Mede também
+só a montagem da busca de livros (instrução e chave do cache de compilação),
+em cache e construída de novo a cada chamada, como antes do cache.
+
+Uso: ``python scripts/benchmark_consultas.py [--chamadas 2000] [--livros 2000]``
+(ou ``task benchmark_consultas``).
+"""
+
+import argparse
+import logging
+import os
+import sys
+import time
+from datetime import date, datetime, timedelta
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
+from sqlalchemy.pool import StaticPool  # noqa: E402
+from sqlmodel import Session, create_engine  # noqa: E402
+
+from config.database import create_db_and_tables  # noqa: E402
+from models.models import (  # noqa: E402
+    Autor,
+    Categoria,
+    Emprestimo,
+    Livro,
+    StatusEmprestimo,
+    Usuario,
+)
+from services import livro_service, pagination  # noqa: E402
+from services.autor_service import AutorService  # noqa: E402
+from services.emprestimo_service import EmprestimoService  # noqa: E402
+from services.livro_service import LivroService  # noqa: E402
+from services.usuario_service import UsuarioService  # noqa: E402
+
+
+def popular(session: Session, livros: int):
+    autores = [
+        Autor(
+            nome=f'Autor {i}',
+            sobrenome=f'Sobrenome {i}',
+            data_nascimento=date(1950, 1, 1),
+            nacionalidade='BR',
+        )
+        for i in range(livros // 4)
+    ]
+    categorias = [Categoria(nome=f'Categoria {i}') for i in range(20)]
+    session.add_all(autores + categorias)
+    session.flush()
+    for i in range(livros):
+        session.add(
+            Livro(
+                titulo=f'Livro {i}',
+                isbn=f'isbn-{i}',
+                ano_publicacao=1950 + i % 70,
+                editora='Editora',
+                numero_paginas=100,
+                quantidade_total=3,
+                quantidade_disponivel=i % 4,
+                autores=[autores[i % len(autores)]],
+                categorias=[categorias[i % len(categorias)]],
+            )
+        )
+    usuarios = [
+        Usuario(nome=f'Usuario {i}', email=f'usuario{i}@exemplo.com')
+        for i in range(livros // 10)
+    ]
+    session.add_all(usuarios)
+    session.flush()
+    inicio = datetime(2024, 1, 1)
+    for i in range(livros * 2):
+        session.add(
+            Emprestimo(
+                usuario_id=usuarios[i % len(usuarios)].id,
+                livro_id=i % livros + 1,
+                data_emprestimo=inicio + timedelta(hours=i),
+                data_devolucao_prevista=date(2024, 2, 1),
+                status=StatusEmprestimo.DEVOLVIDO,
+            )
+        )
+    session.commit()
+
+
+def chamadas(livros: int):
+    """Chamadas medidas; ``i`` varia os valores dos filtros"""
+    return {
+        'count_livros': lambda s, i: LivroService.count_livros(s),
+        'get_all_livros': lambda s, i: LivroService.get_all_livros(
+            s, skip=i % 50, limit=20
+        ),
+        'search_livros (titulo)': lambda s, i: LivroService.search_livros(
+            s, titulo=f'Livro {i % 100}', limit=20
+        ),
+        'search_livros (autor, ano)': lambda s, i: LivroService.search_livros(
+            s, autor=f'Autor {i % 50}', ano_min=1960, limit=20
+        ),
+        'search_autores (cursor)': lambda s, i: AutorService.search_autores(
+            s, nome='Autor', cursor='WzVd' if i % 2 else None, limit=20
+        ),
+        'search_usuarios': lambda s, i: UsuarioService.search_usuarios(
+            s, email=f'usuario{i % 10}', ativo=True, limit=20
+        ),
+        'search_emprestimos': lambda s, i: EmprestimoService.search_emprestimos(
+            s, usuario_id=i % (livros // 10) + 1, limit=20, include_total=True
+        ),
+        'count_emprestimos': lambda s, i: EmprestimoService.count_emprestimos(s),
+    }
+
+
+def montagem(em_cache: bool):
+    """Monta a página da busca de livros por autor e ano, como em cada chamada"""
+    busca, pagina = livro_service._busca, pagination._search_page
+    if not em_cache:
+        busca, pagina = busca.__wrapped__, pagina.__wrapped__
+    forma = (False, True, False, True, False)
+    statement = pagina(busca(*forma), Livro, False, livro_service._RELACOES)
+    return statement._generate_cache_key()
+
+
+def medir(funcao, chamadas: int) -> float:
+    """Tempo médio por chamada, em µs"""
+    inicio = time.perf_counter()
+    for i in range(chamadas):
+        funcao(i)
+    return (time.perf_counter() - inicio) / chamadas * 1e6
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--chamadas', type=int, default=2000, help='Chamadas por método')
+    parser.add_argument('--livros', type=int, default=2000)
+    args = parser.parse_args(argv)
+
+    engine = create_engine(
+        'sqlite://', connect_args={'check_same_thread': False}, poolclass=StaticPool
+    )
+    create_db_and_tables(engine)
+    with Session(engine) as session:
+        popular(session, args.livros)
+
+    # Sem os logs de cada chamada no tempo medido
+    logging.disable(logging.INFO)
+    with Session(engine) as session:
+        for nome, chamada in chamadas(args.livros).items():
+            for i in range(50):
+                chamada(session, i)
+
+            def medida(i, chamada=chamada):
+                chamada(session, i)
+                session.expunge_all()
+
+            print(f'{nome}: {medir(medida, args.chamadas):.0f} µs por chamada')
+
+    for em_cache in (False, True):
+        por_chamada = medir(lambda i, c=em_cache: montagem(c), args.chamadas)
+        rotulo = 'em cache' if em_cache else 'sem cache'
+        print(f'montagem da busca de livros ({rotulo}): {por_chamada:.0f} µs')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
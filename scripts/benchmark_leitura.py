@@ -0,0 +1,114 @@
+"""Compara, por página de 100 linhas, a listagem pelo ORM e pelos modelos de leitura.
+
+Usa o mesmo banco SQLite em memória de ``benchmark_consultas`` e mede, para
+as páginas de livros e de empréstimos, o caminho completo até o JSON:
+
+- ``orm``: instâncias ORM, ``model_validate`` de cada item e a validação e a
+  serialização do ``response_model`` feitas pelo FastAPI;
+- ``leitura``: dicts montados direto das colunas (``services.leitura``),
+  validados e serializados uma vez pelo ``response_model``.
+
+Cada página usa uma sessão nova, como uma requisição. Mostra o tempo de CPU
+por página e o pico de memória alocada (tracemalloc) numa página.
+
+Uso: ``python scripts/benchmark_leitura.py [--paginas 200] [--livros 2000]``
+(ou ``task benchmark_leitura``).
+"""
+
+import argparse
+import logging
+import os
+import sys
+import time
+import tracemalloc
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
+from benchmark_consultas import popular  # noqa: E402
+from pydantic import TypeAdapter  # noqa: E402
+from sqlalchemy.pool import StaticPool  # noqa: E402
+from sqlmodel import Session, create_engine  # noqa: E402
+
+from config.database import create_db_and_tables  # noqa: E402
+from schemas.schemas import (  # noqa: E402
+    EmprestimoResponse,
+    LivroResponse,
+    PaginatedResponse,
+)
+from services.emprestimo_service import EmprestimoService  # noqa: E402
+from services.livro_service import LivroService  # noqa: E402
+
+POR_PAGINA = 100
+
+
+def pagina(  # noqa: PLR0913, PLR0917
+    engine, listar, schema, adapter: TypeAdapter, leve: bool, i: int
+) -> bytes:
+    """Uma página até o JSON, como na rota com ``response_model``"""
+    with Session(engine) as session:
+        skip = i % 10 * POR_PAGINA
+        result = listar(session, skip, POR_PAGINA, leve=leve)
+        if not leve:
+            # Como as rotas faziam: modelos a partir do ORM, despejados em
+            # dict pelo FastAPI antes da validação do response_model
+            result = PaginatedResponse[schema](**{
+                **result,
+                'items': [schema.model_validate(item) for item in result['items']],
+            }).model_dump()
+        return adapter.dump_json(adapter.validate_python(result))
+
+
+def medir(funcao, paginas: int):
+    """CPU (s) por página e pico de memória (bytes) de uma página"""
+    for i in range(10):
+        funcao(i)
+    inicio = time.process_time()
+    for i in range(paginas):
+        funcao(i)
+    cpu = (time.process_time() - inicio) / paginas
+
+    tracemalloc.start()
+    funcao(0)
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return cpu, pico
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--paginas', type=int, default=200, help='Páginas por caminho')
+    parser.add_argument('--livros', type=int, default=2000)
+    args = parser.parse_args(argv)
+
+    engine = create_engine(
+        'sqlite://', connect_args={'check_same_thread': False}, poolclass=StaticPool
+    )
+    create_db_and_tables(engine)
+    with Session(engine) as session:
+        popular(session, args.livros)
+
+    # Sem os logs de cada chamada no tempo medido
+    logging.disable(logging.INFO)
+    listagens = {
+        'livros': (LivroService.get_all_livros, LivroResponse),
+        'emprestimos': (EmprestimoService.get_all_emprestimos, EmprestimoResponse),
+    }
+    for nome, (listar, schema) in listagens.items():
+        adapter = TypeAdapter(PaginatedResponse[schema])
+        for leve in (False, True):
+
+            def funcao(i, listar=listar, schema=schema, adapter=adapter, leve=leve):
+                return pagina(engine, listar, schema, adapter, leve, i)
+
+            cpu, pico = medir(funcao, args.paginas)
+            caminho = 'leitura' if leve else 'orm'
+            print(
+                f'{nome} ({caminho}): {cpu * 1000:.1f} ms de CPU por página, '
+                f'pico de {pico / 1024:.0f} KiB'
+            )
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,94 @@
+"""Verifica o orçamento de tempo de importação dos pontos de entrada.
+
+Executa ``python -X importtime -c "import <módulo>"`` em um processo limpo,
+algumas vezes, e compara o melhor tempo acumulado com o orçamento. Também
+garante que módulos pesados (rotas, serviços, driver do banco, validação de
+e-mail) não sejam carregados só por importar o ponto de entrada.
+
+Uso: ``python scripts/check_import_time.py [--runs 3] [--top 10]``
+(ou ``task importtime``).
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Orçamento em milissegundos do tempo acumulado de importação de cada módulo
+BUDGETS_MS = {
+    'main': 30,
+    'config.logging_config': 30,
+}
+
+# Módulos que não podem ser carregados pela simples importação do ponto de entrada
+FORBIDDEN = {
+    'main': [
+        'fastapi',
+        'sqlalchemy',
+        'sqlmodel',
+        'email_validator',
+        'routes',
+        'services',
+        'schemas',
+        'config.database',
+    ],
+    'config.logging_config': ['sqlalchemy', 'fastapi'],
+}
+
+
+def measure(module: str):
+    """Retorna (tempo acumulado em ms, módulos importados com tempo próprio)"""
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        cwd=BASE_DIR,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    total_us = 0
+    imported = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:') :].split('|')
+        name = name.strip()
+        imported.append((name, int(self_us)))
+        if name == module:
+            total_us = int(cumulative_us)
+    return total_us / 1000, imported
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=3, help='Execuções por módulo')
+    parser.add_argument(
+        '--top', type=int, default=10, help='Módulos mais lentos a exibir'
+    )
+    args = parser.parse_args(argv)
+
+    failed = False
+    for module, budget_ms in BUDGETS_MS.items():
+        runs = [measure(module) for _ in range(args.runs)]
+        best_ms, imported = min(runs, key=lambda run: run[0])
+        names = {name for name, _ in imported}
+
+        status = 'OK' if best_ms <= budget_ms else 'ACIMA DO ORÇAMENTO'
+        print(f'{module}: {best_ms:.1f} ms (orçamento {budget_ms} ms) {status}')
+        if best_ms > budget_ms:
+            failed = True
+            slowest = sorted(imported, key=lambda item: item[1], reverse=True)
+            for name, self_us in slowest[: args.top]:
+                print(f'    {self_us / 1000:8.1f} ms  {name}')
+
+        for forbidden in FORBIDDEN.get(module, []):
+            if forbidden in names:
+                print(f'    importa {forbidden!r}, que deveria ser carregado sob demanda')
+                failed = True
+
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
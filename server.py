@@ -0,0 +1,103 @@
+"""Servidor de produção com múltiplos workers.
+
+Uso: ``python -m server --workers 4`` (ou ``task serve``). Todas as opções
+também podem ser definidas por variáveis de ambiente (ver ``--help``).
+"""
+
+import argparse
+import os
+
+import uvicorn
+
+
+def _env_int(name, default=None):
+    value = os.getenv(name)
+    return int(value) if value else default
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='python -m server',
+        description='Servidor de produção da API do Sistema de Biblioteca Digital',
+    )
+    parser.add_argument('--host', default=os.getenv('HOST', '0.0.0.0'))
+    parser.add_argument('--port', type=int, default=_env_int('PORT', 8000))
+    parser.add_argument(
+        '--workers',
+        type=int,
+        default=_env_int('WEB_CONCURRENCY', os.cpu_count() or 1),
+        help='Número de processos (WEB_CONCURRENCY, padrão: número de CPUs)',
+    )
+    parser.add_argument(
+        '--limit-concurrency',
+        type=int,
+        default=_env_int('LIMIT_CONCURRENCY'),
+        help='Conexões simultâneas por worker antes de responder 503',
+    )
+    parser.add_argument(
+        '--backlog',
+        type=int,
+        default=_env_int('BACKLOG', 2048),
+        help='Tamanho da fila de conexões pendentes do socket',
+    )
+    parser.add_argument(
+        '--keep-alive',
+        type=int,
+        default=_env_int('KEEP_ALIVE', 5),
+        help='Segundos para manter conexões keep-alive ociosas',
+    )
+    parser.add_argument(
+        '--graceful-timeout',
+        type=int,
+        default=_env_int('GRACEFUL_TIMEOUT', 30),
+        help='Segundos para concluir requisições em andamento ao desligar',
+    )
+    parser.add_argument(
+        '--max-requests',
+        type=int,
+        default=_env_int('MAX_REQUESTS'),
+        help='Reiniciar o worker após N requisições (evita vazamentos)',
+    )
+    parser.add_argument(
+        '--loop',
+        choices=['auto', 'uvloop', 'asyncio'],
+        default=os.getenv('LOOP', 'auto'),
+        help='Event loop (auto usa uvloop quando instalado)',
+    )
+    parser.add_argument(
+        '--http',
+        choices=['auto', 'httptools', 'h11'],
+        default=os.getenv('HTTP', 'auto'),
+        help='Parser HTTP (auto usa httptools quando instalado)',
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    # Os workers herdam o ambiente do processo supervisor
+    os.environ.setdefault('APP_ENV', 'production')
+
+    # Cada worker é um processo novo que importa ``main:app`` e cria o próprio
+    # engine; no desligamento o uvicorn aguarda as requisições em andamento
+    # (graceful timeout) e o lifespan da aplicação fecha o pool
+    uvicorn.run(
+        'main:app',
+        host=args.host,
+        port=args.port,
+        workers=args.workers,
+        limit_concurrency=args.limit_concurrency,
+        backlog=args.backlog,
+        timeout_keep_alive=args.keep_alive,
+        timeout_graceful_shutdown=args.graceful_timeout,
+        limit_max_requests=args.max_requests,
+        loop=args.loop,
+        http=args.http,
+        proxy_headers=True,
+        access_log=False,
+    )
+
+
+if __name__ == '__main__':
+    main()
@@ -1,18 +1,46 @@
+from functools import lru_cache
 from math import ceil
-from typing import List, Optional
+from typing import Optional
 
 from config.logging_config import logger
-from models.models import Autor
+from models.models import Autor, LivroAutorLink, OperacaoEvento
 from schemas.schemas import AutorCreate, AutorUpdate
+from services.evento_service import EventoService
+from services.livro_service import LivroService
+from services.pagination import count_statement, page_statement, paginate_search
+from sqlalchemy import bindparam
 from sqlmodel import Session, select
 
 
+def _livros_do_autor(session: Session, autor_id: int) -> list:
+    return session.exec(
+        select(LivroAutorLink.livro_id).where(LivroAutorLink.autor_id == autor_id)
+    ).all()
+
+
+@lru_cache(maxsize=None)
+def _busca(nome: bool, nacionalidade: bool):
+    # Uma instrução por combinação de filtros; os valores vão como parâmetros
+    statement = select(Autor)
+    if nome:
+        statement = statement.where(
+            (Autor.nome.contains(bindparam('nome')))
+            | (Autor.sobrenome.contains(bindparam('nome')))
+        )
+    if nacionalidade:
+        statement = statement.where(
+            Autor.nacionalidade.contains(bindparam('nacionalidade'))
+        )
+    return statement
+
+
 class AutorService:
     @staticmethod
     def create_autor(session: Session, autor_data: AutorCreate) -> Autor:
         try:
             autor = Autor(**autor_data.model_dump())
             session.add(autor)
+            EventoService.registrar(session, autor, OperacaoEvento.CREATE)
             session.commit()
             session.refresh(autor)
             logger.info(f'Autor criado com sucesso: ID {autor.id}')
@@ -39,12 +67,12 @@ class AutorService:
     def get_all_autores(session: Session, skip: int = 0, limit: int = 100) -> dict:
         try:
             # Contagem total
-            count_statement = select(Autor)
-            total = len(session.exec(count_statement).all())
+            total = session.exec(count_statement(Autor)).one()
 
             # Busca paginada
-            statement = select(Autor).offset(skip).limit(limit)
-            autores = session.exec(statement).all()
+            autores = session.exec(
+                page_statement(Autor), params={'skip': skip, 'limit': limit}
+            ).all()
 
             total_pages = ceil(total / limit) if limit > 0 else 1
             page = (skip // limit) + 1 if limit > 0 else 1
@@ -73,9 +101,16 @@ class AutorService:
                 return None
 
             update_data = autor_update.model_dump(exclude_unset=True)
+            renomeado = any(
+                campo in update_data and update_data[campo] != getattr(autor, campo)
+                for campo in ('nome', 'sobrenome')
+            )
             for field, value in update_data.items():
                 setattr(autor, field, value)
 
+            EventoService.registrar(session, autor, OperacaoEvento.UPDATE)
+            if renomeado:
+                LivroService.atualizar_nomes(session, _livros_do_autor(session, autor_id))
             session.commit()
             session.refresh(autor)
             logger.info(f'Autor atualizado com sucesso: ID {autor_id}')
@@ -93,7 +128,10 @@ class AutorService:
                 logger.warning(f'Autor não encontrado para exclusão: ID {autor_id}')
                 return False
 
+            livro_ids = _livros_do_autor(session, autor_id)
+            EventoService.registrar(session, autor, OperacaoEvento.DELETE)
             session.delete(autor)
+            LivroService.atualizar_nomes(session, livro_ids)
             session.commit()
             logger.info(f'Autor excluído com sucesso: ID {autor_id}')
             return True
@@ -105,8 +143,7 @@ class AutorService:
     @staticmethod
     def count_autores(session: Session) -> int:
         try:
-            statement = select(Autor)
-            count = len(session.exec(statement).all())
+            count = session.exec(count_statement(Autor)).one()
             logger.info(f'Contagem de autores: {count}')
             return count
         except Exception as e:
@@ -114,25 +151,28 @@ class AutorService:
             raise
 
     @staticmethod
-    def search_autores(
+    def search_autores(  # noqa: PLR0913, PLR0917
         session: Session,
         nome: Optional[str] = None,
         nacionalidade: Optional[str] = None,
-    ) -> List[Autor]:
+        skip: int = 0,
+        limit: int = 10,
+        cursor: Optional[str] = None,
+        include_total: bool = False,
+    ) -> dict:
         try:
-            statement = select(Autor)
-
-            if nome:
-                statement = statement.where(
-                    (Autor.nome.contains(nome)) | (Autor.sobrenome.contains(nome))
-                )
-
-            if nacionalidade:
-                statement = statement.where(Autor.nacionalidade.contains(nacionalidade))
-
-            autores = session.exec(statement).all()
-            logger.info(f'Busca de autores: {len(autores)} encontrados')
-            return autores
+            result = paginate_search(
+                session,
+                _busca(bool(nome), bool(nacionalidade)),
+                Autor,
+                skip,
+                limit,
+                cursor,
+                include_total,
+                params={'nome': nome, 'nacionalidade': nacionalidade},
+            )
+            logger.info(f'Busca de autores: {len(result["items"])} encontrados')
+            return result
         except Exception as e:
             logger.error(f'Erro na busca de autores: {str(e)}')
             raise
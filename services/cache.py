@@ -0,0 +1,47 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable
+
+
+class TTLCache:
+    """Cache em memória (por processo) com expiração e invalidação explícita.
+
+    ``invalidate()`` descarta tudo e avança a geração do cache: um valor
+    calculado antes da invalidação e entregue depois dela não é armazenado,
+    evitando que uma leitura concorrente recoloque dados antigos no cache.
+    """
+
+    def __init__(self, ttl_seconds: float, maxsize: int = 1024):
+        self.ttl_seconds = ttl_seconds
+        self.maxsize = maxsize
+        self._data: OrderedDict = OrderedDict()
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def get_or_set(self, key: Hashable, factory: Callable[[], Any]) -> Any:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None and entry[0] > now:
+                self._data.move_to_end(key)
+                return entry[1]
+            generation = self._generation
+
+        value = factory()
+
+        with self._lock:
+            if generation == self._generation:
+                self._data[key] = (time.monotonic() + self.ttl_seconds, value)
+                self._data.move_to_end(key)
+                while len(self._data) > self.maxsize:
+                    self._data.popitem(last=False)
+        return value
+
+    def invalidate(self):
+        with self._lock:
+            self._data.clear()
+            self._generation += 1
+
+    def __len__(self) -> int:
+        return len(self._data)
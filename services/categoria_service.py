@@ -1,12 +1,36 @@
+from functools import lru_cache
 from math import ceil
-from typing import List, Optional
+from typing import Optional
 
 from config.logging_config import logger
-from models.models import Categoria
+from models.models import Categoria, LivroCategoriaLink, OperacaoEvento
 from schemas.schemas import CategoriaCreate, CategoriaUpdate
+from services.evento_service import EventoService
+from services.livro_service import LivroService
+from services.pagination import count_statement, page_statement, paginate_search
+from sqlalchemy import bindparam
 from sqlmodel import Session, select
 
 
+def _livros_da_categoria(session: Session, categoria_id: int) -> list:
+    return session.exec(
+        select(LivroCategoriaLink.livro_id).where(
+            LivroCategoriaLink.categoria_id == categoria_id
+        )
+    ).all()
+
+
+@lru_cache(maxsize=None)
+def _busca(nome: bool, ativa: bool):
+    # Uma instrução por combinação de filtros; os valores vão como parâmetros
+    statement = select(Categoria)
+    if nome:
+        statement = statement.where(Categoria.nome.contains(bindparam('nome')))
+    if ativa:
+        statement = statement.where(Categoria.ativa == bindparam('ativa'))
+    return statement
+
+
 class CategoriaService:
     @staticmethod
     def create_categoria(session: Session, categoria_data: CategoriaCreate) -> Categoria:
@@ -21,6 +45,7 @@ class CategoriaService:
 
             categoria = Categoria(**categoria_data.model_dump())
             session.add(categoria)
+            EventoService.registrar(session, categoria, OperacaoEvento.CREATE)
             session.commit()
             session.refresh(categoria)
             logger.info(f'Categoria criada com sucesso: ID {categoria.id}')
@@ -47,12 +72,12 @@ class CategoriaService:
     def get_all_categorias(session: Session, skip: int = 0, limit: int = 100) -> dict:
         try:
             # Contagem total
-            count_statement = select(Categoria)
-            total = len(session.exec(count_statement).all())
+            total = session.exec(count_statement(Categoria)).one()
 
             # Busca paginada
-            statement = select(Categoria).offset(skip).limit(limit)
-            categorias = session.exec(statement).all()
+            categorias = session.exec(
+                page_statement(Categoria), params={'skip': skip, 'limit': limit}
+            ).all()
 
             total_pages = ceil(total / limit) if limit > 0 else 1
             page = (skip // limit) + 1 if limit > 0 else 1
@@ -94,9 +119,15 @@ class CategoriaService:
                         f"Categoria com nome '{update_data['nome']}' já existe"
                     )
 
+            renomeada = 'nome' in update_data and update_data['nome'] != categoria.nome
             for field, value in update_data.items():
                 setattr(categoria, field, value)
 
+            EventoService.registrar(session, categoria, OperacaoEvento.UPDATE)
+            if renomeada:
+                LivroService.atualizar_nomes(
+                    session, _livros_da_categoria(session, categoria_id)
+                )
             session.commit()
             session.refresh(categoria)
             logger.info(f'Categoria atualizada com sucesso: ID {categoria_id}')
@@ -116,7 +147,10 @@ class CategoriaService:
                 )
                 return False
 
+            livro_ids = _livros_da_categoria(session, categoria_id)
+            EventoService.registrar(session, categoria, OperacaoEvento.DELETE)
             session.delete(categoria)
+            LivroService.atualizar_nomes(session, livro_ids)
             session.commit()
             logger.info(f'Categoria excluída com sucesso: ID {categoria_id}')
             return True
@@ -128,8 +162,7 @@ class CategoriaService:
     @staticmethod
     def count_categorias(session: Session) -> int:
         try:
-            statement = select(Categoria)
-            count = len(session.exec(statement).all())
+            count = session.exec(count_statement(Categoria)).one()
             logger.info(f'Contagem de categorias: {count}')
             return count
         except Exception as e:
@@ -137,22 +170,27 @@ class CategoriaService:
             raise
 
     @staticmethod
-    def search_categorias(
+    def search_categorias(  # noqa: PLR0913, PLR0917
         session: Session,
         nome: Optional[str] = None,
         ativa: Optional[bool] = None,
-    ) -> List[Categoria]:
+        skip: int = 0,
+        limit: int = 10,
+        cursor: Optional[str] = None,
+        include_total: bool = False,
+    ) -> dict:
         try:
-            statement = select(Categoria)
-
-            if nome:
-                statement = statement.where(Categoria.nome.contains(nome))
-
-            if ativa is not None:
-                statement = statement.where(Categoria.ativa == ativa)
-
-            categorias = session.exec(statement).all()
-            logger.info(f'Busca de categorias: {len(categorias)} encontradas')
-            return categorias
+            result = paginate_search(
+                session,
+                _busca(bool(nome), ativa is not None),
+                Categoria,
+                skip,
+                limit,
+                cursor,
+                include_total,
+                params={'nome': nome, 'ativa': ativa},
+            )
+            logger.info(f'Busca de categorias: {len(result["items"])} encontradas')
+            return result
         except Exception as e:
             logger.error(f'Erro na busca de categorias: {str(e)}')
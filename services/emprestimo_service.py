@@ -1,13 +1,126 @@
+from collections import Counter
 from datetime import date, datetime
+from functools import lru_cache
 from math import ceil
 from typing import List, Optional
 
 from config.logging_config import logger
-from models.models import Emprestimo, Livro, StatusEmprestimo, Usuario
-from schemas.schemas import EmprestimoCreate, EmprestimoUpdate
+from models.models import (
+    Emprestimo,
+    EmprestimoArquivo,
+    Livro,
+    OperacaoEvento,
+    StatusEmprestimo,
+    StatusReserva,
+    Usuario,
+)
+from schemas.schemas import (
+    DevolucaoLote,
+    EmprestimoCreate,
+    EmprestimoLoteCreate,
+    EmprestimoResumo,
+    EmprestimoUpdate,
+)
+from services import leitura
+from services.evento_service import EventoService
+from services.livro_service import LivroService
+from services.pagination import (
+    SEARCH_MAX_LIMIT,
+    count_statement,
+    decode_cursor,
+    encode_cursor,
+    page_statement,
+    paginate_search,
+)
+from services.particao_service import COLUNAS_ARQUIVO
+from services.recomendacao_service import RecomendacaoService
+from services.reserva_service import ReservaService
+from sqlalchemy import bindparam, literal, tuple_, union_all, update
+from sqlalchemy.orm import aliased
 from sqlmodel import Session, select
 
 
+def _filtrar(modelo, statement, forma: tuple):
+    usuario_id, livro_id, status, data_inicio, data_fim = forma
+    if usuario_id:
+        statement = statement.where(modelo.usuario_id == bindparam('usuario_id'))
+
+    if livro_id:
+        statement = statement.where(modelo.livro_id == bindparam('livro_id'))
+
+    if status:
+        statement = statement.where(modelo.status == bindparam('status'))
+
+    if data_inicio:
+        statement = statement.where(modelo.data_emprestimo >= bindparam('data_inicio'))
+
+    if data_fim:
+        statement = statement.where(modelo.data_emprestimo <= bindparam('data_fim'))
+    return statement
+
+
+@lru_cache(maxsize=None)
+def _busca(forma: tuple, incluir_arquivados: bool):
+    """Instrução e entidade da busca para os filtros informados em ``forma``.
+
+    Uma por combinação de filtros; os valores vão como parâmetros.
+    """
+    if not incluir_arquivados:
+        return _filtrar(Emprestimo, select(Emprestimo), forma), Emprestimo
+    # Os filtros vão para cada lado da união, onde usam os índices
+    uniao = union_all(
+        _filtrar(
+            Emprestimo,
+            select(*(getattr(Emprestimo, c) for c in COLUNAS_ARQUIVO)),
+            forma,
+        ),
+        _filtrar(
+            EmprestimoArquivo,
+            select(*(getattr(EmprestimoArquivo, c) for c in COLUNAS_ARQUIVO)),
+            forma,
+        ),
+    ).subquery()
+    modelo = aliased(Emprestimo, uniao)
+    return select(modelo), modelo
+
+
+def _bloquear_livros(session: Session, livro_ids: List[int]) -> dict:
+    # Uma consulta para todos os livros; a ordem por id evita deadlocks entre
+    # lotes concorrentes que compartilham livros
+    livros = session.exec(
+        select(Livro)
+        .where(Livro.id.in_(set(livro_ids)))
+        .order_by(Livro.id)
+        .with_for_update()
+    ).all()
+    return {livro.id: livro for livro in livros}
+
+
+def _recusa_emprestimo(
+    livro_id: int, livro: Optional[Livro], vistos: set, reservado: bool
+) -> Optional[str]:
+    if livro_id in vistos:
+        return 'Livro repetido no lote'
+    if not livro:
+        return f'Livro com ID {livro_id} não encontrado'
+    if not reservado and livro.quantidade_disponivel <= 0:
+        return 'Livro não está disponível para empréstimo'
+    return None
+
+
+def _resultado_lote(resultados: List[dict]) -> dict:
+    # Convertido antes do commit, que expiraria os empréstimos
+    for item in resultados:
+        if item['emprestimo'] is not None:
+            item['emprestimo'] = EmprestimoResumo.model_validate(item['emprestimo'])
+    sucesso = sum(1 for item in resultados if item['sucesso'])
+    return {
+        'items': resultados,
+        'sucesso': sucesso,
+        'falhas': len(resultados) - sucesso,
+    }
+
+
 class EmprestimoService:
     @staticmethod
     def create_emprestimo(
@@ -24,14 +137,19 @@ class EmprestimoService:
             if not usuario.ativo:
                 raise ValueError('Usuário não está ativo')
 
-            # Verificar se o livro existe e está disponível
-            livro = session.get(Livro, emprestimo_data.livro_id)
+            # Verificar se o livro existe e está disponível (com o livro
+            # bloqueado até o commit, como nas devoluções e reservas)
+            livro = session.get(Livro, emprestimo_data.livro_id, with_for_update=True)
             if not livro:
                 raise ValueError(
                     f'Livro com ID {emprestimo_data.livro_id} não encontrado'
                 )
 
-            if livro.quantidade_disponivel <= 0:
+            # Exemplar separado por reserva não conta em quantidade_disponivel
+            notificar = ReservaService.expirar_reservas(session, livro)
+            reservado = ReservaService.atender_reserva(session, usuario.id, livro.id)
+
+            if not reservado and livro.quantidade_disponivel <= 0:
                 raise ValueError('Livro não está disponível para empréstimo')
 
             # Criar o empréstimo
@@ -39,10 +157,16 @@ class EmprestimoService:
             session.add(emprestimo)
 
             # Atualizar quantidade disponível do livro
-            livro.quantidade_disponivel -= 1
+            if not reservado:
+                livro.quantidade_disponivel -= 1
+                EventoService.registrar(session, livro, OperacaoEvento.UPDATE)
 
+            EventoService.registrar(session, emprestimo, OperacaoEvento.CREATE)
+            RecomendacaoService.agendar_atualizacao(session)
             session.commit()
             session.refresh(emprestimo)
+            LivroService.invalidar_disponiveis()
+            ReservaService.notificar(notificar)
             logger.info(f'Empréstimo criado com sucesso: ID {emprestimo.id}')
             return emprestimo
         except Exception as e:
@@ -50,6 +174,190 @@ class EmprestimoService:
             logger.error(f'Erro ao criar empréstimo: {str(e)}')
             raise
 
+    @staticmethod
+    def create_emprestimos_lote(session: Session, lote: EmprestimoLoteCreate) -> dict:
+        """Empresta vários livros a um usuário numa única transação.
+
+        O usuário é validado uma vez, os livros são lidos e bloqueados numa só
+        consulta e as quantidades são decrementadas num único UPDATE. Cada
+        livro tem o seu resultado: os indisponíveis não impedem os demais.
+        """
+        try:
+            usuario = session.get(Usuario, lote.usuario_id)
+            if not usuario:
+                raise ValueError(f'Usuário com ID {lote.usuario_id} não encontrado')
+
+            if not usuario.ativo:
+                raise ValueError('Usuário não está ativo')
+
+            livros = _bloquear_livros(session, lote.livro_ids)
+            separadas, notificar = ReservaService.separadas_para_usuario(
+                session, usuario.id, livros
+            )
+
+            resultados = []
+            vistos = set()
+            decrementar = []
+            emprestimos = []
+            for livro_id in lote.livro_ids:
+                erro = _recusa_emprestimo(
+                    livro_id, livros.get(livro_id), vistos, livro_id in separadas
+                )
+                emprestimo = None
+                if not erro:
+                    if livro_id in separadas:
+                        # Exemplar separado por reserva: não conta na quantidade
+                        reserva = separadas[livro_id]
+                        reserva.status = StatusReserva.ATENDIDA
+                        EventoService.registrar(session, reserva, OperacaoEvento.UPDATE)
+                    else:
+                        decrementar.append(livro_id)
+                    emprestimo = Emprestimo(
+                        usuario_id=usuario.id,
+                        livro_id=livro_id,
+                        data_devolucao_prevista=lote.data_devolucao_prevista,
+                        observacoes=lote.observacoes,
+                    )
+                    emprestimos.append(emprestimo)
+                vistos.add(livro_id)
+                resultados.append({
+                    'id': livro_id,
+                    'sucesso': not erro,
+                    'erro': erro,
+                    'emprestimo': emprestimo,
+                })
+
+            if decrementar:
+                session.exec(
+                    update(Livro)
+                    .where(Livro.id.in_(decrementar))
+                    .values(quantidade_disponivel=Livro.quantidade_disponivel - 1)
+                )
+                for livro_id in decrementar:
+                    EventoService.registrar(
+                        session, livros[livro_id], OperacaoEvento.UPDATE
+                    )
+
+            if emprestimos:
+                # Um único flush insere todos os empréstimos de uma vez
+                session.add_all(emprestimos)
+                session.flush()
+                for emprestimo in emprestimos:
+                    EventoService.registrar(session, emprestimo, OperacaoEvento.CREATE)
+                RecomendacaoService.agendar_atualizacao(session)
+
+            result = _resultado_lote(resultados)
+            session.commit()
+            if emprestimos:
+                LivroService.invalidar_disponiveis()
+            ReservaService.notificar(notificar)
+            logger.info(
+                f'Empréstimos em lote para o usuário ID {usuario.id}: '
+                f'{result["sucesso"]} criados, {result["falhas"]} recusados'
+            )
+            return result
+        except Exception as e:
+            session.rollback()
+            logger.error(f'Erro ao criar empréstimos em lote: {str(e)}')
+            raise
+
+    @staticmethod
+    def devolver_lote(session: Session, lote: DevolucaoLote) -> dict:
+        """Devolve vários empréstimos numa única transação.
+
+        Os empréstimos e os livros são lidos e bloqueados em uma consulta
+        cada (empréstimos antes dos livros, como em ``update_emprestimo``), os
+        empréstimos ainda ativos são marcados como devolvidos num único UPDATE
+        e os exemplares vão para as filas de reserva ou voltam ao acervo em
+        lote. Um empréstimo devolvido por outra transação ao mesmo tempo é
+        recusado, e o seu exemplar não é liberado duas vezes.
+        """
+        try:
+            data_devolucao = lote.data_devolucao_real or date.today()
+            emprestimos = {
+                emprestimo.id: emprestimo
+                for emprestimo in session.exec(
+                    select(Emprestimo)
+                    .where(Emprestimo.id.in_(set(lote.emprestimo_ids)))
+                    .order_by(Emprestimo.id)
+                    .with_for_update()
+                    .execution_options(populate_existing=True)
+                )
+            }
+            ativos = {
+                emprestimo.id
+                for emprestimo in emprestimos.values()
+                if emprestimo.status == StatusEmprestimo.ATIVO
+            }
+            livros = _bloquear_livros(
+                session, [emprestimos[emprestimo_id].livro_id for emprestimo_id in ativos]
+            )
+
+            if ativos:
+                # A condição de status garante que só esta transação devolve
+                # cada empréstimo, mesmo sem bloqueio de linha (SQLite)
+                ativos = set(
+                    session.exec(
+                        update(Emprestimo)
+                        .where(
+                            Emprestimo.id.in_(ativos),
+                            Emprestimo.status == StatusEmprestimo.ATIVO,
+                        )
+                        .values(
+                            status=StatusEmprestimo.DEVOLVIDO,
+                            data_devolucao_real=data_devolucao,
+                        )
+                        .returning(Emprestimo.id)
+                    ).scalars()
+                )
+
+            resultados = []
+            vistos = set()
+            devolvidos = []
+            for emprestimo_id in lote.emprestimo_ids:
+                emprestimo = emprestimos.get(emprestimo_id)
+                erro = None
+                if emprestimo_id in vistos:
+                    erro = 'Empréstimo repetido no lote'
+                elif not emprestimo:
+                    erro = f'Empréstimo com ID {emprestimo_id} não encontrado'
+                elif emprestimo_id not in ativos:
+                    erro = 'Empréstimo não está ativo'
+                else:
+                    devolvidos.append(emprestimo)
+                vistos.add(emprestimo_id)
+                resultados.append({
+                    'id': emprestimo_id,
+                    'sucesso': not erro,
+                    'erro': erro,
+                    'emprestimo': emprestimo if not erro else None,
+                })
+
+            notificar = []
+            if devolvidos:
+                for emprestimo in devolvidos:
+                    EventoService.registrar(session, emprestimo, OperacaoEvento.UPDATE)
+                notificar = ReservaService.liberar_exemplares(
+                    session,
+                    livros,
+                    Counter(emprestimo.livro_id for emprestimo in devolvidos),
+                )
+
+            result = _resultado_lote(resultados)
+            session.commit()
+            if devolvidos:
+                LivroService.invalidar_disponiveis()
+            ReservaService.notificar(notificar)
+            logger.info(
+                f'Devolução em lote: {result["sucesso"]} devolvidos, '
+                f'{result["falhas"]} recusados'
+            )
+            return result
+        except Exception as e:
+            session.rollback()
+            logger.error(f'Erro na devolução em lote: {str(e)}')
+            raise
+
     @staticmethod
     def get_emprestimo_by_id(
         session: Session, emprestimo_id: int
@@ -66,15 +374,23 @@ class EmprestimoService:
             raise
 
     @staticmethod
-    def get_all_emprestimos(session: Session, skip: int = 0, limit: int = 100) -> dict:
+    def get_all_emprestimos(
+        session: Session, skip: int = 0, limit: int = 100, leve: bool = False
+    ) -> dict:
+        """Com ``leve``, itens em dicts lidos das colunas (``services.leitura``)"""
         try:
             # Contagem total
-            count_statement = select(Emprestimo)
-            total = len(session.exec(count_statement).all())
+            total = session.exec(count_statement(Emprestimo)).one()
 
             # Busca paginada
-            statement = select(Emprestimo).offset(skip).limit(limit)
-            emprestimos = session.exec(statement).all()
+            statement = page_statement(Emprestimo)
+            if leve:
+                statement = leitura.pagina(Emprestimo, leitura.CAMPOS_EMPRESTIMO)
+            emprestimos = session.exec(
+                statement, params={'skip': skip, 'limit': limit}
+            ).all()
+            if leve:
+                emprestimos = leitura.emprestimos(session, emprestimos)
 
             total_pages = ceil(total / limit) if limit > 0 else 1
             page = (skip // limit) + 1 if limit > 0 else 1
@@ -99,7 +415,11 @@ class EmprestimoService:
         emprestimo_update: EmprestimoUpdate,
     ) -> Optional[Emprestimo]:
         try:
-            emprestimo = session.get(Emprestimo, emprestimo_id)
+            # Bloqueado até o commit: duas devoluções simultâneas não liberam o
+            # exemplar duas vezes (a segunda vê o status já devolvido)
+            emprestimo = session.get(
+                Emprestimo, emprestimo_id, with_for_update=True, populate_existing=True
+            )
             if not emprestimo:
                 logger.warning(
                     f'Empréstimo não encontrado para atualização: ID {emprestimo_id}'
@@ -107,6 +427,8 @@ class EmprestimoService:
                 return None
 
             update_data = emprestimo_update.model_dump(exclude_unset=True)
+            devolvido = False
+            notificar = []
 
             # Se está devolvendo o livro
             if (
@@ -114,16 +436,23 @@ class EmprestimoService:
                 and update_data['data_devolucao_real'] is not None
             ):
                 if emprestimo.status == StatusEmprestimo.ATIVO:
-                    livro = session.get(Livro, emprestimo.livro_id)
+                    livro = session.get(Livro, emprestimo.livro_id, with_for_update=True)
                     if livro:
-                        livro.quantidade_disponivel += 1
+                        # O exemplar vai para o primeiro da fila de reservas,
+                        # na mesma transação, ou volta ao acervo
+                        notificar = ReservaService.liberar_exemplar(session, livro)
+                        devolvido = True
                     update_data['status'] = StatusEmprestimo.DEVOLVIDO
 
             for field, value in update_data.items():
                 setattr(emprestimo, field, value)
 
+            EventoService.registrar(session, emprestimo, OperacaoEvento.UPDATE)
             session.commit()
             session.refresh(emprestimo)
+            if devolvido:
+                LivroService.invalidar_disponiveis()
+                ReservaService.notificar(notificar)
             logger.info(f'Empréstimo atualizado com sucesso: ID {emprestimo_id}')
             return emprestimo
         except Exception as e:
@@ -134,7 +463,9 @@ class EmprestimoService:
     @staticmethod
     def delete_emprestimo(session: Session, emprestimo_id: int) -> bool:
         try:
-            emprestimo = session.get(Emprestimo, emprestimo_id)
+            emprestimo = session.get(
+                Emprestimo, emprestimo_id, with_for_update=True, populate_existing=True
+            )
             if not emprestimo:
                 logger.warning(
                     f'Empréstimo não encontrado para exclusão: ID {emprestimo_id}'
@@ -142,13 +473,17 @@ class EmprestimoService:
                 return False
 
             # Se o empréstimo estava ativo, devolver o livro
+            notificar = []
             if emprestimo.status == StatusEmprestimo.ATIVO:
-                livro = session.get(Livro, emprestimo.livro_id)
+                livro = session.get(Livro, emprestimo.livro_id, with_for_update=True)
                 if livro:
-                    livro.quantidade_disponivel += 1
+                    notificar = ReservaService.liberar_exemplar(session, livro)
 
+            EventoService.registrar(session, emprestimo, OperacaoEvento.DELETE)
             session.delete(emprestimo)
             session.commit()
+            LivroService.invalidar_disponiveis()
+            ReservaService.notificar(notificar)
             logger.info(f'Empréstimo excluído com sucesso: ID {emprestimo_id}')
             return True
         except Exception as e:
@@ -159,8 +494,7 @@ class EmprestimoService:
     @staticmethod
     def count_emprestimos(session: Session) -> int:
         try:
-            statement = select(Emprestimo)
-            count = len(session.exec(statement).all())
+            count = session.exec(count_statement(Emprestimo)).one()
             logger.info(f'Contagem de empréstimos: {count}')
             return count
         except Exception as e:
@@ -168,41 +502,141 @@ class EmprestimoService:
             raise
 
     @staticmethod
-    def search_emprestimos(
+    def search_emprestimos(  # noqa: PLR0913, PLR0917
         session: Session,
         usuario_id: Optional[int] = None,
         livro_id: Optional[int] = None,
         status: Optional[StatusEmprestimo] = None,
         data_inicio: Optional[date] = None,
         data_fim: Optional[date] = None,
-    ) -> List[Emprestimo]:
+        skip: int = 0,
+        limit: int = 10,
+        cursor: Optional[str] = None,
+        include_total: bool = False,
+        incluir_arquivados: bool = False,
+        leve: bool = False,
+    ) -> dict:
+        """Com ``incluir_arquivados``, busca também em ``emprestimo_arquivo``.
+
+        Com ``leve``, os itens são dicts montados direto das colunas, com
+        usuário e livro, sem instâncias ORM (``services.leitura``).
+        """
         try:
-            statement = select(Emprestimo)
+            forma = (
+                bool(usuario_id),
+                bool(livro_id),
+                bool(status),
+                bool(data_inicio),
+                bool(data_fim),
+            )
+            statement, modelo = _busca(forma, incluir_arquivados)
+            if leve:
+                statement = leitura.somente_colunas(
+                    statement, modelo, leitura.CAMPOS_EMPRESTIMO
+                )
+            params = {'usuario_id': usuario_id, 'livro_id': livro_id, 'status': status}
+            if data_inicio:
+                params['data_inicio'] = datetime.combine(data_inicio, datetime.min.time())
+            if data_fim:
+                params['data_fim'] = datetime.combine(data_fim, datetime.max.time())
 
-            if usuario_id:
-                statement = statement.where(Emprestimo.usuario_id == usuario_id)
+            result = paginate_search(
+                session,
+                statement,
+                modelo,
+                skip,
+                limit,
+                cursor,
+                include_total,
+                params=params,
+            )
+            if leve:
+                result['items'] = leitura.emprestimos(session, result['items'])
+            logger.info(f'Busca de empréstimos: {len(result["items"])} encontrados')
+            return result
+        except Exception as e:
+            logger.error(f'Erro na busca de empréstimos: {str(e)}')
+            raise
+
+    @staticmethod
+    def get_historico_usuario(
+        session: Session,
+        usuario_id: int,
+        limit: int = 20,
+        cursor: Optional[str] = None,
+        status: Optional[StatusEmprestimo] = None,
+    ) -> Optional[dict]:
+        """Empréstimos do usuário do mais recente para o mais antigo.
 
-            if livro_id:
-                statement = statement.where(Emprestimo.livro_id == livro_id)
+        Lê só as colunas do resumo, na ordem decrescente da chave do índice
+        ``ix_emprestimo_usuario_data_status`` (data, status, id), com
+        paginação por chave: a consulta é uma única varredura de faixa.
+        Retorna ``None`` se o usuário não existir.
+        """
+        try:
+            limit = max(1, min(limit, SEARCH_MAX_LIMIT))
+            statement = select(
+                Emprestimo.id,
+                Emprestimo.livro_id,
+                Emprestimo.data_emprestimo,
+                Emprestimo.data_devolucao_prevista,
+                Emprestimo.data_devolucao_real,
+                Emprestimo.status,
+            ).where(Emprestimo.usuario_id == usuario_id)
 
             if status:
                 statement = statement.where(Emprestimo.status == status)
 
-            if data_inicio:
-                statement = statement.where(
-                    Emprestimo.data_emprestimo
-                    >= datetime.combine(data_inicio, datetime.min.time())
+            chave = (Emprestimo.data_emprestimo, Emprestimo.status, Emprestimo.id)
+            if cursor:
+                data_emprestimo, last_status, last_id = decode_cursor(cursor)
+                valores = (
+                    datetime.fromisoformat(data_emprestimo),
+                    StatusEmprestimo(last_status),
+                    last_id,
                 )
-
-            if data_fim:
                 statement = statement.where(
-                    Emprestimo.data_emprestimo
-                    <= datetime.combine(data_fim, datetime.max.time())
+                    tuple_(*chave)
+                    < tuple_(
+                        *(
+                            literal(valor, type_=coluna.type)
+                            for coluna, valor in zip(chave, valores)
+                        )
+                    )
                 )
 
-            emprestimos = session.exec(statement).all()
-            logger.info(f'Busca de empréstimos: {len(emprestimos)} encontrados')
-            return emprestimos
+            statement = statement.order_by(*(coluna.desc() for coluna in chave)).limit(
+                limit + 1
+            )
+            rows = session.exec(statement).all()
+
+            # Só consulta o usuário quando não há resultado (distinguir 404)
+            if not rows and not cursor and not session.get(Usuario, usuario_id):
+                logger.warning(f'Usuário não encontrado: ID {usuario_id}')
+                return None
+
+            has_more = len(rows) > limit
+            items = rows[:limit]
+            last = items[-1] if items else None
+            logger.info(
+                f'Histórico de empréstimos do usuário ID {usuario_id}: '
+                f'{len(items)} encontrados'
+            )
+            return {
+                'items': items,
+                'limit': limit,
+                'has_more': has_more,
+                'next_cursor': (
+                    encode_cursor(
+                        last.data_emprestimo.isoformat(), last.status.value, last.id
+                    )
+                    if has_more
+                    else None
+                ),
+            }
         except Exception as e:
-            logger.error(f'Erro na busca de empréstimos: {str(e)}')
+            logger.error(
+                f'Erro ao buscar histórico de empréstimos do usuário ID {usuario_id}: '
+                f'{str(e)}'
+            )
             raise
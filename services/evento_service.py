@@ -0,0 +1,164 @@
+"""Feed de mudanças das entidades.
+
+Os serviços chamam ``EventoService.registrar`` em cada criação, alteração
+ou exclusão, antes do commit: o evento é gravado na tabela ``evento`` na
+mesma transação (outbox), e só existe se a alteração existir. O id do evento
+é o offset do feed; consumidores guardam o último id recebido e retomam dali.
+"""
+
+from datetime import date, datetime, timedelta
+from enum import Enum
+from typing import List, Optional, Sequence, Tuple
+
+from sqlalchemy import event
+from sqlalchemy import inspect as sa_inspect
+from sqlmodel import Session, select
+
+from config.logging_config import logger
+from models.models import Evento, OperacaoEvento
+from services.notificacao import Notificador
+
+# Ids ainda não visíveis mais novos que isto podem ser de transações em
+# andamento (a sequência é atribuída antes do commit); o feed para antes deles
+JANELA_LACUNA = timedelta(seconds=10)
+# Ids examinados por chamada para calcular até onde o feed é seguro
+LOTE_IDS = 1000
+
+# Aviso aos consumidores (SSE/WebSocket) deste processo após cada commit
+notificador_eventos = Notificador()
+CHAVE_NOTIFICACAO = 'eventos'
+
+
+def _valor_json(valor):
+    if isinstance(valor, Enum):
+        return valor.value
+    if isinstance(valor, (date, datetime)):
+        return valor.isoformat()
+    return valor
+
+
+def _ao_commit(session):
+    if session.info.pop('eventos_pendentes', False):
+        notificador_eventos.notificar(CHAVE_NOTIFICACAO)
+
+
+def _ao_rollback(session, previous_transaction):
+    if previous_transaction.parent is None:
+        session.info.pop('eventos_pendentes', None)
+
+
+event.listen(Session, 'after_commit', _ao_commit)
+event.listen(Session, 'after_soft_rollback', _ao_rollback)
+
+
+class EventoService:
+    @staticmethod
+    def registrar(session: Session, obj, operacao: OperacaoEvento) -> Evento:
+        """Adiciona o evento da alteração de ``obj`` à transação corrente"""
+        if obj.id is None:
+            session.flush()
+
+        dados = None
+        if operacao != OperacaoEvento.DELETE:
+            dados = {
+                attr.key: _valor_json(getattr(obj, attr.key))
+                for attr in sa_inspect(obj).mapper.column_attrs
+            }
+
+        evento = Evento(
+            entidade=obj.__tablename__,
+            entidade_id=obj.id,
+            operacao=operacao,
+            dados=dados,
+        )
+        session.add(evento)
+        session.info['eventos_pendentes'] = True
+        return evento
+
+    @staticmethod
+    def limite_seguro(session: Session, desde: int) -> int:
+        """Maior offset até o qual nenhum evento pode ainda aparecer.
+
+        Uma lacuna na sequência recente pode ser uma transação ainda aberta;
+        lacunas mais antigas que ``JANELA_LACUNA`` são de transações
+        desfeitas (ou de eventos já removidos) e são ignoradas.
+        """
+        rows = session.exec(
+            select(Evento.id, Evento.data_criacao)
+            .where(Evento.id > desde)
+            .order_by(Evento.id)
+            .limit(LOTE_IDS)
+        ).all()
+
+        recente = datetime.now() - JANELA_LACUNA
+        limite = desde
+        for evento_id, data_criacao in rows:
+            if evento_id != limite + 1 and data_criacao > recente:
+                break
+            limite = evento_id
+        return limite
+
+    @staticmethod
+    def listar(
+        session: Session,
+        desde: int = 0,
+        limit: int = 100,
+        entidades: Optional[Sequence[str]] = None,
+    ) -> Tuple[List[Evento], int]:
+        """Eventos após o offset ``desde`` e o offset para a próxima leitura"""
+        try:
+            limite = EventoService.limite_seguro(session, desde)
+            statement = select(Evento).where(Evento.id > desde, Evento.id <= limite)
+            if entidades:
+                statement = statement.where(Evento.entidade.in_(entidades))
+
+            eventos = session.exec(statement.order_by(Evento.id).limit(limit)).all()
+            proximo = eventos[-1].id if len(eventos) == limit else limite
+            return eventos, proximo
+        except Exception as e:
+            logger.error(f'Erro ao listar eventos desde {desde}: {str(e)}')
+            raise
+
+    @staticmethod
+    def alteracoes(session: Session, entidade: str, since: int = 0, limit: int = 500):
+        """Linhas criadas, alteradas e excluídas de ``entidade`` após ``since``.
+
+        Lê só os eventos da entidade pelo índice ``(entidade, id)``: o custo é
+        proporcional às mudanças, não ao tamanho da tabela. Vários eventos da
+        mesma linha são consolidados no último estado; uma linha criada e
+        excluída dentro do intervalo não aparece.
+        """
+        try:
+            eventos, proximo = EventoService.listar(session, since, limit, [entidade])
+
+            primeiro, ultimo = {}, {}
+            for evento in eventos:
+                primeiro.setdefault(evento.entidade_id, evento)
+                ultimo[evento.entidade_id] = evento
+
+            created, updated, deleted = [], [], []
+            for entidade_id, evento in ultimo.items():
+                criado = primeiro[entidade_id].operacao == OperacaoEvento.CREATE
+                if evento.operacao == OperacaoEvento.DELETE:
+                    if not criado:
+                        deleted.append(entidade_id)
+                elif criado:
+                    created.append(evento.dados)
+                else:
+                    updated.append(evento.dados)
+
+            has_more = EventoService.limite_seguro(session, proximo) > proximo
+            logger.info(
+                f'Alterações de {entidade} desde {since}: {len(created)} criadas, '
+                f'{len(updated)} alteradas, {len(deleted)} excluídas'
+            )
+            return {
+                'created': created,
+                'updated': updated,
+                'deleted': deleted,
+                'next_since': proximo,
+                'has_more': has_more,
+            }
+        except Exception as e:
+            logger.error(f'Erro ao listar alterações de {entidade}: {str(e)}')
+            raise
@@ -0,0 +1,464 @@
+"""Exportação dos empréstimos para análise (Parquet ou Arrow IPC).
+
+Cada linha é um empréstimo (inclusive os arquivados) com os dados do livro,
+as categorias (``categorias_nomes``, já desnormalizadas no livro) e o usuário.
+Os arquivos ficam em partições diárias pela data do empréstimo::
+
+    <destino>/data=2026-10-19/emprestimos.parquet
+
+A leitura é feita com cursor do lado do servidor, em lotes de
+``LOTE_EXPORTACAO`` linhas convertidos direto em ``RecordBatch``: a memória
+usada não depende do tamanho da tabela.
+
+A exportação é incremental: o offset do feed de eventos fica em
+``_estado.json``, e cada execução reescreve só os dias com empréstimos
+criados, alterados ou excluídos desde então, ou cujo livro ou usuário teve
+alterado um campo copiado nas linhas (categorias renomeadas chegam como
+eventos dos livros, com ``categorias_nomes`` novo). A primeira execução (ou
+``completo``) exporta tudo. Execução pela linha de comando
+(``python -m services.exportacao_service``), por exemplo num cron diário,
+ou em segundo plano pelo endpoint ``POST /exportacoes/emprestimos``.
+
+Requer o pacote ``pyarrow`` (extra ``analise``).
+"""
+
+import argparse
+import importlib
+import importlib.util
+import json
+import os
+from datetime import date, datetime
+from typing import Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import Date, func, or_, union_all
+from sqlmodel import Session, select
+
+from config.logging_config import logger
+from config.settings import Settings
+from models.models import (
+    Emprestimo,
+    EmprestimoArquivo,
+    Evento,
+    Livro,
+    OperacaoEvento,
+    Usuario,
+)
+from services.evento_service import LOTE_IDS, EventoService
+from services.particao_service import COLUNAS_ARQUIVO
+from services.tarefa_service import TarefaService, tarefa
+
+TAREFA_EXPORTACAO = 'exportacao.emprestimos'
+# Linhas lidas do banco e gravadas por RecordBatch
+LOTE_EXPORTACAO = 50_000
+# Eventos lidos por consulta ao calcular os dias alterados
+LOTE_EVENTOS = 1000
+FORMATOS = ('parquet', 'arrow')
+ESTADO = '_estado.json'
+
+# Campos de livro e usuário copiados em cada linha exportada: alterá-los
+# reescreve os dias dos empréstimos do livro ou do usuário
+CAMPOS_COPIADOS = {
+    'livro': ('titulo', 'isbn', 'editora', 'ano_publicacao', 'categorias_nomes'),
+    'usuario': ('nome',),
+}
+
+COLUNAS = (
+    'emprestimo_id',
+    'data_emprestimo',
+    'data_devolucao_prevista',
+    'data_devolucao_real',
+    'status',
+    'usuario_id',
+    'usuario_nome',
+    'livro_id',
+    'livro_titulo',
+    'livro_isbn',
+    'livro_editora',
+    'livro_ano_publicacao',
+    'categorias',
+)
+
+
+def _pyarrow():
+    # Importação sob demanda: pyarrow é opcional (extra "analise") e pesado
+    import pyarrow as pa  # noqa: PLC0415
+
+    for modulo in ('pyarrow.ipc', 'pyarrow.parquet'):
+        importlib.import_module(modulo)
+    return pa
+
+
+def _schema():
+    pa = _pyarrow()
+    return pa.schema([
+        ('emprestimo_id', pa.int64()),
+        ('data_emprestimo', pa.timestamp('us')),
+        ('data_devolucao_prevista', pa.date32()),
+        ('data_devolucao_real', pa.date32()),
+        ('status', pa.dictionary(pa.int8(), pa.string())),
+        ('usuario_id', pa.int64()),
+        ('usuario_nome', pa.string()),
+        ('livro_id', pa.int64()),
+        ('livro_titulo', pa.string()),
+        ('livro_isbn', pa.string()),
+        ('livro_editora', pa.string()),
+        ('livro_ano_publicacao', pa.int32()),
+        ('categorias', pa.list_(pa.string())),
+    ])
+
+
+def _consulta(dias: Optional[Iterable[date]] = None):
+    """Empréstimos (ativos e arquivados) com livro e usuário, em ordem de data"""
+
+    def origem(modelo):
+        statement = select(*(getattr(modelo, coluna) for coluna in COLUNAS_ARQUIVO))
+        if dias is not None:
+            # Faixas por dia: no PostgreSQL só as partições dos dias são lidas
+            statement = statement.where(
+                or_(
+                    *(
+                        modelo.data_emprestimo.between(
+                            datetime.combine(dia, datetime.min.time()),
+                            datetime.combine(dia, datetime.max.time()),
+                        )
+                        for dia in dias
+                    )
+                )
+            )
+        return statement
+
+    emprestimos = union_all(origem(Emprestimo), origem(EmprestimoArquivo)).subquery()
+    return (
+        select(
+            emprestimos.c.id,
+            emprestimos.c.data_emprestimo,
+            emprestimos.c.data_devolucao_prevista,
+            emprestimos.c.data_devolucao_real,
+            emprestimos.c.status,
+            emprestimos.c.usuario_id,
+            Usuario.nome,
+            emprestimos.c.livro_id,
+            Livro.titulo,
+            Livro.isbn,
+            Livro.editora,
+            Livro.ano_publicacao,
+            Livro.categorias_nomes,
+        )
+        .join(Livro, Livro.id == emprestimos.c.livro_id)
+        .join(Usuario, Usuario.id == emprestimos.c.usuario_id)
+        .order_by(emprestimos.c.data_emprestimo, emprestimos.c.id)
+    )
+
+
+def _lote(linhas: List[tuple], schema):
+    pa = _pyarrow()
+    colunas = [list(valores) for valores in zip(*linhas)]
+    status = COLUNAS.index('status')
+    colunas[status] = [getattr(valor, 'value', valor) for valor in colunas[status]]
+    return pa.RecordBatch.from_arrays(
+        [pa.array(valores, campo.type) for valores, campo in zip(colunas, schema)],
+        schema=schema,
+    )
+
+
+def _caminho(destino: str, dia: date, formato: str) -> str:
+    return os.path.join(destino, f'data={dia}', f'emprestimos.{formato}')
+
+
+class _ArquivoDia:
+    """Arquivo de um dia, gravado num temporário e publicado ao fechar"""
+
+    def __init__(self, destino: str, dia: date, formato: str, schema):
+        self.caminho = _caminho(destino, dia, formato)
+        self.tmp = os.path.join(
+            os.path.dirname(self.caminho), f'.{os.path.basename(self.caminho)}.tmp'
+        )
+        os.makedirs(os.path.dirname(self.caminho), exist_ok=True)
+        pa = _pyarrow()
+        if formato == 'parquet':
+            self._writer = pa.parquet.ParquetWriter(self.tmp, schema, compression='zstd')
+        else:
+            self._writer = pa.ipc.new_file(self.tmp, schema)
+
+    def gravar(self, lote):
+        self._writer.write_batch(lote)
+
+    def fechar(self):
+        self._writer.close()
+        # Leitores nunca veem um arquivo pela metade
+        os.replace(self.tmp, self.caminho)
+
+    def descartar(self):
+        self._writer.close()
+        os.remove(self.tmp)
+
+
+def _ler_estado(destino: str) -> Optional[dict]:
+    try:
+        with open(os.path.join(destino, ESTADO), encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def _gravar_estado(destino: str, estado: dict):
+    tmp = os.path.join(destino, f'.{ESTADO}.tmp')
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(estado, f)
+    os.replace(tmp, os.path.join(destino, ESTADO))
+
+
+def _offset_atual(session: Session) -> int:
+    # Eventos mais antigos que LOTE_IDS ids já estão confirmados
+    maximo = session.exec(select(func.max(Evento.id))).one() or 0
+    return EventoService.limite_seguro(session, max(0, maximo - LOTE_IDS))
+
+
+def _estado_anterior(session: Session, evento: Evento) -> Optional[dict]:
+    """Último estado registrado da entidade antes de ``evento``"""
+    return session.exec(
+        select(Evento.dados)
+        .where(
+            Evento.entidade == evento.entidade,
+            Evento.entidade_id == evento.entidade_id,
+            Evento.id < evento.id,
+            Evento.operacao != OperacaoEvento.DELETE,
+        )
+        .order_by(Evento.id.desc())
+        .limit(1)
+    ).first()
+
+
+def _data_evento(session: Session, evento: Evento) -> Optional[date]:
+    dados = evento.dados
+    if evento.operacao == OperacaoEvento.DELETE:
+        # Exclusão: a data vem do último estado registrado do empréstimo
+        dados = _estado_anterior(session, evento)
+    if not dados or not dados.get('data_emprestimo'):
+        return None
+    return datetime.fromisoformat(dados['data_emprestimo']).date()
+
+
+def _copiados_alterados(session: Session, evento: Evento) -> bool:
+    # Criado ainda não tem empréstimos; excluído não pode ter (chave estrangeira)
+    if evento.operacao != OperacaoEvento.UPDATE:
+        return False
+    anterior = _estado_anterior(session, evento)
+    if anterior is None:
+        return True
+    return any(
+        anterior.get(campo) != evento.dados.get(campo)
+        for campo in CAMPOS_COPIADOS[evento.entidade]
+    )
+
+
+def _dias_dos_emprestimos(session: Session, coluna: str, ids: Set[int]) -> Set[date]:
+    """Dias com empréstimos (ativos ou arquivados) dos livros ou usuários ``ids``"""
+    dias = set()
+    for modelo in (Emprestimo, EmprestimoArquivo):
+        dias.update(
+            session.exec(
+                select(func.date(modelo.data_emprestimo, type_=Date))
+                .where(getattr(modelo, coluna).in_(ids))
+                .distinct()
+            )
+        )
+    return dias
+
+
+class ExportacaoService:
+    @staticmethod
+    def verificar_disponivel():
+        if importlib.util.find_spec('pyarrow') is None:
+            raise ValueError(
+                'Exportação indisponível: instale o pacote pyarrow (extra "analise")'
+            )
+
+    @staticmethod
+    def dias_alterados(session: Session, desde: int) -> Tuple[Set[date], int]:
+        """Dias a reescrever pelos eventos após o offset ``desde`` e o novo offset"""
+        dias = set()
+        while True:
+            eventos, proximo = EventoService.listar(
+                session, desde, LOTE_EVENTOS, ['emprestimo', *CAMPOS_COPIADOS]
+            )
+            alterados = {entidade: set() for entidade in CAMPOS_COPIADOS}
+            for evento in eventos:
+                if evento.entidade == 'emprestimo':
+                    dia = _data_evento(session, evento)
+                    if dia is not None:
+                        dias.add(dia)
+                elif _copiados_alterados(session, evento):
+                    alterados[evento.entidade].add(evento.entidade_id)
+            for entidade, ids in alterados.items():
+                if ids:
+                    dias |= _dias_dos_emprestimos(session, f'{entidade}_id', ids)
+            if proximo == desde:
+                return dias, desde
+            desde = proximo
+
+    @staticmethod
+    def exportar(
+        session: Session,
+        destino: str,
+        formato: str = 'parquet',
+        completo: bool = False,
+        lote: int = LOTE_EXPORTACAO,
+    ) -> dict:
+        """Exporta os dias alterados desde a última execução (ou todos)"""
+        ExportacaoService.verificar_disponivel()
+        if formato not in FORMATOS:
+            raise ValueError(f'Formato de exportação inválido: {formato}')
+        try:
+            os.makedirs(destino, exist_ok=True)
+            estado = _ler_estado(destino)
+            if estado and estado.get('formato') != formato:
+                # Outro formato: os arquivos existentes não servem
+                completo = True
+
+            if completo or estado is None:
+                offset = _offset_atual(session)
+                dias = None
+            else:
+                dias, offset = ExportacaoService.dias_alterados(
+                    session, estado['ultimo_evento']
+                )
+
+            linhas, gravados = ExportacaoService._gravar_dias(
+                session, destino, formato, dias, lote
+            )
+            # Dias que ficaram sem empréstimos (exclusões, ou arquivos de outro
+            # formato numa exportação completa)
+            if dias is None:
+                dias = {
+                    date.fromisoformat(nome.removeprefix('data='))
+                    for nome in os.listdir(destino)
+                    if nome.startswith('data=')
+                }
+            for dia in dias:
+                for extensao in FORMATOS:
+                    if dia in gravados and extensao == formato:
+                        continue
+                    caminho = _caminho(destino, dia, extensao)
+                    if os.path.exists(caminho):
+                        os.remove(caminho)
+
+            _gravar_estado(
+                destino,
+                {
+                    'ultimo_evento': offset,
+                    'formato': formato,
+                    'exportado_em': datetime.now().isoformat(),
+                },
+            )
+            logger.info(
+                f'Exportação de empréstimos ({formato}): {linhas} linhas em '
+                f'{len(gravados)} dias, até o evento {offset}'
+            )
+            return {'linhas': linhas, 'dias': len(gravados), 'ultimo_evento': offset}
+        except Exception as e:
+            logger.error(f'Erro na exportação de empréstimos: {str(e)}')
+            raise
+        finally:
+            # Encerra a transação longa de leitura
+            session.rollback()
+
+    @staticmethod
+    def _gravar_dias(
+        session: Session,
+        destino: str,
+        formato: str,
+        dias: Optional[Set[date]],
+        lote: int,
+    ) -> Tuple[int, Set[date]]:
+        if dias is not None and not dias:
+            return 0, set()
+
+        schema = _schema()
+        result = session.exec(
+            _consulta(sorted(dias) if dias is not None else None).execution_options(
+                stream_results=True, yield_per=lote
+            )
+        )
+        dia_atual, arquivo = None, None
+        linhas, gravados = 0, set()
+        try:
+            for partes in result.partitions():
+                # Um lote pode atravessar a virada de um dia
+                inicio = 0
+                for i, linha in enumerate(partes):
+                    dia = linha[1].date()
+                    if dia != dia_atual:
+                        if i > inicio:
+                            arquivo.gravar(_lote(partes[inicio:i], schema))
+                        if arquivo is not None:
+                            arquivo.fechar()
+                        dia_atual, inicio = dia, i
+                        arquivo = _ArquivoDia(destino, dia, formato, schema)
+                        gravados.add(dia)
+                if len(partes) > inicio:
+                    arquivo.gravar(_lote(partes[inicio:], schema))
+                linhas += len(partes)
+            if arquivo is not None:
+                arquivo.fechar()
+                arquivo = None
+        finally:
+            result.close()
+            if arquivo is not None:
+                # Falha no meio: mantém o arquivo anterior do dia
+                arquivo.descartar()
+        return linhas, gravados
+
+    @staticmethod
+    def agendar(session: Session, completo: bool = False):
+        """Enfileira a exportação no executor de tarefas"""
+        ExportacaoService.verificar_disponivel()
+        item = TarefaService.enfileirar(
+            session,
+            TAREFA_EXPORTACAO,
+            {'completo': completo},
+            chave=TAREFA_EXPORTACAO,
+        )
+        session.commit()
+        return item
+
+
+@tarefa(TAREFA_EXPORTACAO)
+def _tarefa_exportar(session: Session, dados: dict, settings: Settings):
+    ExportacaoService.exportar(
+        session,
+        settings.exportacao_dir,
+        settings.exportacao_formato,
+        completo=dados.get('completo', False),
+    )
+
+
+def main(argv=None):
+    from config.database import build_engine  # noqa: PLC0415
+    from config.logging_config import setup_logging  # noqa: PLC0415
+
+    settings = Settings.from_env()
+    parser = argparse.ArgumentParser(
+        prog='python -m services.exportacao_service',
+        description='Exporta os empréstimos para Parquet/Arrow em partições diárias',
+    )
+    parser.add_argument('--destino', default=settings.exportacao_dir)
+    parser.add_argument(
+        '--formato', choices=sorted(FORMATOS), default=settings.exportacao_formato
+    )
+    parser.add_argument('--completo', action='store_true', help='Reexporta todos os dias')
+    parser.add_argument('--lote', type=int, default=LOTE_EXPORTACAO)
+    args = parser.parse_args(argv)
+
+    setup_logging()
+    # Lê de uma réplica, se houver, para não concorrer com o primário
+    database_url = next(iter(settings.database_replica_urls), None)
+    engine = build_engine(settings, database_url)
+    with Session(engine) as session:
+        ExportacaoService.exportar(
+            session, args.destino, args.formato, args.completo, args.lote
+        )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,143 @@
+"""Modelos de leitura das listagens de livros e empréstimos.
+
+As páginas são montadas direto das linhas: as consultas selecionam só as
+colunas dos schemas de resposta e cada linha vira um dict, sem instâncias ORM
+(identity map, estado de alterações, coleções) nem ``model_validate`` de
+objetos; a validação fica só com o ``response_model`` da rota. Autores,
+categorias, usuários e livros relacionados vêm de uma consulta ``IN`` por
+relação para a página inteira, e o autor, a categoria ou o usuário que se
+repete na página é montado uma vez só.
+"""
+
+from functools import lru_cache
+from typing import Dict, Iterable, List
+
+from sqlalchemy import bindparam
+from sqlmodel import Session, select
+
+from models.models import (
+    Autor,
+    Categoria,
+    Livro,
+    LivroAutorLink,
+    LivroCategoriaLink,
+    Usuario,
+)
+from schemas.schemas import (
+    AutorResponse,
+    CategoriaResponse,
+    EmprestimoResponse,
+    LivroResponse,
+    UsuarioResponse,
+)
+from services.pagination import STATEMENT_CACHE_SIZE
+
+
+def campos(schema, excluir: tuple = ()) -> tuple:
+    """Campos do schema de resposta, na ordem da resposta"""
+    return tuple(campo for campo in schema.model_fields if campo not in excluir)
+
+
+# Campos lidos da própria tabela; os demais são relações montadas à parte
+CAMPOS_AUTOR = campos(AutorResponse)
+CAMPOS_CATEGORIA = campos(CategoriaResponse)
+CAMPOS_USUARIO = campos(UsuarioResponse)
+CAMPOS_LIVRO = campos(LivroResponse, excluir=('autores', 'categorias'))
+# As chaves estrangeiras vão no fim da linha e saem do dict montado
+CAMPOS_EMPRESTIMO = campos(EmprestimoResponse, excluir=('usuario', 'livro')) + (
+    'usuario_id',
+    'livro_id',
+)
+
+
+def colunas(modelo, nomes: tuple) -> tuple:
+    return tuple(getattr(modelo, nome) for nome in nomes)
+
+
+@lru_cache(maxsize=None)
+def pagina(modelo, nomes: tuple):
+    """Página sem filtros das colunas ``nomes``; parâmetros ``skip`` e ``limit``"""
+    return (
+        select(*colunas(modelo, nomes))
+        .offset(bindparam('skip'))
+        .limit(bindparam('limit'))
+    )
+
+
+@lru_cache(maxsize=STATEMENT_CACHE_SIZE)
+def somente_colunas(statement, modelo, nomes: tuple):
+    """As colunas ``nomes`` com os filtros (WHERE) de ``statement``.
+
+    ``statement`` é um ``select(modelo)`` só com filtros, como os das buscas
+    em cache por forma de filtro. Uma instrução nova, e não
+    ``with_only_columns``: a do sqlmodel continuaria devolvendo só a primeira
+    coluna de cada linha em ``session.exec``.
+    """
+    colunas_statement = select(*colunas(modelo, nomes))
+    if statement.whereclause is not None:
+        colunas_statement = colunas_statement.where(statement.whereclause)
+    return colunas_statement
+
+
+_IDS = bindparam('ids', expanding=True)
+
+_AUTORES = (
+    select(LivroAutorLink.livro_id, *colunas(Autor, CAMPOS_AUTOR))
+    .join(Autor, Autor.id == LivroAutorLink.autor_id)
+    .where(LivroAutorLink.livro_id.in_(_IDS))
+    .order_by(LivroAutorLink.livro_id, Autor.id)
+)
+_CATEGORIAS = (
+    select(LivroCategoriaLink.livro_id, *colunas(Categoria, CAMPOS_CATEGORIA))
+    .join(Categoria, Categoria.id == LivroCategoriaLink.categoria_id)
+    .where(LivroCategoriaLink.livro_id.in_(_IDS))
+    .order_by(LivroCategoriaLink.livro_id, Categoria.id)
+)
+_LIVROS = select(*colunas(Livro, CAMPOS_LIVRO)).where(Livro.id.in_(_IDS))
+_USUARIOS = select(*colunas(Usuario, CAMPOS_USUARIO)).where(Usuario.id.in_(_IDS))
+
+
+def _por_livro(session: Session, statement, nomes: tuple, ids: list) -> Dict[int, list]:
+    # Linhas (livro_id, colunas do relacionado...), agrupadas por livro
+    montados, por_livro = {}, {}
+    for livro_id, *valores in session.exec(statement, params={'ids': ids}):
+        item = montados.get(valores[0])
+        if item is None:
+            item = montados[valores[0]] = dict(zip(nomes, valores))
+        por_livro.setdefault(livro_id, []).append(item)
+    return por_livro
+
+
+def livros(session: Session, linhas: Iterable) -> List[dict]:
+    """Dicts de ``LivroResponse`` a partir de linhas com ``CAMPOS_LIVRO``"""
+    itens = [dict(zip(CAMPOS_LIVRO, linha)) for linha in linhas]
+    if not itens:
+        return itens
+    ids = [item['id'] for item in itens]
+    autores = _por_livro(session, _AUTORES, CAMPOS_AUTOR, ids)
+    categorias = _por_livro(session, _CATEGORIAS, CAMPOS_CATEGORIA, ids)
+    for item in itens:
+        item['autores'] = autores.get(item['id'], [])
+        item['categorias'] = categorias.get(item['id'], [])
+    return itens
+
+
+def emprestimos(session: Session, linhas: Iterable) -> List[dict]:
+    """Dicts de ``EmprestimoResponse`` a partir de linhas com ``CAMPOS_EMPRESTIMO``"""
+    itens = [dict(zip(CAMPOS_EMPRESTIMO, linha)) for linha in linhas]
+    if not itens:
+        return itens
+    usuarios = {
+        linha[0]: dict(zip(CAMPOS_USUARIO, linha))
+        for linha in session.exec(
+            _USUARIOS, params={'ids': list({item['usuario_id'] for item in itens})}
+        )
+    }
+    linhas_livros = session.exec(
+        _LIVROS, params={'ids': list({item['livro_id'] for item in itens})}
+    )
+    por_id = {livro['id']: livro for livro in livros(session, linhas_livros)}
+    for item in itens:
+        item['usuario'] = usuarios[item.pop('usuario_id')]
+        item['livro'] = por_id[item.pop('livro_id')]
+    return itens
@@ -1,17 +1,158 @@
+from collections import defaultdict
+from functools import lru_cache
 from math import ceil
-from typing import List, Optional
+from typing import Iterable, List, Optional
 
 from config.logging_config import logger
 from models.models import (
     Autor,
     Categoria,
     Livro,
+    LivroAutorLink,
+    LivroCategoriaLink,
+    OperacaoEvento,
 )
 from schemas.schemas import LivroCreate, LivroUpdate
-from sqlalchemy import func
+from services.cache import TTLCache
+from services import leitura
+from services.evento_service import EventoService
+from services.pagination import count_statement, page_statement, paginate_search
+from sqlalchemy import bindparam, delete, func, insert, literal_column, or_, update
 from sqlalchemy.orm import selectinload
 from sqlmodel import Session, select
 
+# Consultas de disponibilidade (página inicial do catálogo), por engine e
+# filtros; invalidadas a cada empréstimo, devolução ou alteração de livro, e no
+# máximo 30 s desatualizadas entre workers diferentes
+_disponiveis_cache = TTLCache(ttl_seconds=30, maxsize=1024)
+
+# Os mesmos objetos a cada chamada: fazem parte da chave das instruções em cache
+_RELACOES = (selectinload(Livro.autores), selectinload(Livro.categorias))
+
+
+@lru_cache(maxsize=None)
+def _busca(titulo: bool, autor: bool, categoria: bool, ano_min: bool, ano_max: bool):
+    # Uma instrução por combinação de filtros; os valores vão como parâmetros
+    statement = select(Livro)
+
+    if titulo:
+        statement = statement.where(Livro.titulo.contains(bindparam('titulo')))
+
+    if ano_min:
+        statement = statement.where(Livro.ano_publicacao >= bindparam('ano_min'))
+
+    if ano_max:
+        statement = statement.where(Livro.ano_publicacao <= bindparam('ano_max'))
+
+    # Filtros por relacionamento feitos no banco (EXISTS), para que a
+    # paginação seja aplicada sobre o resultado já filtrado
+    if autor:
+        statement = statement.where(
+            Livro.autores.any(
+                or_(
+                    func.lower(Autor.nome).contains(bindparam('autor')),
+                    func.lower(Autor.sobrenome).contains(bindparam('autor')),
+                )
+            )
+        )
+
+    if categoria:
+        statement = statement.where(
+            Livro.categorias.any(
+                func.lower(Categoria.nome).contains(bindparam('categoria'))
+            )
+        )
+    return statement
+
+
+@lru_cache(maxsize=None)
+def _resumo(titulo: bool):
+    statement = select(
+        Livro.id,
+        Livro.titulo,
+        Livro.isbn,
+        Livro.ano_publicacao,
+        Livro.editora,
+        Livro.quantidade_disponivel,
+        Livro.autores_nomes,
+        Livro.categorias_nomes,
+    )
+    if titulo:
+        statement = statement.where(Livro.titulo.contains(bindparam('titulo')))
+    return statement
+
+
+@lru_cache(maxsize=None)
+def _disponiveis(categoria_id: bool, autor_id: bool):
+    # O 0 vai no SQL, não como parâmetro: com instruções preparadas no
+    # PostgreSQL, o plano genérico só usa o índice parcial ix_livro_disponivel
+    # se o predicado estiver escrito igual ao do índice
+    statement = select(
+        Livro.id,
+        Livro.titulo,
+        Livro.ano_publicacao,
+        Livro.editora,
+        Livro.quantidade_disponivel,
+    ).where(Livro.quantidade_disponivel > literal_column('0'))
+
+    if categoria_id:
+        statement = statement.join(
+            LivroCategoriaLink, LivroCategoriaLink.livro_id == Livro.id
+        ).where(LivroCategoriaLink.categoria_id == bindparam('categoria_id'))
+
+    if autor_id:
+        statement = statement.join(
+            LivroAutorLink, LivroAutorLink.livro_id == Livro.id
+        ).where(LivroAutorLink.autor_id == bindparam('autor_id'))
+    return statement
+
+
+def _nome_autor(nome: str, sobrenome: str) -> str:
+    return f'{nome} {sobrenome}'
+
+
+def _sincronizar_links(  # noqa: PLR0913, PLR0917
+    session: Session, livro_id: int, coluna, modelo, ids: List[int], novo: bool
+) -> list:
+    """Deixa na tabela de associação de ``coluna`` exatamente os ``ids``.
+
+    Quantidade fixa de comandos, qualquer que seja o número de IDs: uma
+    consulta ``IN`` pelas linhas de destino, uma pelos vínculos atuais (não
+    em livros novos), um DELETE dos removidos e um INSERT de várias linhas
+    dos adicionados. Devolve as linhas de destino, ordenadas por id.
+    """
+    link = coluna.class_
+    ids = list(dict.fromkeys(ids))
+
+    destinos = []
+    if ids:
+        destinos = session.exec(
+            select(modelo).where(modelo.id.in_(ids)).order_by(modelo.id)
+        ).all()
+    faltando = set(ids) - {destino.id for destino in destinos}
+    if faltando:
+        raise ValueError(
+            f'IDs de {modelo.__tablename__} não encontrados: '
+            f'{", ".join(str(item) for item in sorted(faltando))}'
+        )
+
+    atuais = set()
+    if not novo:
+        atuais = set(session.exec(select(coluna).where(link.livro_id == livro_id)))
+
+    removidos = atuais - set(ids)
+    if removidos:
+        session.exec(delete(link).where(link.livro_id == livro_id, coluna.in_(removidos)))
+
+    adicionados = [item for item in ids if item not in atuais]
+    if adicionados:
+        session.exec(
+            insert(link).values([
+                {'livro_id': livro_id, coluna.key: item} for item in adicionados
+            ])
+        )
+    return destinos
+
 
 class LivroService:
     @staticmethod
@@ -27,23 +168,16 @@ class LivroService:
 
             livro = Livro(**livro_dict)
             session.add(livro)
-            session.commit()
-            session.refresh(livro)
-
-            # Adicionar relacionamentos com autores
-            for autor_id in autor_ids:
-                autor = session.get(Autor, autor_id)
-                if autor:
-                    livro.autores.append(autor)
+            session.flush()
 
-            # Adicionar relacionamentos com categorias
-            for categoria_id in categoria_ids:
-                categoria = session.get(Categoria, categoria_id)
-                if categoria:
-                    livro.categorias.append(categoria)
+            # Vínculos com autores e categorias na mesma transação do livro
+            LivroService._definir_autores(session, livro, autor_ids, novo=True)
+            LivroService._definir_categorias(session, livro, categoria_ids, novo=True)
 
+            EventoService.registrar(session, livro, OperacaoEvento.CREATE)
             session.commit()
             session.refresh(livro)
+            LivroService.invalidar_disponiveis()
             logger.info(f'Livro criado com sucesso: ID {livro.id}')
             return livro
         except Exception as e:
@@ -65,19 +199,21 @@ class LivroService:
             raise
 
     @staticmethod
-    def get_all_livros(session: Session, skip: int = 0, limit: int = 100) -> dict:
+    def get_all_livros(
+        session: Session, skip: int = 0, limit: int = 100, leve: bool = False
+    ) -> dict:
+        """Com ``leve``, itens em dicts lidos das colunas (``services.leitura``)"""
         try:
             # Contagem total otimizada
-            total = session.exec(select(func.count()).select_from(Livro)).one()
+            total = session.exec(count_statement(Livro)).one()
 
             # Busca paginada com carregamento das relações
-            statement = (
-                select(Livro)
-                .options(selectinload(Livro.autores), selectinload(Livro.categorias))
-                .offset(skip)
-                .limit(limit)
-            )
-            livros = session.exec(statement).all()
+            statement = page_statement(Livro, _RELACOES)
+            if leve:
+                statement = leitura.pagina(Livro, leitura.CAMPOS_LIVRO)
+            livros = session.exec(statement, params={'skip': skip, 'limit': limit}).all()
+            if leve:
+                livros = leitura.livros(session, livros)
 
             total_pages = ceil(total / limit) if limit > 0 else 1
             page = (skip // limit) + 1 if limit > 0 else 1
@@ -107,29 +243,25 @@ class LivroService:
 
             update_data = livro_update.model_dump(exclude_unset=True)
 
-            # Tratar relacionamentos
+            # Tratar relacionamentos (diferença em relação aos vínculos atuais)
             if 'autor_ids' in update_data:
-                autor_ids = update_data.pop('autor_ids')
-                livro.autores.clear()
-                for autor_id in autor_ids:
-                    autor = session.get(Autor, autor_id)
-                    if autor:
-                        livro.autores.append(autor)
+                LivroService._definir_autores(
+                    session, livro, update_data.pop('autor_ids') or []
+                )
 
             if 'categoria_ids' in update_data:
-                categoria_ids = update_data.pop('categoria_ids')
-                livro.categorias.clear()
-                for categoria_id in categoria_ids:
-                    categoria = session.get(Categoria, categoria_id)
-                    if categoria:
-                        livro.categorias.append(categoria)
+                LivroService._definir_categorias(
+                    session, livro, update_data.pop('categoria_ids') or []
+                )
 
             # Atualizar campos simples
             for field, value in update_data.items():
                 setattr(livro, field, value)
 
+            EventoService.registrar(session, livro, OperacaoEvento.UPDATE)
             session.commit()
             session.refresh(livro)
+            LivroService.invalidar_disponiveis()
             logger.info(f'Livro atualizado com sucesso: ID {livro_id}')
             return livro
         except Exception as e:
@@ -145,8 +277,10 @@ class LivroService:
                 logger.warning(f'Livro não encontrado para exclusão: ID {livro_id}')
                 return False
 
+            EventoService.registrar(session, livro, OperacaoEvento.DELETE)
             session.delete(livro)
             session.commit()
+            LivroService.invalidar_disponiveis()
             logger.info(f'Livro excluído com sucesso: ID {livro_id}')
             return True
         except Exception as e:
@@ -157,8 +291,7 @@ class LivroService:
     @staticmethod
     def count_livros(session: Session) -> int:
         try:
-            statement = select(Livro)
-            count = len(session.exec(statement).all())
+            count = session.exec(count_statement(Livro)).one()
             logger.info(f'Contagem de livros: {count}')
             return count
         except Exception as e:
@@ -166,53 +299,219 @@ class LivroService:
             raise
 
     @staticmethod
-    def search_livros(
+    def search_livros(  # noqa: PLR0913, PLR0917
         session: Session,
         titulo: Optional[str] = None,
         autor: Optional[str] = None,
         categoria: Optional[str] = None,
         ano_min: Optional[int] = None,
         ano_max: Optional[int] = None,
-    ) -> List[Livro]:
+        skip: int = 0,
+        limit: int = 10,
+        cursor: Optional[str] = None,
+        include_total: bool = False,
+        leve: bool = False,
+    ) -> dict:
+        """Com ``leve``, itens em dicts lidos das colunas (``services.leitura``)"""
         try:
-            statement = select(Livro)
-
-            if titulo:
-                statement = statement.where(Livro.titulo.contains(titulo))
-
-            if ano_min:
-                statement = statement.where(Livro.ano_publicacao >= ano_min)
-
-            if ano_max:
-                statement = statement.where(Livro.ano_publicacao <= ano_max)
-
-            livros = session.exec(statement).all()
-
-            # Filtrar por autor se especificado
-            if autor:
-                livros_filtrados = []
-                for livro in livros:
-                    for livro_autor in livro.autores:
-                        if (
-                            autor.lower() in livro_autor.nome.lower()
-                            or autor.lower() in livro_autor.sobrenome.lower()
-                        ):
-                            livros_filtrados.append(livro)
-                            break
-                livros = livros_filtrados
-
-            # Filtrar por categoria se especificado
-            if categoria:
-                livros_filtrados = []
-                for livro in livros:
-                    for livro_categoria in livro.categorias:
-                        if categoria.lower() in livro_categoria.nome.lower():
-                            livros_filtrados.append(livro)
-                            break
-                livros = livros_filtrados
-
-            logger.info(f'Busca de livros: {len(livros)} encontrados')
-            return livros
+            statement = _busca(
+                bool(titulo), bool(autor), bool(categoria), bool(ano_min), bool(ano_max)
+            )
+            if leve:
+                statement = leitura.somente_colunas(
+                    statement, Livro, leitura.CAMPOS_LIVRO
+                )
+            result = paginate_search(
+                session,
+                statement,
+                Livro,
+                skip,
+                limit,
+                cursor,
+                include_total,
+                options=() if leve else _RELACOES,
+                params={
+                    'titulo': titulo,
+                    'autor': autor.lower() if autor else None,
+                    'categoria': categoria.lower() if categoria else None,
+                    'ano_min': ano_min,
+                    'ano_max': ano_max,
+                },
+            )
+            if leve:
+                result['items'] = leitura.livros(session, result['items'])
+            logger.info(f'Busca de livros: {len(result["items"])} encontrados')
+            return result
         except Exception as e:
             logger.error(f'Erro na busca de livros: {str(e)}')
             raise
+
+    @staticmethod
+    def get_livros_resumo(
+        session: Session,
+        titulo: Optional[str] = None,
+        skip: int = 0,
+        limit: int = 20,
+        cursor: Optional[str] = None,
+    ) -> dict:
+        """Listagem de livros só com colunas da tabela ``livro``.
+
+        Autores e categorias vêm das colunas desnormalizadas
+        ``autores_nomes``/``categorias_nomes``: uma única consulta, sem
+        joins nem carregamento dos relacionamentos.
+        """
+        try:
+            result = paginate_search(
+                session,
+                _resumo(bool(titulo)),
+                Livro,
+                skip,
+                limit,
+                cursor,
+                params={'titulo': titulo},
+            )
+            logger.info(f'Resumo de livros: {len(result["items"])} encontrados')
+            return result
+        except Exception as e:
+            logger.error(f'Erro ao listar resumo de livros: {str(e)}')
+            raise
+
+    @staticmethod
+    def _definir_autores(
+        session: Session, livro: Livro, autor_ids: List[int], novo: bool = False
+    ):
+        autores = _sincronizar_links(
+            session, livro.id, LivroAutorLink.autor_id, Autor, autor_ids, novo
+        )
+        livro.autores_nomes = [
+            _nome_autor(autor.nome, autor.sobrenome) for autor in autores
+        ]
+        # Coleção carregada antes da alteração dos vínculos ficaria desatualizada
+        session.expire(livro, ['autores'])
+
+    @staticmethod
+    def _definir_categorias(
+        session: Session, livro: Livro, categoria_ids: List[int], novo: bool = False
+    ):
+        categorias = _sincronizar_links(
+            session,
+            livro.id,
+            LivroCategoriaLink.categoria_id,
+            Categoria,
+            categoria_ids,
+            novo,
+        )
+        livro.categorias_nomes = [categoria.nome for categoria in categorias]
+        session.expire(livro, ['categorias'])
+
+    @staticmethod
+    def atualizar_nomes(session: Session, livro_ids: Iterable[int]) -> List[Livro]:
+        """Recalcula ``autores_nomes``/``categorias_nomes`` dos livros (sem commit).
+
+        Usado quando um autor ou uma categoria muda de nome ou é excluído: os
+        nomes de todos os livros afetados são lidos em duas consultas e
+        gravados num único UPDATE em lote. Devolve os livros atualizados,
+        com os eventos de alteração já registrados.
+        """
+        livro_ids = list(livro_ids)
+        if not livro_ids:
+            return []
+        session.flush()
+
+        autores = defaultdict(list)
+        for livro_id, nome, sobrenome in session.exec(
+            select(LivroAutorLink.livro_id, Autor.nome, Autor.sobrenome)
+            .join(Autor, Autor.id == LivroAutorLink.autor_id)
+            .where(LivroAutorLink.livro_id.in_(livro_ids))
+            .order_by(LivroAutorLink.livro_id, Autor.id)
+        ):
+            autores[livro_id].append(_nome_autor(nome, sobrenome))
+
+        categorias = defaultdict(list)
+        for livro_id, nome in session.exec(
+            select(LivroCategoriaLink.livro_id, Categoria.nome)
+            .join(Categoria, Categoria.id == LivroCategoriaLink.categoria_id)
+            .where(LivroCategoriaLink.livro_id.in_(livro_ids))
+            .order_by(LivroCategoriaLink.livro_id, Categoria.id)
+        ):
+            categorias[livro_id].append(nome)
+
+        session.exec(
+            update(Livro),
+            params=[
+                {
+                    'id': livro_id,
+                    'autores_nomes': autores[livro_id],
+                    'categorias_nomes': categorias[livro_id],
+                }
+                for livro_id in livro_ids
+            ],
+        )
+
+        livros = session.exec(
+            select(Livro)
+            .where(Livro.id.in_(livro_ids))
+            .execution_options(populate_existing=True)
+        ).all()
+        for livro in livros:
+            EventoService.registrar(session, livro, OperacaoEvento.UPDATE)
+        return livros
+
+    @staticmethod
+    def get_livros_disponiveis(  # noqa: PLR0913, PLR0917
+        session: Session,
+        categoria_id: Optional[int] = None,
+        autor_id: Optional[int] = None,
+        skip: int = 0,
+        limit: int = 20,
+        cursor: Optional[str] = None,
+    ) -> dict:
+        """Livros com exemplares disponíveis, opcionalmente por categoria/autor.
+
+        Lê só as colunas do resumo pelo índice parcial ``ix_livro_disponivel``
+        (``quantidade_disponivel > 0``), juntando com as tabelas de associação
+        pelos índices ``(categoria_id, livro_id)``/``(autor_id, livro_id)``.
+        O resultado fica em cache até o próximo empréstimo ou devolução.
+        """
+        try:
+            # Cada banco (aplicação, réplica) tem as suas entradas
+            engine = session.get_bind().engine
+            key = (engine, categoria_id, autor_id, skip, limit, cursor)
+            result = _disponiveis_cache.get_or_set(
+                key,
+                lambda: LivroService._buscar_disponiveis(
+                    session, categoria_id, autor_id, skip, limit, cursor
+                ),
+            )
+            logger.info(f'Livros disponíveis: {len(result["items"])} encontrados')
+            return result
+        except Exception as e:
+            logger.error(f'Erro ao buscar livros disponíveis: {str(e)}')
+            raise
+
+    @staticmethod
+    def _buscar_disponiveis(  # noqa: PLR0913, PLR0917
+        session, categoria_id, autor_id, skip, limit, cursor
+    ):
+        result = paginate_search(
+            session,
+            _disponiveis(bool(categoria_id), bool(autor_id)),
+            Livro,
+            skip,
+            limit,
+            cursor,
+            params={'categoria_id': categoria_id, 'autor_id': autor_id},
+        )
+        # Linhas convertidas em dicts: o valor em cache não depende da sessão
+        result['items'] = [row._asdict() for row in result['items']]
+        return result
+
+    @staticmethod
+    def invalidar_disponiveis():
+        _disponiveis_cache.invalidate()
+
+    @staticmethod
+    def carregar_disponiveis_na_inicializacao(app):
+        """Tarefa de inicialização: pré-carrega a primeira página sem filtros"""
+        with Session(app.state.engine) as session:
+            LivroService.get_livros_disponiveis(session)
@@ -0,0 +1,53 @@
+import asyncio
+import threading
+from collections import defaultdict
+from typing import Hashable
+
+
+def _set_result(future: asyncio.Future):
+    if not future.done():
+        future.set_result(True)
+
+
+class Notificador:
+    """Aviso, dentro do processo, de que algo identificado por uma chave mudou.
+
+    Os endpoints de long-poll e SSE aguardam (``await aguardar``) em vez de
+    consultar o banco repetidamente; os serviços chamam ``notificar`` após o
+    commit, de qualquer thread. Mudanças feitas por outros processos não são
+    vistas aqui: quem aguarda deve reconsultar o banco periodicamente.
+    """
+
+    def __init__(self):
+        self._waiters = defaultdict(set)
+        self._lock = threading.Lock()
+
+    async def aguardar(self, key: Hashable, timeout: float) -> bool:
+        """Espera um aviso para ``key``; retorna False se o tempo acabar"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        waiter = (loop, future)
+        with self._lock:
+            self._waiters[key].add(waiter)
+        try:
+            await asyncio.wait_for(future, timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+        finally:
+            with self._lock:
+                waiters = self._waiters.get(key)
+                if waiters is not None:
+                    waiters.discard(waiter)
+                    if not waiters:
+                        del self._waiters[key]
+
+    def notificar(self, key: Hashable):
+        with self._lock:
+            waiters = self._waiters.pop(key, set())
+        for loop, future in waiters:
+            try:
+                loop.call_soon_threadsafe(_set_result, future)
+            except RuntimeError:
+                # Loop já encerrado (ex.: desligamento do servidor)
+                pass
@@ -0,0 +1,119 @@
+import base64
+import json
+from functools import lru_cache
+from math import ceil
+from typing import Any, Optional, Sequence
+
+from sqlalchemy import bindparam, func
+from sqlmodel import Session, select
+
+# Limite máximo de itens por página aplicado pelo servidor, independente do cliente
+SEARCH_MAX_LIMIT = 100
+
+# Instruções derivadas das buscas, por instrução base e modo de paginação.
+# As buscas dos serviços vêm de construtores em cache por forma de filtro
+# (quais filtros foram informados), com os valores em ``bindparam``: a mesma
+# instrução é reaproveitada entre chamadas e o SQLAlchemy não precisa montá-la
+# nem recalcular a chave do cache de compilação.
+STATEMENT_CACHE_SIZE = 512
+
+
+def encode_cursor(*values: Any) -> str:
+    """Gera um cursor opaco a partir dos valores da chave de ordenação"""
+    raw = json.dumps(values, default=str, separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str) -> list:
+    """Recupera os valores da chave de ordenação a partir de um cursor"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, TypeError) as e:
+        raise ValueError('Cursor inválido') from e
+    if not isinstance(values, list):
+        raise ValueError('Cursor inválido')
+    return values
+
+
+@lru_cache(maxsize=None)
+def count_statement(model):
+    """``SELECT count(*)`` da tabela do modelo"""
+    return select(func.count()).select_from(model)
+
+
+@lru_cache(maxsize=None)
+def page_statement(model, options: tuple = ()):
+    """Página sem filtros; parâmetros ``skip`` e ``limit``"""
+    statement = select(model).offset(bindparam('skip')).limit(bindparam('limit'))
+    if options:
+        statement = statement.options(*options)
+    return statement
+
+
+@lru_cache(maxsize=STATEMENT_CACHE_SIZE)
+def _search_count(statement):
+    return select(func.count()).select_from(statement.subquery())
+
+
+@lru_cache(maxsize=STATEMENT_CACHE_SIZE)
+def _search_page(statement, model, by_cursor: bool, options: tuple):
+    if by_cursor:
+        statement = statement.where(model.id > bindparam('_last_id'))
+    else:
+        statement = statement.offset(bindparam('_skip'))
+    statement = statement.order_by(model.id).limit(bindparam('_limit'))
+    if options:
+        statement = statement.options(*options)
+    return statement
+
+
+def paginate_search(  # noqa: PLR0913, PLR0917
+    session: Session,
+    statement,
+    model,
+    skip: int = 0,
+    limit: int = 10,
+    cursor: Optional[str] = None,
+    include_total: bool = False,
+    options: Sequence = (),
+    params: Optional[dict] = None,
+) -> dict:
+    """Pagina uma busca ordenada por id.
+
+    Busca ``limit + 1`` linhas para saber se existe próxima página sem
+    precisar contar todo o resultado; a contagem só é feita quando
+    ``include_total`` é solicitado. Com ``cursor`` a paginação é por chave
+    (``id > último id``), sem custo de ``OFFSET``.
+
+    ``params`` são os valores dos ``bindparam`` de ``statement``. As
+    instruções de contagem e de página derivadas de ``statement`` ficam em
+    cache: ``statement`` e ``options`` devem ser os mesmos objetos a cada
+    chamada (construídos uma vez por forma de filtro), não novos.
+    """
+    limit = max(1, min(limit, SEARCH_MAX_LIMIT))
+    params = dict(params or {}, _limit=limit + 1)
+
+    total = None
+    if include_total:
+        total = session.exec(_search_count(statement), params=params).one()
+
+    if cursor:
+        (params['_last_id'],) = decode_cursor(cursor)
+    else:
+        params['_skip'] = skip
+
+    page = _search_page(statement, model, bool(cursor), tuple(options))
+    rows = session.exec(page, params=params).all()
+    has_more = len(rows) > limit
+    items = rows[:limit]
+
+    return {
+        'items': items,
+        'total': total,
+        'page': (skip // limit) + 1,
+        'limit': limit,
+        'total_pages': ceil(total / limit) if total is not None else None,
+        'has_more': has_more,
+        'next_cursor': encode_cursor(items[-1].id) if has_more else None,
+    }
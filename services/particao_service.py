@@ -0,0 +1,279 @@
+"""Partições e arquivamento da tabela ``emprestimo``.
+
+No PostgreSQL, ``emprestimo`` é particionada por faixa de ``data_emprestimo``
+(migração 6c1f8e2a7b49): uma partição por ano para o histórico anterior à
+migração, uma por mês a partir daí e a partição ``emprestimo_padrao`` para
+datas fora das faixas. Buscas e contagens com filtro de data só leem as
+partições da faixa.
+
+Manutenção, pela linha de comando (por exemplo, num cron mensal)::
+
+    python -m services.particao_service criar --meses 3
+    python -m services.particao_service arquivar --anos 5
+
+``criar`` cria as partições mensais dos próximos meses antes que sejam
+necessárias; empréstimos de um desses meses que já estejam na partição padrão
+(o cron atrasou) passam para a partição nova. ``arquivar`` move os empréstimos
+devolvidos há mais de N anos para ``emprestimo_arquivo`` (armazenamento frio,
+fora das consultas normais; a busca de empréstimos os inclui com
+``incluir_arquivados``) e remove as partições antigas que ficaram vazias. O
+arquivamento também funciona em bancos sem particionamento.
+"""
+
+import argparse
+import re
+from datetime import date, datetime
+from typing import List, Optional, Tuple
+
+from sqlalchemy import insert, literal, text
+from sqlmodel import Session, delete, select
+
+from config.logging_config import logger
+from models.models import Emprestimo, EmprestimoArquivo, StatusEmprestimo
+
+# Partições mensais criadas com antecedência
+MESES_ADIANTE = 3
+# Empréstimos movidos por transação no arquivamento
+LOTE_ARQUIVAMENTO = 5000
+
+# Partição DEFAULT, para datas sem partição própria
+PARTICAO_PADRAO = 'emprestimo_padrao'
+
+# emprestimo_2024 (anual) ou emprestimo_2026_03 (mensal)
+_NOME_PARTICAO = re.compile(r'^emprestimo_(\d{4})(?:_(\d{2}))?$')
+
+COLUNAS_ARQUIVO = (
+    'id',
+    'data_emprestimo',
+    'data_devolucao_prevista',
+    'data_devolucao_real',
+    'status',
+    'observacoes',
+    'usuario_id',
+    'livro_id',
+)
+
+
+def _somar_meses(inicio: date, meses: int) -> date:
+    total = inicio.year * 12 + inicio.month - 1 + meses
+    return date(total // 12, total % 12 + 1, 1)
+
+
+def faixa_particao(nome: str) -> Optional[Tuple[date, date]]:
+    """Faixa ``[início, fim)`` de uma partição pelo nome; None se não for nossa"""
+    match = _NOME_PARTICAO.match(nome)
+    if not match:
+        return None
+    ano, mes = int(match.group(1)), match.group(2)
+    if mes is None:
+        return date(ano, 1, 1), date(ano + 1, 1, 1)
+    inicio = date(ano, int(mes), 1)
+    return inicio, _somar_meses(inicio, 1)
+
+
+class ParticaoService:
+    @staticmethod
+    def particionada(session: Session) -> bool:
+        if session.get_bind().dialect.name != 'postgresql':
+            return False
+        return session.exec(
+            text(
+                'SELECT EXISTS (SELECT 1 FROM pg_partitioned_table p '
+                'JOIN pg_class c ON c.oid = p.partrelid '
+                "WHERE c.relname = 'emprestimo')"
+            )
+        ).scalar()
+
+    @staticmethod
+    def listar_particoes(session: Session) -> List[str]:
+        return (
+            session.exec(
+                text(
+                    'SELECT c.relname FROM pg_inherits i '
+                    'JOIN pg_class c ON c.oid = i.inhrelid '
+                    'JOIN pg_class p ON p.oid = i.inhparent '
+                    "WHERE p.relname = 'emprestimo' ORDER BY c.relname"
+                )
+            )
+            .scalars()
+            .all()
+        )
+
+    @staticmethod
+    def criar_particoes(session: Session, meses: int = MESES_ADIANTE) -> List[str]:
+        """Cria as partições mensais do mês corrente e dos próximos ``meses``"""
+        try:
+            if not ParticaoService.particionada(session):
+                logger.info('Tabela emprestimo não particionada; nada a criar')
+                return []
+
+            existentes = set(ParticaoService.listar_particoes(session))
+            atual = date.today().replace(day=1)
+            criadas = []
+            for i in range(meses + 1):
+                inicio = _somar_meses(atual, i)
+                nome = f'emprestimo_{inicio:%Y_%m}'
+                # O mês pode estar coberto por uma partição anual
+                if nome in existentes or f'emprestimo_{inicio:%Y}' in existentes:
+                    continue
+                fim = _somar_meses(inicio, 1)
+                if PARTICAO_PADRAO in existentes:
+                    ParticaoService._criar_com_padrao(session, nome, inicio, fim)
+                else:
+                    ParticaoService._criar(session, nome, inicio, fim)
+                criadas.append(nome)
+            session.commit()
+            logger.info(f'Partições criadas: {", ".join(criadas) or "nenhuma"}')
+            return criadas
+        except Exception as e:
+            session.rollback()
+            logger.error(f'Erro ao criar partições de emprestimo: {str(e)}')
+            raise
+
+    @staticmethod
+    def _criar(session: Session, nome: str, inicio: date, fim: date):
+        session.exec(
+            text(
+                f'CREATE TABLE {nome} PARTITION OF emprestimo '
+                f"FOR VALUES FROM ('{inicio}') TO ('{fim}')"
+            )
+        )
+
+    @staticmethod
+    def _criar_com_padrao(session: Session, nome: str, inicio: date, fim: date):
+        """Cria a partição mesmo com linhas da faixa na partição padrão.
+
+        O PostgreSQL recusa a partição nova se a padrão já tiver linhas da
+        faixa: a padrão é desanexada, as linhas passam para a partição nova e
+        a padrão é anexada de volta, tudo na transação de ``criar_particoes``.
+        """
+        faixa = f"data_emprestimo >= '{inicio}' AND data_emprestimo < '{fim}'"
+        if not session.exec(
+            text(f'SELECT EXISTS (SELECT 1 FROM {PARTICAO_PADRAO} WHERE {faixa})')
+        ).scalar():
+            ParticaoService._criar(session, nome, inicio, fim)
+            return
+
+        colunas = ', '.join(COLUNAS_ARQUIVO)
+        session.exec(text(f'ALTER TABLE emprestimo DETACH PARTITION {PARTICAO_PADRAO}'))
+        ParticaoService._criar(session, nome, inicio, fim)
+        movidas = session.exec(
+            text(
+                f'INSERT INTO {nome} ({colunas}) '
+                f'SELECT {colunas} FROM {PARTICAO_PADRAO} WHERE {faixa}'
+            )
+        ).rowcount
+        session.exec(text(f'DELETE FROM {PARTICAO_PADRAO} WHERE {faixa}'))
+        session.exec(
+            text(f'ALTER TABLE emprestimo ATTACH PARTITION {PARTICAO_PADRAO} DEFAULT')
+        )
+        logger.info(f'{movidas} empréstimos movidos de {PARTICAO_PADRAO} para {nome}')
+
+    @staticmethod
+    def arquivar(session: Session, anos: int, lote: int = LOTE_ARQUIVAMENTO) -> int:
+        """Move para ``emprestimo_arquivo`` os devolvidos há mais de ``anos`` anos.
+
+        O corte é o início do mês, ``anos`` anos atrás. Cada lote é copiado e
+        removido na mesma transação; uma interrupção não perde nem duplica
+        empréstimos, e a próxima execução continua de onde parou.
+        """
+        try:
+            hoje = date.today()
+            corte = datetime(hoje.year - anos, hoje.month, 1)
+            condicao = (
+                Emprestimo.status == StatusEmprestimo.DEVOLVIDO,
+                Emprestimo.data_emprestimo < corte,
+            )
+            agora = datetime.now()
+            total = 0
+            while True:
+                ids = session.exec(
+                    select(Emprestimo.id).where(*condicao).limit(lote)
+                ).all()
+                if not ids:
+                    break
+                # O filtro de data também restringe as partições lidas
+                selecionados = (*condicao, Emprestimo.id.in_(ids))
+                session.exec(
+                    insert(EmprestimoArquivo).from_select(
+                        [*COLUNAS_ARQUIVO, 'data_arquivamento'],
+                        select(
+                            *(getattr(Emprestimo, coluna) for coluna in COLUNAS_ARQUIVO),
+                            literal(agora),
+                        ).where(*selecionados),
+                    )
+                )
+                session.exec(delete(Emprestimo).where(*selecionados))
+                session.commit()
+                total += len(ids)
+                logger.info(f'{total} empréstimos arquivados até agora')
+
+            removidas = ParticaoService.remover_particoes_vazias(session, corte.date())
+            logger.info(
+                f'Arquivamento concluído: {total} empréstimos anteriores a '
+                f'{corte:%Y-%m}, {len(removidas)} partições removidas'
+            )
+            return total
+        except Exception as e:
+            session.rollback()
+            logger.error(f'Erro ao arquivar empréstimos: {str(e)}')
+            raise
+
+    @staticmethod
+    def remover_particoes_vazias(session: Session, antes: date) -> List[str]:
+        """Remove as partições vazias que terminam até ``antes``"""
+        if not ParticaoService.particionada(session):
+            return []
+        try:
+            removidas = []
+            for nome in ParticaoService.listar_particoes(session):
+                faixa = faixa_particao(nome)
+                if faixa is None or faixa[1] > antes:
+                    continue
+                # Nome validado pela expressão acima: seguro para o DDL
+                if session.exec(text(f'SELECT EXISTS (SELECT 1 FROM {nome})')).scalar():
+                    continue
+                session.exec(text(f'DROP TABLE {nome}'))
+                removidas.append(nome)
+            session.commit()
+            return removidas
+        except Exception as e:
+            session.rollback()
+            logger.error(f'Erro ao remover partições vazias: {str(e)}')
+            raise
+
+
+def main(argv=None):
+    from config.database import get_engine  # noqa: PLC0415
+    from config.logging_config import setup_logging  # noqa: PLC0415
+
+    parser = argparse.ArgumentParser(
+        prog='python -m services.particao_service',
+        description='Manutenção das partições e arquivamento de empréstimos',
+    )
+    parser.add_argument('acao', choices=['criar', 'arquivar'])
+    parser.add_argument(
+        '--meses',
+        type=int,
+        default=MESES_ADIANTE,
+        help='criar: partições mensais criadas além do mês corrente',
+    )
+    parser.add_argument(
+        '--anos',
+        type=int,
+        default=5,
+        help='arquivar: idade mínima, em anos, dos empréstimos devolvidos',
+    )
+    parser.add_argument('--lote', type=int, default=LOTE_ARQUIVAMENTO)
+    args = parser.parse_args(argv)
+
+    setup_logging()
+    with Session(get_engine()) as session:
+        if args.acao == 'criar':
+            ParticaoService.criar_particoes(session, args.meses)
+        else:
+            ParticaoService.arquivar(session, args.anos, args.lote)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,12 +1,31 @@
+from functools import lru_cache
 from math import ceil
-from typing import List, Optional
+from typing import Optional
 
 from config.logging_config import logger
-from models.models import PerfilUsuario, Usuario
+from models.models import OperacaoEvento, PerfilUsuario, Usuario
 from schemas.schemas import PerfilUsuarioCreate, PerfilUsuarioUpdate
+from services.evento_service import EventoService
+from services.pagination import count_statement, page_statement, paginate_search
+from sqlalchemy import bindparam
 from sqlmodel import Session, select
 
 
+@lru_cache(maxsize=None)
+def _busca(profissao: bool, interesses: bool):
+    # Uma instrução por combinação de filtros; os valores vão como parâmetros
+    statement = select(PerfilUsuario)
+    if profissao:
+        statement = statement.where(
+            PerfilUsuario.profissao.contains(bindparam('profissao'))
+        )
+    if interesses:
+        statement = statement.where(
+            PerfilUsuario.interesses_literarios.contains(bindparam('interesses'))
+        )
+    return statement
+
+
 class PerfilUsuarioService:
     @staticmethod
     def create_perfil_usuario(
@@ -34,6 +53,7 @@ class PerfilUsuarioService:
 
             perfil = PerfilUsuario(**perfil_data.model_dump())
             session.add(perfil)
+            EventoService.registrar(session, perfil, OperacaoEvento.CREATE)
             session.commit()
             session.refresh(perfil)
             logger.info(f'Perfil de usuário criado com sucesso: ID {perfil.id}')
@@ -77,12 +97,12 @@ class PerfilUsuarioService:
     def get_all_perfis(session: Session, skip: int = 0, limit: int = 100) -> dict:
         try:
             # Contagem total
-            count_statement = select(PerfilUsuario)
-            total = len(session.exec(count_statement).all())
+            total = session.exec(count_statement(PerfilUsuario)).one()
 
             # Busca paginada
-            statement = select(PerfilUsuario).offset(skip).limit(limit)
-            perfis = session.exec(statement).all()
+            perfis = session.exec(
+                page_statement(PerfilUsuario), params={'skip': skip, 'limit': limit}
+            ).all()
 
             total_pages = ceil(total / limit) if limit > 0 else 1
             page = (skip // limit) + 1 if limit > 0 else 1
@@ -115,6 +135,7 @@ class PerfilUsuarioService:
             for field, value in update_data.items():
                 setattr(perfil, field, value)
 
+            EventoService.registrar(session, perfil, OperacaoEvento.UPDATE)
             session.commit()
             session.refresh(perfil)
             logger.info(f'Perfil atualizado com sucesso: ID {perfil_id}')
@@ -132,6 +153,7 @@ class PerfilUsuarioService:
                 logger.warning(f'Perfil não encontrado para exclusão: ID {perfil_id}')
                 return False
 
+            EventoService.registrar(session, perfil, OperacaoEvento.DELETE)
             session.delete(perfil)
             session.commit()
             logger.info(f'Perfil excluído com sucesso: ID {perfil_id}')
@@ -144,8 +166,7 @@ class PerfilUsuarioService:
     @staticmethod
     def count_perfis(session: Session) -> int:
         try:
-            statement = select(PerfilUsuario)
-            count = len(session.exec(statement).all())
+            count = session.exec(count_statement(PerfilUsuario)).one()
             logger.info(f'Contagem de perfis: {count}')
             return count
         except Exception as e:
@@ -153,25 +174,28 @@ class PerfilUsuarioService:
             raise
 
     @staticmethod
-    def search_perfis(
+    def search_perfis(  # noqa: PLR0913, PLR0917
         session: Session,
         profissao: Optional[str] = None,
         interesses: Optional[str] = None,
-    ) -> List[PerfilUsuario]:
+        skip: int = 0,
+        limit: int = 10,
+        cursor: Optional[str] = None,
+        include_total: bool = False,
+    ) -> dict:
         try:
-            statement = select(PerfilUsuario)
-
-            if profissao:
-                statement = statement.where(PerfilUsuario.profissao.contains(profissao))
-
-            if interesses:
-                statement = statement.where(
-                    PerfilUsuario.interesses_literarios.contains(interesses)
-                )
-
-            perfis = session.exec(statement).all()
-            logger.info(f'Busca de perfis: {len(perfis)} encontrados')
-            return perfis
+            result = paginate_search(
+                session,
+                _busca(bool(profissao), bool(interesses)),
+                PerfilUsuario,
+                skip,
+                limit,
+                cursor,
+                include_total,
+                params={'profissao': profissao, 'interesses': interesses},
+            )
+            logger.info(f'Busca de perfis: {len(result["items"])} encontrados')
+            return result
         except Exception as e:
             logger.error(f'Erro na busca de perfis: {str(e)}')
             raise
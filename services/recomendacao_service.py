@@ -0,0 +1,530 @@
+"""Recomendações "quem pegou este livro também pegou".
+
+O índice é gerado em lote a partir dos empréstimos (matriz esparsa de
+coocorrência item-item) e salvo como arquivos ``.npy`` que são abertos por
+memory-map. As consultas por livro são uma leitura direta dos vizinhos
+pré-calculados; as consultas por usuário somam as linhas de coocorrência
+dos livros do histórico. Nenhuma delas varre a tabela de empréstimos.
+
+Geração e atualização incremental pela linha de comando:
+``python -m services.recomendacao_service gerar|atualizar``. Cada empréstimo
+novo também agenda uma atualização incremental no executor de tarefas.
+"""
+
+import argparse
+import json
+import os
+import shutil
+import tempfile
+import time
+from datetime import datetime, timedelta
+from typing import List, Optional, Tuple
+
+import numpy as np
+from scipy import sparse
+from sqlalchemy import func
+from sqlmodel import Session, select
+
+from config.logging_config import logger
+from config.settings import Settings
+from models.models import Categoria, Emprestimo, Livro, LivroCategoriaLink, PerfilUsuario
+from services.tarefa_service import TarefaService, tarefa
+
+# Empréstimos feitos dentro deste intervalo entram numa só atualização agendada
+ATRASO_ATUALIZACAO = timedelta(minutes=5)
+TAREFA_ATUALIZACAO = 'recomendacoes.atualizar'
+
+# Vizinhos pré-calculados por livro
+TOP_K = 50
+# Linhas lidas por lote ao carregar os empréstimos
+BATCH_SIZE = 50_000
+# Intervalo mínimo entre verificações de índice atualizado em disco
+RELOAD_CHECK_SECONDS = 5.0
+# Cada geração do índice fica num subdiretório próprio, apontado pelo meta.json
+PREFIXO_GERACAO = 'geracao-'
+
+_ARRAYS = (
+    'livro_ids',
+    'usuario_ids',
+    'popularidade',
+    'usuario_indptr',
+    'usuario_indices',
+    'cooc_indptr',
+    'cooc_indices',
+    'cooc_data',
+    'vizinhos',
+    'pontuacoes',
+)
+
+
+class RecomendacaoIndex:
+    """Índice item-item somente leitura, com os arrays abertos por memory-map"""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        meta_path = os.path.join(directory, 'meta.json')
+        with open(meta_path, encoding='utf-8') as f:
+            self.meta = json.load(f)
+        self.mtime_ns = os.stat(meta_path).st_mtime_ns
+        self.checked_at = time.monotonic()
+        # Arrays da geração apontada pelo meta.json (índices antigos: na raiz)
+        geracao = os.path.join(directory, self.meta.get('geracao', ''))
+        for name in _ARRAYS:
+            path = os.path.join(geracao, f'{name}.npy')
+            setattr(self, name, np.load(path, mmap_mode='r'))
+
+    @property
+    def gerado_em(self) -> Optional[datetime]:
+        value = self.meta.get('gerado_em')
+        return datetime.fromisoformat(value) if value else None
+
+    @staticmethod
+    def _posicao(ids, value: int) -> Optional[int]:
+        pos = int(np.searchsorted(ids, value))
+        if pos < len(ids) and ids[pos] == value:
+            return pos
+        return None
+
+    def similares(self, livro_id: int, limit: int) -> List[Tuple[int, float]]:
+        pos = self._posicao(self.livro_ids, livro_id)
+        if pos is None:
+            return []
+        vizinhos = self.vizinhos[pos, :limit]
+        pontuacoes = self.pontuacoes[pos, :limit]
+        validos = vizinhos >= 0
+        return list(zip(vizinhos[validos].tolist(), pontuacoes[validos].tolist()))
+
+    def historico(self, usuario_id: int) -> np.ndarray:
+        """Posições (no índice) dos livros já emprestados ao usuário"""
+        pos = self._posicao(self.usuario_ids, usuario_id)
+        if pos is None:
+            return np.empty(0, dtype=np.int64)
+        return np.asarray(
+            self.usuario_indices[self.usuario_indptr[pos] : self.usuario_indptr[pos + 1]]
+        )
+
+    def posicoes(self, livro_ids: List[int]) -> np.ndarray:
+        ids = np.asarray(livro_ids, dtype=np.int64)
+        if len(self.livro_ids) == 0 or len(ids) == 0:
+            return np.empty(0, dtype=np.int64)
+        pos = np.clip(np.searchsorted(self.livro_ids, ids), 0, len(self.livro_ids) - 1)
+        return pos[self.livro_ids[pos] == ids]
+
+    def pontuar(self, historico: np.ndarray, limit: int) -> List[Tuple[int, float]]:
+        """Soma a similaridade (cosseno) dos livros do histórico"""
+        if len(historico) == 0:
+            return []
+        colunas, pesos = [], []
+        for h in historico:
+            inicio, fim = self.cooc_indptr[h], self.cooc_indptr[h + 1]
+            cols = np.asarray(self.cooc_indices[inicio:fim])
+            dados = np.asarray(self.cooc_data[inicio:fim], dtype=np.float64)
+            colunas.append(cols)
+            pesos.append(dados / np.sqrt(self.popularidade[h] * self.popularidade[cols]))
+        colunas = np.concatenate(colunas)
+        pesos = np.concatenate(pesos)
+        if len(colunas) == 0:
+            return []
+
+        candidatos, inverso = np.unique(colunas, return_inverse=True)
+        pontuacoes = np.bincount(inverso, weights=pesos)
+        ja_lidos = np.isin(candidatos, historico)
+        candidatos, pontuacoes = candidatos[~ja_lidos], pontuacoes[~ja_lidos]
+
+        if len(candidatos) > limit:
+            melhores = np.argpartition(-pontuacoes, limit)[:limit]
+            candidatos, pontuacoes = candidatos[melhores], pontuacoes[melhores]
+        ordem = np.argsort(-pontuacoes, kind='stable')
+        return list(
+            zip(self.livro_ids[candidatos[ordem]].tolist(), pontuacoes[ordem].tolist())
+        )
+
+
+def _carregar_emprestimos(session: Session, desde_id: int = 0):
+    """Lê (id, usuario_id, livro_id) dos empréstimos em lotes, como arrays"""
+    statement = (
+        select(Emprestimo.id, Emprestimo.usuario_id, Emprestimo.livro_id)
+        .where(Emprestimo.id > desde_id)
+        .order_by(Emprestimo.id)
+        .execution_options(yield_per=BATCH_SIZE)
+    )
+    lotes = [
+        np.asarray(lote, dtype=np.int64).reshape(-1, 3)
+        for lote in session.exec(statement).partitions()
+    ]
+    if not lotes:
+        return np.empty((0, 3), dtype=np.int64)
+    return np.concatenate(lotes)
+
+
+def _top_k(cooc: sparse.csr_matrix, popularidade: np.ndarray, livro_ids, linhas):
+    """Calcula os vizinhos mais similares (cosseno) das linhas informadas"""
+    vizinhos = np.full((len(linhas), TOP_K), -1, dtype=np.int64)
+    pontuacoes = np.zeros((len(linhas), TOP_K), dtype=np.float32)
+    for i, linha in enumerate(linhas):
+        inicio, fim = cooc.indptr[linha], cooc.indptr[linha + 1]
+        if inicio == fim:
+            continue
+        cols = cooc.indices[inicio:fim]
+        sim = cooc.data[inicio:fim] / np.sqrt(popularidade[linha] * popularidade[cols])
+        if len(cols) > TOP_K:
+            melhores = np.argpartition(-sim, TOP_K)[:TOP_K]
+            cols, sim = cols[melhores], sim[melhores]
+        ordem = np.argsort(-sim, kind='stable')
+        vizinhos[i, : len(cols)] = livro_ids[cols[ordem]]
+        pontuacoes[i, : len(cols)] = sim[ordem]
+    return vizinhos, pontuacoes
+
+
+def _salvar(directory: str, arrays: dict, meta: dict):
+    """Grava os arrays num diretório de geração novo e aponta o meta.json para ele.
+
+    A troca do meta.json (os.replace) é o único passo visível aos leitores:
+    quem o lê abre sempre arrays da mesma geração, nunca uma mistura de duas.
+    A geração anterior é mantida para leitores que leram o meta.json antigo e
+    ainda vão abrir os arrays; as mais velhas são removidas.
+    """
+    os.makedirs(directory, exist_ok=True)
+    geracao = tempfile.mkdtemp(
+        prefix=f'{PREFIXO_GERACAO}{datetime.now():%Y%m%d%H%M%S}-', dir=directory
+    )
+    for name, array in arrays.items():
+        np.save(os.path.join(geracao, f'{name}.npy'), np.ascontiguousarray(array))
+
+    meta_path = os.path.join(directory, 'meta.json')
+    anterior = None
+    if os.path.exists(meta_path):
+        with open(meta_path, encoding='utf-8') as f:
+            anterior = json.load(f).get('geracao')
+    meta['geracao'] = os.path.basename(geracao)
+    tmp = os.path.join(directory, '.meta.json.tmp')
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(meta, f)
+    os.replace(tmp, meta_path)
+
+    for nome in os.listdir(directory):
+        if nome.startswith(PREFIXO_GERACAO) and nome not in {meta['geracao'], anterior}:
+            # Arquivos ainda mapeados por outro processo continuam legíveis
+            shutil.rmtree(os.path.join(directory, nome), ignore_errors=True)
+
+
+def _gravar(directory: str, indice: dict, ultimo_id: int) -> dict:
+    """Grava as matrizes do índice e devolve os metadados"""
+    usuarios, cooc = indice['usuarios'], indice['cooc']
+    meta = {
+        'ultimo_emprestimo_id': ultimo_id,
+        'gerado_em': datetime.now().isoformat(),
+        'livros': len(indice['livro_ids']),
+        'usuarios': len(indice['usuario_ids']),
+    }
+    _salvar(
+        directory,
+        {
+            'livro_ids': indice['livro_ids'],
+            'usuario_ids': indice['usuario_ids'],
+            'popularidade': indice['popularidade'],
+            'usuario_indptr': usuarios.indptr.astype(np.int64),
+            'usuario_indices': usuarios.indices.astype(np.int64),
+            'cooc_indptr': cooc.indptr.astype(np.int64),
+            'cooc_indices': cooc.indices.astype(np.int64),
+            'cooc_data': cooc.data.astype(np.float32),
+            'vizinhos': indice['vizinhos'],
+            'pontuacoes': indice['pontuacoes'],
+        },
+        meta,
+    )
+    return meta
+
+
+def _binaria(usuario_pos, livro_pos, shape) -> sparse.csr_matrix:
+    """Matriz usuário x livro binária (vários empréstimos contam uma vez)"""
+    matriz = sparse.csr_matrix(
+        (np.ones(len(usuario_pos), dtype=np.int32), (usuario_pos, livro_pos)),
+        shape=shape,
+    )
+    matriz.sum_duplicates()
+    matriz.data[:] = 1
+    return matriz
+
+
+def _expandir(atual: RecomendacaoIndex, livro_ids, usuario_ids) -> dict:
+    """Leva o índice atual para um espaço de ids maior (ids novos no meio)"""
+    l_map = np.searchsorted(livro_ids, np.asarray(atual.livro_ids))
+    u_map = np.searchsorted(usuario_ids, np.asarray(atual.usuario_ids))
+    n_livros = len(livro_ids)
+
+    linhas = np.repeat(np.arange(len(atual.usuario_ids)), np.diff(atual.usuario_indptr))
+    usuarios = _binaria(
+        u_map[linhas],
+        l_map[np.asarray(atual.usuario_indices)],
+        (len(usuario_ids), n_livros),
+    )
+    cooc = sparse.csr_matrix(
+        (
+            np.asarray(atual.cooc_data),
+            np.asarray(atual.cooc_indices),
+            np.asarray(atual.cooc_indptr),
+        ),
+        shape=(len(atual.livro_ids), len(atual.livro_ids)),
+    ).tocoo()
+    cooc = sparse.csr_matrix(
+        (cooc.data, (l_map[cooc.row], l_map[cooc.col])), shape=(n_livros, n_livros)
+    )
+
+    popularidade = np.zeros(n_livros)
+    popularidade[l_map] = atual.popularidade
+    vizinhos = np.full((n_livros, TOP_K), -1, dtype=np.int64)
+    vizinhos[l_map] = atual.vizinhos
+    pontuacoes = np.zeros((n_livros, TOP_K), dtype=np.float32)
+    pontuacoes[l_map] = atual.pontuacoes
+    return {
+        'livro_ids': livro_ids,
+        'usuario_ids': usuario_ids,
+        'popularidade': popularidade,
+        'usuarios': usuarios,
+        'cooc': cooc,
+        'vizinhos': vizinhos,
+        'pontuacoes': pontuacoes,
+    }
+
+
+class RecomendacaoService:
+    _indices: dict = {}
+
+    @staticmethod
+    def gerar_indice(session: Session, directory: str) -> dict:
+        """Gera o índice completo a partir de todos os empréstimos"""
+        try:
+            inicio = time.perf_counter()
+            emprestimos = _carregar_emprestimos(session)
+            ultimo_id = int(emprestimos[:, 0].max()) if len(emprestimos) else 0
+
+            usuario_ids, u_idx = np.unique(emprestimos[:, 1], return_inverse=True)
+            livro_ids, l_idx = np.unique(emprestimos[:, 2], return_inverse=True)
+            usuarios = _binaria(u_idx, l_idx, (len(usuario_ids), len(livro_ids)))
+
+            # Coocorrência C = Uᵀ·U; a diagonal é a popularidade de cada livro
+            cooc = (usuarios.T @ usuarios).tocsr()
+            popularidade = cooc.diagonal().astype(np.float64)
+            cooc.setdiag(0)
+            cooc.eliminate_zeros()
+            cooc.sort_indices()
+
+            vizinhos, pontuacoes = _top_k(
+                cooc, popularidade, livro_ids, range(len(livro_ids))
+            )
+            meta = _gravar(
+                directory,
+                {
+                    'livro_ids': livro_ids,
+                    'usuario_ids': usuario_ids,
+                    'popularidade': popularidade,
+                    'usuarios': usuarios,
+                    'cooc': cooc,
+                    'vizinhos': vizinhos,
+                    'pontuacoes': pontuacoes,
+                },
+                ultimo_id,
+            )
+            logger.info(
+                f'Índice de recomendações gerado: {len(livro_ids)} livros, '
+                f'{len(emprestimos)} empréstimos em {time.perf_counter() - inicio:.2f} s'
+            )
+            return meta
+        except Exception as e:
+            logger.error(f'Erro ao gerar índice de recomendações: {str(e)}')
+            raise
+
+    @staticmethod
+    def atualizar_indice(session: Session, directory: str) -> dict:
+        """Incorpora os empréstimos novos desde a última geração.
+
+        Só os pares (usuário, livro) novos entram no cálculo
+        (ΔC = Uᵀ·ΔU + ΔUᵀ·U + ΔUᵀ·ΔU), e só os vizinhos dos livros afetados
+        são recalculados. Exclusões de empréstimos não são refletidas: gere o
+        índice completo periodicamente.
+        """
+        try:
+            if not os.path.exists(os.path.join(directory, 'meta.json')):
+                return RecomendacaoService.gerar_indice(session, directory)
+
+            atual = RecomendacaoIndex(directory)
+            novos = _carregar_emprestimos(session, atual.meta['ultimo_emprestimo_id'])
+            if len(novos) == 0:
+                return atual.meta
+
+            indice = _expandir(
+                atual,
+                np.union1d(atual.livro_ids, novos[:, 2]),
+                np.union1d(atual.usuario_ids, novos[:, 1]),
+            )
+            usuarios = indice['usuarios']
+
+            # Pares (usuário, livro) ainda não vistos
+            delta = _binaria(
+                np.searchsorted(indice['usuario_ids'], novos[:, 1]),
+                np.searchsorted(indice['livro_ids'], novos[:, 2]),
+                usuarios.shape,
+            )
+            delta = (delta - delta.multiply(usuarios)).tocsr()
+            delta.eliminate_zeros()
+
+            delta_cooc = (
+                usuarios.T @ delta + delta.T @ usuarios + delta.T @ delta
+            ).tocsr()
+            indice['popularidade'] += delta_cooc.diagonal()
+            delta_cooc.setdiag(0)
+
+            indice['usuarios'] = (usuarios + delta).tocsr()
+            cooc = (indice['cooc'] + delta_cooc).tocsr()
+            cooc.eliminate_zeros()
+            cooc.sort_indices()
+            indice['cooc'] = cooc
+
+            # Livros com pares novos e os seus vizinhos (a popularidade entra
+            # no denominador da similaridade)
+            novos_livros = np.flatnonzero(np.asarray(delta.sum(axis=0)).ravel())
+            afetadas = np.union1d(novos_livros, cooc[novos_livros].indices)
+            indice['vizinhos'][afetadas], indice['pontuacoes'][afetadas] = _top_k(
+                cooc, indice['popularidade'], indice['livro_ids'], afetadas
+            )
+
+            meta = _gravar(directory, indice, int(novos[:, 0].max()))
+            logger.info(
+                f'Índice de recomendações atualizado: {len(novos)} empréstimos novos, '
+                f'{len(afetadas)} livros recalculados'
+            )
+            return meta
+        except Exception as e:
+            logger.error(f'Erro ao atualizar índice de recomendações: {str(e)}')
+            raise
+
+    @staticmethod
+    def get_index(directory: str) -> Optional[RecomendacaoIndex]:
+        """Índice em memória, recarregado quando o meta.json muda em disco"""
+        index = RecomendacaoService._indices.get(directory)
+        meta_path = os.path.join(directory, 'meta.json')
+        if index is not None:
+            if time.monotonic() - index.checked_at < RELOAD_CHECK_SECONDS:
+                return index
+            index.checked_at = time.monotonic()
+            try:
+                if os.stat(meta_path).st_mtime_ns == index.mtime_ns:
+                    return index
+            except FileNotFoundError:
+                return index
+        if not os.path.exists(meta_path):
+            return None
+        index = RecomendacaoIndex(directory)
+        RecomendacaoService._indices[directory] = index
+        logger.info(f'Índice de recomendações carregado de {directory}')
+        return index
+
+    @staticmethod
+    def recomendar_para_livro(
+        index: RecomendacaoIndex, livro_id: int, limit: int = 10
+    ) -> List[Tuple[int, float]]:
+        return index.similares(livro_id, limit)
+
+    @staticmethod
+    def recomendar_para_usuario(
+        session: Session, index: RecomendacaoIndex, usuario_id: int, limit: int = 10
+    ) -> List[Tuple[int, float]]:
+        """Recomendações pelo histórico de empréstimos e pelo perfil.
+
+        Os ``livros_favoritos`` do perfil (títulos separados por vírgula)
+        entram como histórico; se ainda faltarem itens, completa com os livros
+        mais emprestados das categorias em ``interesses_literarios``.
+        """
+        try:
+            historico = index.historico(usuario_id)
+            perfil = session.exec(
+                select(PerfilUsuario).where(PerfilUsuario.usuario_id == usuario_id)
+            ).first()
+
+            if perfil and perfil.livros_favoritos:
+                titulos = _termos(perfil.livros_favoritos)
+                favoritos = session.exec(
+                    select(Livro.id).where(func.lower(Livro.titulo).in_(titulos))
+                ).all()
+                historico = np.union1d(historico, index.posicoes(favoritos))
+
+            recomendacoes = index.pontuar(historico, limit)
+
+            if len(recomendacoes) < limit and perfil and perfil.interesses_literarios:
+                vistos = set(index.livro_ids[historico].tolist())
+                vistos.update(livro_id for livro_id, _ in recomendacoes)
+                candidatos = session.exec(
+                    select(LivroCategoriaLink.livro_id)
+                    .join(Categoria, Categoria.id == LivroCategoriaLink.categoria_id)
+                    .where(
+                        func.lower(Categoria.nome).in_(
+                            _termos(perfil.interesses_literarios)
+                        )
+                    )
+                    .distinct()
+                ).all()
+                candidatos = [c for c in candidatos if c not in vistos]
+                posicoes = index.posicoes(candidatos)
+                populares = np.asarray(index.popularidade[posicoes])
+                ordem = np.argsort(-populares, kind='stable')
+                for pos in posicoes[ordem][: limit - len(recomendacoes)]:
+                    recomendacoes.append((int(index.livro_ids[pos]), 0.0))
+
+            logger.info(
+                f'Recomendações para usuário ID {usuario_id}: {len(recomendacoes)}'
+            )
+            return recomendacoes
+        except Exception as e:
+            logger.error(
+                f'Erro ao recomendar livros para usuário ID {usuario_id}: {str(e)}'
+            )
+            raise
+
+    @staticmethod
+    def carregar_na_inicializacao(app):
+        """Tarefa de inicialização: abre o índice antes da primeira requisição"""
+        RecomendacaoService.get_index(app.state.settings.recomendacoes_dir)
+
+    @staticmethod
+    def agendar_atualizacao(session: Session):
+        """Enfileira (sem commit) a atualização incremental do índice"""
+        TarefaService.enfileirar(
+            session,
+            TAREFA_ATUALIZACAO,
+            executar_em=datetime.now() + ATRASO_ATUALIZACAO,
+            chave=TAREFA_ATUALIZACAO,
+        )
+
+
+@tarefa(TAREFA_ATUALIZACAO)
+def _tarefa_atualizar_indice(session: Session, dados: dict, settings: Settings):
+    RecomendacaoService.atualizar_indice(session, settings.recomendacoes_dir)
+
+
+def _termos(texto: str) -> List[str]:
+    return [t.strip().lower() for t in texto.split(',') if t.strip()]
+
+
+def main(argv=None):
+    from config.database import get_engine  # noqa: PLC0415
+    from config.logging_config import setup_logging  # noqa: PLC0415
+
+    parser = argparse.ArgumentParser(
+        prog='python -m services.recomendacao_service',
+        description='Gera ou atualiza o índice de recomendações',
+    )
+    parser.add_argument('acao', choices=['gerar', 'atualizar'])
+    parser.add_argument('--dir', default=Settings.from_env().recomendacoes_dir)
+    args = parser.parse_args(argv)
+
+    setup_logging()
+    with Session(get_engine()) as session:
+        if args.acao == 'gerar':
+            RecomendacaoService.gerar_indice(session, args.dir)
+        else:
+            RecomendacaoService.atualizar_indice(session, args.dir)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,351 @@
+from collections import defaultdict
+from datetime import datetime, timedelta
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import bindparam, case, func, update
+from sqlmodel import Session, select
+
+from config.logging_config import logger
+from config.settings import Settings
+from models.models import Livro, OperacaoEvento, Reserva, StatusReserva, Usuario
+from schemas.schemas import ReservaCreate
+from services.evento_service import EventoService
+from services.livro_service import LivroService
+from services.notificacao import Notificador
+from services.pagination import paginate_search
+from services.tarefa_service import TarefaService, tarefa
+
+# Tempo em que um exemplar devolvido fica separado para o próximo da fila
+PRAZO_RETIRADA = timedelta(days=2)
+
+# Status em que a reserva ainda ocupa um lugar na fila
+STATUS_ABERTOS = (StatusReserva.AGUARDANDO, StatusReserva.DISPONIVEL)
+
+# Avisos para quem aguarda mudanças de uma reserva (long-poll/SSE)
+notificador_reservas = Notificador()
+
+# Expira o exemplar separado no fim do prazo, mesmo sem novas operações no livro
+TAREFA_EXPIRACAO = 'reservas.expirar'
+
+
+@lru_cache(maxsize=None)
+def _busca(usuario_id: bool, livro_id: bool, status: bool):
+    # Uma instrução por combinação de filtros; os valores vão como parâmetros
+    statement = select(Reserva)
+    if usuario_id:
+        statement = statement.where(Reserva.usuario_id == bindparam('usuario_id'))
+    if livro_id:
+        statement = statement.where(Reserva.livro_id == bindparam('livro_id'))
+    if status:
+        statement = statement.where(Reserva.status == bindparam('status'))
+    return statement
+
+
+class ReservaService:
+    @staticmethod
+    def create_reserva(session: Session, reserva_data: ReservaCreate) -> Reserva:
+        try:
+            usuario = session.get(Usuario, reserva_data.usuario_id)
+            if not usuario:
+                raise ValueError(
+                    f'Usuário com ID {reserva_data.usuario_id} não encontrado'
+                )
+
+            if not usuario.ativo:
+                raise ValueError('Usuário não está ativo')
+
+            # Bloqueia o livro: serializa a numeração da fila e as devoluções
+            livro = session.get(Livro, reserva_data.livro_id, with_for_update=True)
+            if not livro:
+                raise ValueError(f'Livro com ID {reserva_data.livro_id} não encontrado')
+
+            expiradas = ReservaService.expirar_reservas(session, livro)
+            if livro.quantidade_disponivel > 0:
+                raise ValueError(
+                    'Livro está disponível para empréstimo; não é necessário reservar'
+                )
+
+            existente = session.exec(
+                select(Reserva.id).where(
+                    Reserva.livro_id == livro.id,
+                    Reserva.usuario_id == usuario.id,
+                    Reserva.status.in_(STATUS_ABERTOS),
+                )
+            ).first()
+            if existente:
+                raise ValueError(
+                    f'Usuário já possui a reserva ID {existente} deste livro'
+                )
+
+            ultima = session.exec(
+                select(func.max(Reserva.posicao)).where(Reserva.livro_id == livro.id)
+            ).one()
+            reserva = Reserva(
+                livro_id=livro.id, usuario_id=usuario.id, posicao=(ultima or 0) + 1
+            )
+            session.add(reserva)
+            EventoService.registrar(session, reserva, OperacaoEvento.CREATE)
+            session.commit()
+            session.refresh(reserva)
+            ReservaService.notificar(expiradas)
+            logger.info(
+                f'Reserva criada com sucesso: ID {reserva.id} '
+                f'(livro ID {livro.id}, posição {reserva.posicao})'
+            )
+            return reserva
+        except Exception as e:
+            session.rollback()
+            logger.error(f'Erro ao criar reserva: {str(e)}')
+            raise
+
+    @staticmethod
+    def get_reserva_by_id(session: Session, reserva_id: int) -> Optional[Reserva]:
+        try:
+            reserva = session.get(Reserva, reserva_id)
+            if reserva:
+                logger.info(f'Reserva encontrada: ID {reserva_id}')
+            else:
+                logger.warning(f'Reserva não encontrada: ID {reserva_id}')
+            return reserva
+        except Exception as e:
+            logger.error(f'Erro ao buscar reserva por ID {reserva_id}: {str(e)}')
+            raise
+
+    @staticmethod
+    def cancel_reserva(session: Session, reserva_id: int) -> Optional[Reserva]:
+        """Cancela a reserva; um exemplar já separado passa para o próximo"""
+        try:
+            reserva = session.get(Reserva, reserva_id)
+            if not reserva:
+                logger.warning(
+                    f'Reserva não encontrada para cancelamento: ID {reserva_id}'
+                )
+                return None
+
+            # Livro bloqueado antes de conferir o status, como na expiração e
+            # na devolução: a reserva é relida depois do bloqueio
+            livro = session.get(Livro, reserva.livro_id, with_for_update=True)
+            reserva = session.get(
+                Reserva, reserva_id, with_for_update=True, populate_existing=True
+            )
+            if reserva.status not in STATUS_ABERTOS:
+                raise ValueError(f'Reserva já está {reserva.status.value}')
+
+            notificar = [reserva.id]
+            liberado = reserva.status == StatusReserva.DISPONIVEL
+            reserva.status = StatusReserva.CANCELADA
+            if liberado:
+                notificar += ReservaService.liberar_exemplar(session, livro)
+
+            EventoService.registrar(session, reserva, OperacaoEvento.UPDATE)
+            session.commit()
+            session.refresh(reserva)
+            if liberado:
+                LivroService.invalidar_disponiveis()
+            ReservaService.notificar(notificar)
+            logger.info(f'Reserva cancelada com sucesso: ID {reserva_id}')
+            return reserva
+        except Exception as e:
+            session.rollback()
+            logger.error(f'Erro ao cancelar reserva ID {reserva_id}: {str(e)}')
+            raise
+
+    @staticmethod
+    def search_reservas(  # noqa: PLR0913, PLR0917
+        session: Session,
+        usuario_id: Optional[int] = None,
+        livro_id: Optional[int] = None,
+        status: Optional[StatusReserva] = None,
+        skip: int = 0,
+        limit: int = 10,
+        cursor: Optional[str] = None,
+        include_total: bool = False,
+    ) -> dict:
+        try:
+            result = paginate_search(
+                session,
+                _busca(bool(usuario_id), bool(livro_id), bool(status)),
+                Reserva,
+                skip,
+                limit,
+                cursor,
+                include_total,
+                params={'usuario_id': usuario_id, 'livro_id': livro_id, 'status': status},
+            )
+            logger.info(f'Busca de reservas: {len(result["items"])} encontradas')
+            return result
+        except Exception as e:
+            logger.error(f'Erro na busca de reservas: {str(e)}')
+            raise
+
+    # As operações abaixo não fazem commit: rodam dentro da transação de quem
+    # as chama (empréstimo, devolução, cancelamento), que deve ter bloqueado o
+    # livro, e devolvem os IDs das reservas a notificar após o commit.
+
+    @staticmethod
+    def liberar_exemplar(session: Session, livro: Livro) -> List[int]:
+        """Entrega um exemplar que voltou ao acervo ao primeiro da fila.
+
+        Sem ninguém aguardando, o exemplar volta para ``quantidade_disponivel``.
+        """
+        proxima = session.exec(
+            select(Reserva)
+            .where(
+                Reserva.livro_id == livro.id,
+                Reserva.status == StatusReserva.AGUARDANDO,
+            )
+            .order_by(Reserva.posicao)
+            .limit(1)
+        ).first()
+
+        if not proxima:
+            livro.quantidade_disponivel += 1
+            EventoService.registrar(session, livro, OperacaoEvento.UPDATE)
+            return []
+
+        ReservaService._separar(session, livro, proxima)
+        return [proxima.id]
+
+    @staticmethod
+    def liberar_exemplares(
+        session: Session, livros: Dict[int, Livro], quantidades: Dict[int, int]
+    ) -> List[int]:
+        """Versão em lote de ``liberar_exemplar`` (``quantidades`` por livro).
+
+        As filas de todos os livros vêm numa só consulta, e os exemplares que
+        sobram voltam ao acervo num único UPDATE.
+        """
+        filas = defaultdict(list)
+        for reserva in session.exec(
+            select(Reserva)
+            .where(
+                Reserva.livro_id.in_(list(quantidades)),
+                Reserva.status == StatusReserva.AGUARDANDO,
+            )
+            .order_by(Reserva.livro_id, Reserva.posicao)
+        ):
+            filas[reserva.livro_id].append(reserva)
+
+        notificar = []
+        sobras = {}
+        for livro_id, quantidade in quantidades.items():
+            separadas = filas[livro_id][:quantidade]
+            for reserva in separadas:
+                ReservaService._separar(session, livros[livro_id], reserva)
+                notificar.append(reserva.id)
+            if quantidade > len(separadas):
+                sobras[livro_id] = quantidade - len(separadas)
+
+        if sobras:
+            session.exec(
+                update(Livro)
+                .where(Livro.id.in_(list(sobras)))
+                .values(
+                    quantidade_disponivel=Livro.quantidade_disponivel
+                    + case(sobras, value=Livro.id)
+                )
+            )
+            for livro_id in sobras:
+                EventoService.registrar(session, livros[livro_id], OperacaoEvento.UPDATE)
+        return notificar
+
+    @staticmethod
+    def _separar(session: Session, livro: Livro, reserva: Reserva):
+        agora = datetime.now()
+        reserva.status = StatusReserva.DISPONIVEL
+        reserva.data_disponibilidade = agora
+        reserva.expira_em = agora + PRAZO_RETIRADA
+        EventoService.registrar(session, reserva, OperacaoEvento.UPDATE)
+        TarefaService.enfileirar(
+            session,
+            TAREFA_EXPIRACAO,
+            {'livro_id': livro.id},
+            executar_em=reserva.expira_em,
+        )
+        logger.info(
+            f'Exemplar do livro ID {livro.id} separado para a reserva ID {reserva.id}'
+        )
+
+    @staticmethod
+    def atender_reserva(session: Session, usuario_id: int, livro_id: int) -> bool:
+        """Marca como atendida a reserva com exemplar separado para o usuário"""
+        reserva = session.exec(
+            select(Reserva).where(
+                Reserva.livro_id == livro_id,
+                Reserva.usuario_id == usuario_id,
+                Reserva.status == StatusReserva.DISPONIVEL,
+            )
+        ).first()
+        if not reserva:
+            return False
+        reserva.status = StatusReserva.ATENDIDA
+        EventoService.registrar(session, reserva, OperacaoEvento.UPDATE)
+        return True
+
+    @staticmethod
+    def separadas_para_usuario(
+        session: Session, usuario_id: int, livros: Dict[int, Livro]
+    ) -> Tuple[Dict[int, Reserva], List[int]]:
+        """Prepara empréstimos em lote dos ``livros`` para o usuário.
+
+        Expira os exemplares separados vencidos e devolve, por livro, a reserva
+        com exemplar separado para o usuário (a atender pelo empréstimo), além
+        dos IDs das reservas a notificar.
+        """
+        notificar = []
+        vencidos = session.exec(
+            select(Reserva.livro_id)
+            .where(
+                Reserva.livro_id.in_(list(livros)),
+                Reserva.status == StatusReserva.DISPONIVEL,
+                Reserva.expira_em < datetime.now(),
+            )
+            .distinct()
+        ).all()
+        for livro_id in vencidos:
+            notificar += ReservaService.expirar_reservas(session, livros[livro_id])
+
+        separadas = session.exec(
+            select(Reserva).where(
+                Reserva.livro_id.in_(list(livros)),
+                Reserva.usuario_id == usuario_id,
+                Reserva.status == StatusReserva.DISPONIVEL,
+            )
+        ).all()
+        return {reserva.livro_id: reserva for reserva in separadas}, notificar
+
+    @staticmethod
+    def expirar_reservas(session: Session, livro: Livro) -> List[int]:
+        """Expira os exemplares separados e não retirados no prazo"""
+        vencidas = session.exec(
+            select(Reserva).where(
+                Reserva.livro_id == livro.id,
+                Reserva.status == StatusReserva.DISPONIVEL,
+                Reserva.expira_em < datetime.now(),
+            )
+        ).all()
+        notificar = []
+        for reserva in vencidas:
+            reserva.status = StatusReserva.EXPIRADA
+            EventoService.registrar(session, reserva, OperacaoEvento.UPDATE)
+            notificar.append(reserva.id)
+            notificar += ReservaService.liberar_exemplar(session, livro)
+        return notificar
+
+    @staticmethod
+    def notificar(reserva_ids: List[int]):
+        for reserva_id in reserva_ids:
+            notificador_reservas.notificar(reserva_id)
+
+
+@tarefa(TAREFA_EXPIRACAO)
+def _tarefa_expirar_reservas(session: Session, dados: dict, settings: Settings):
+    livro = session.get(Livro, dados['livro_id'], with_for_update=True)
+    if not livro:
+        return
+    notificar = ReservaService.expirar_reservas(session, livro)
+    session.commit()
+    if notificar:
+        LivroService.invalidar_disponiveis()
+        ReservaService.notificar(notificar)
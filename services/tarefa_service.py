@@ -0,0 +1,355 @@
+"""Tarefas em segundo plano, sem broker externo.
+
+Quem precisa de um efeito colateral que não deve atrasar a requisição chama
+``TarefaService.enfileirar`` antes do commit: a tarefa é gravada na tabela
+``tarefa`` na mesma transação (outbox) e só existe se a alteração existir.
+O ``ExecutorTarefas`` busca as tarefas vencidas e as executa num pool de
+threads limitado, com novas tentativas e espera exponencial entre elas.
+
+O executor roda em um processo próprio (``python -m services.tarefa_service``)
+ou dentro da aplicação (``TAREFAS_NO_PROCESSO=1``); vários executores podem
+rodar ao mesmo tempo, pois cada tarefa é reservada antes de executar. A
+entrega é "pelo menos uma vez": os handlers devem ser idempotentes.
+"""
+
+import argparse
+import importlib
+import random
+import signal
+import threading
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional
+
+from sqlalchemy import event, update
+from sqlmodel import Session, delete, select
+
+from config.logging_config import logger
+from config.settings import Settings
+from models.models import StatusTarefa, Tarefa
+
+# Módulos que registram handlers (importados pelo executor)
+MODULOS_TAREFAS = (
+    'services.exportacao_service',
+    'services.recomendacao_service',
+    'services.reserva_service',
+)
+
+MAX_TENTATIVAS = 5
+# Espera antes da tentativa n: ATRASO_BASE * 2^(n-1), com jitter, até o máximo
+ATRASO_BASE = timedelta(seconds=5)
+ATRASO_MAXIMO = timedelta(hours=1)
+# Tempo para concluir uma tarefa; depois disso outro executor pode retomá-la
+PRAZO_EXECUCAO = timedelta(minutes=10)
+# Tarefas concluídas são removidas após este período
+RETENCAO_CONCLUIDAS = timedelta(days=7)
+INTERVALO_LIMPEZA = timedelta(hours=1)
+
+# tipo -> handler(session, dados, settings); settings é o do executor (o da
+# aplicação quando o executor roda no processo da API)
+_handlers: Dict[str, Callable] = {}
+
+# Executores deste processo, acordados após o commit de novas tarefas
+_executores = weakref.WeakSet()
+
+
+def tarefa(tipo: str):
+    """Registra o handler de um tipo de tarefa"""
+
+    def decorator(handler: Callable) -> Callable:
+        _handlers[tipo] = handler
+        return handler
+
+    return decorator
+
+
+def _ao_commit(session):
+    if session.info.pop('tarefas_pendentes', False):
+        for executor in list(_executores):
+            executor.acordar()
+
+
+def _ao_rollback(session, previous_transaction):
+    if previous_transaction.parent is None:
+        session.info.pop('tarefas_pendentes', None)
+
+
+event.listen(Session, 'after_commit', _ao_commit)
+event.listen(Session, 'after_soft_rollback', _ao_rollback)
+
+
+def _atraso(tentativas: int) -> timedelta:
+    atraso = min(ATRASO_MAXIMO, ATRASO_BASE * 2 ** (tentativas - 1))
+    # Jitter: tarefas que falharam juntas não voltam todas ao mesmo tempo
+    return atraso * random.uniform(0.5, 1.0)
+
+
+class TarefaService:
+    @staticmethod
+    def enfileirar(  # noqa: PLR0913, PLR0917
+        session: Session,
+        tipo: str,
+        dados: Optional[dict] = None,
+        executar_em: Optional[datetime] = None,
+        chave: Optional[str] = None,
+        max_tentativas: int = MAX_TENTATIVAS,
+    ) -> Tarefa:
+        """Adiciona a tarefa à transação corrente (sem commit).
+
+        Com ``chave``, se já houver uma tarefa pendente com a mesma chave, ela
+        é reaproveitada: várias alterações próximas geram uma só execução.
+        """
+        if chave:
+            existente = session.exec(
+                select(Tarefa).where(
+                    Tarefa.chave == chave, Tarefa.status == StatusTarefa.PENDENTE
+                )
+            ).first()
+            if existente:
+                return existente
+
+        nova = Tarefa(
+            tipo=tipo,
+            dados=dados,
+            executar_em=executar_em or datetime.now(),
+            chave=chave,
+            max_tentativas=max_tentativas,
+        )
+        session.add(nova)
+        session.info['tarefas_pendentes'] = True
+        return nova
+
+    @staticmethod
+    def reservar(session: Session, limit: int) -> List[int]:
+        """Reserva até ``limit`` tarefas vencidas para este executor.
+
+        Também retoma tarefas cujo prazo de execução acabou (executor
+        interrompido). A reserva é um UPDATE condicional por tarefa, então
+        dois executores nunca ficam com a mesma.
+        """
+        try:
+            agora = datetime.now()
+            condicao = (
+                Tarefa.status.in_([StatusTarefa.PENDENTE, StatusTarefa.EXECUTANDO]),
+                Tarefa.executar_em <= agora,
+            )
+            candidatas = session.exec(
+                select(Tarefa.id)
+                .where(*condicao)
+                .order_by(Tarefa.executar_em)
+                .limit(limit)
+                .with_for_update(skip_locked=True)
+            ).all()
+
+            reservadas = []
+            for tarefa_id in candidatas:
+                result = session.exec(
+                    update(Tarefa)
+                    .where(Tarefa.id == tarefa_id, *condicao)
+                    .values(
+                        status=StatusTarefa.EXECUTANDO,
+                        executar_em=agora + PRAZO_EXECUCAO,
+                        tentativas=Tarefa.tentativas + 1,
+                    )
+                )
+                if result.rowcount:
+                    reservadas.append(tarefa_id)
+            session.commit()
+            return reservadas
+        except Exception as e:
+            session.rollback()
+            logger.error(f'Erro ao reservar tarefas: {str(e)}')
+            raise
+
+    @staticmethod
+    def executar(session: Session, tarefa_id: int, settings: Settings) -> Tarefa:
+        """Executa uma tarefa reservada e registra o resultado"""
+        item = session.get(Tarefa, tarefa_id)
+        try:
+            handler = _handlers.get(item.tipo)
+            if handler is None:
+                raise ValueError(f'Tipo de tarefa desconhecido: {item.tipo}')
+            handler(session, item.dados or {}, settings)
+
+            item.status = StatusTarefa.CONCLUIDA
+            item.data_conclusao = datetime.now()
+            item.erro = None
+            session.commit()
+            logger.info(f'Tarefa concluída: ID {tarefa_id} ({item.tipo})')
+        except Exception as e:
+            session.rollback()
+            item = session.get(Tarefa, tarefa_id)
+            item.erro = str(e)
+            if item.tentativas >= item.max_tentativas:
+                item.status = StatusTarefa.FALHOU
+                logger.error(
+                    f'Tarefa ID {tarefa_id} ({item.tipo}) falhou após '
+                    f'{item.tentativas} tentativas: {str(e)}'
+                )
+            else:
+                item.status = StatusTarefa.PENDENTE
+                item.executar_em = datetime.now() + _atraso(item.tentativas)
+                logger.warning(
+                    f'Tarefa ID {tarefa_id} ({item.tipo}) falhou na tentativa '
+                    f'{item.tentativas}; nova tentativa em {item.executar_em}: {str(e)}'
+                )
+            session.commit()
+        return item
+
+    @staticmethod
+    def limpar(session: Session, antes: datetime) -> int:
+        """Remove as tarefas concluídas antes de ``antes``"""
+        try:
+            result = session.exec(
+                delete(Tarefa).where(
+                    Tarefa.status == StatusTarefa.CONCLUIDA,
+                    Tarefa.data_conclusao < antes,
+                )
+            )
+            session.commit()
+            if result.rowcount:
+                logger.info(f'{result.rowcount} tarefas concluídas removidas')
+            return result.rowcount
+        except Exception as e:
+            session.rollback()
+            logger.error(f'Erro ao remover tarefas concluídas: {str(e)}')
+            raise
+
+    @staticmethod
+    def iniciar_na_aplicacao(app):
+        """Tarefa de inicialização: executor dentro do processo da API"""
+        settings = app.state.settings
+        if settings.tarefas_no_processo:
+            carregar_handlers()
+            executor = ExecutorTarefas(
+                app.state.engine, settings, settings.tarefas_concorrencia
+            )
+            executor.iniciar()
+            app.state.executor_tarefas = executor
+
+
+class ExecutorTarefas:
+    """Executa as tarefas vencidas com no máximo ``concorrencia`` em paralelo.
+
+    Uma thread busca tarefas quando há threads livres no pool; ela é acordada
+    pelo fim de uma tarefa, pelo commit de uma tarefa nova neste processo ou,
+    para tarefas de outros processos e com espera, a cada ``intervalo``.
+    """
+
+    def __init__(
+        self, engine, settings: Settings, concorrencia: int = 4, intervalo: float = 1.0
+    ):
+        self.engine = engine
+        self.settings = settings
+        self.concorrencia = concorrencia
+        self.intervalo = intervalo
+        self._pool = ThreadPoolExecutor(concorrencia, thread_name_prefix='tarefa')
+        self._ocupadas = 0
+        self._lock = threading.Lock()
+        self._acordar = threading.Event()
+        self._parar = threading.Event()
+        self._thread = None
+        self._ultima_limpeza = datetime.min
+
+    def iniciar(self):
+        _executores.add(self)
+        self._thread = threading.Thread(
+            target=self._loop, name='executor-tarefas', daemon=True
+        )
+        self._thread.start()
+        logger.info(f'Executor de tarefas iniciado ({self.concorrencia} threads)')
+
+    def acordar(self):
+        self._acordar.set()
+
+    def parar(self, timeout: Optional[float] = None):
+        """Para de buscar tarefas e aguarda as que estão em execução"""
+        self._parar.set()
+        self._acordar.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        self._pool.shutdown(wait=True)
+        _executores.discard(self)
+        logger.info('Executor de tarefas finalizado')
+
+    def _loop(self):
+        while not self._parar.is_set():
+            self._acordar.clear()
+            with self._lock:
+                livres = self.concorrencia - self._ocupadas
+            try:
+                if livres > 0:
+                    self._despachar(livres)
+                self._limpar()
+            except Exception as e:
+                logger.error(f'Erro no executor de tarefas: {str(e)}')
+            self._acordar.wait(self.intervalo)
+
+    def _despachar(self, livres: int):
+        with Session(self.engine) as session:
+            reservadas = TarefaService.reservar(session, livres)
+        for tarefa_id in reservadas:
+            with self._lock:
+                self._ocupadas += 1
+            self._pool.submit(self._executar, tarefa_id)
+        if len(reservadas) == livres:
+            # Pode haver mais tarefas vencidas: buscar quando houver vaga
+            self._acordar.set()
+
+    def _executar(self, tarefa_id: int):
+        try:
+            with Session(self.engine) as session:
+                TarefaService.executar(session, tarefa_id, self.settings)
+        except Exception as e:
+            logger.error(f'Erro ao executar tarefa ID {tarefa_id}: {str(e)}')
+        finally:
+            with self._lock:
+                self._ocupadas -= 1
+            self._acordar.set()
+
+    def _limpar(self):
+        agora = datetime.now()
+        if agora - self._ultima_limpeza >= INTERVALO_LIMPEZA:
+            self._ultima_limpeza = agora
+            with Session(self.engine) as session:
+                TarefaService.limpar(session, agora - RETENCAO_CONCLUIDAS)
+
+
+def carregar_handlers():
+    for modulo in MODULOS_TAREFAS:
+        importlib.import_module(modulo)
+
+
+def main(argv=None):
+    from config.database import get_engine  # noqa: PLC0415
+    from config.logging_config import setup_logging  # noqa: PLC0415
+
+    settings = Settings.from_env()
+    parser = argparse.ArgumentParser(
+        prog='python -m services.tarefa_service',
+        description='Executa as tarefas em segundo plano até receber SIGINT/SIGTERM',
+    )
+    parser.add_argument('--concorrencia', type=int, default=settings.tarefas_concorrencia)
+    parser.add_argument(
+        '--intervalo',
+        type=float,
+        default=1.0,
+        help='Segundos entre buscas por tarefas de outros processos',
+    )
+    args = parser.parse_args(argv)
+
+    setup_logging()
+    carregar_handlers()
+    parar = threading.Event()
+    signal.signal(signal.SIGINT, lambda *_: parar.set())
+    signal.signal(signal.SIGTERM, lambda *_: parar.set())
+
+    executor = ExecutorTarefas(get_engine(), settings, args.concorrencia, args.intervalo)
+    executor.iniciar()
+    parar.wait()
+    executor.parar()
+
+
+if __name__ == '__main__':
+    main()
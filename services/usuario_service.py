@@ -1,12 +1,29 @@
+from functools import lru_cache
 from math import ceil
-from typing import List, Optional
+from typing import Optional
 
 from config.logging_config import logger
-from models.models import Usuario
+from models.models import OperacaoEvento, Usuario
 from schemas.schemas import UsuarioCreate, UsuarioUpdate
+from services.evento_service import EventoService
+from services.pagination import count_statement, page_statement, paginate_search
+from sqlalchemy import bindparam
 from sqlmodel import Session, select
 
 
+@lru_cache(maxsize=None)
+def _busca(nome: bool, email: bool, ativo: bool):
+    # Uma instrução por combinação de filtros; os valores vão como parâmetros
+    statement = select(Usuario)
+    if nome:
+        statement = statement.where(Usuario.nome.contains(bindparam('nome')))
+    if email:
+        statement = statement.where(Usuario.email.contains(bindparam('email')))
+    if ativo:
+        statement = statement.where(Usuario.ativo == bindparam('ativo'))
+    return statement
+
+
 class UsuarioService:
     @staticmethod
     def create_usuario(session: Session, usuario_data: UsuarioCreate) -> Usuario:
@@ -21,6 +38,7 @@ class UsuarioService:
 
             usuario = Usuario(**usuario_data.model_dump())
             session.add(usuario)
+            EventoService.registrar(session, usuario, OperacaoEvento.CREATE)
             session.commit()
             session.refresh(usuario)
             logger.info(f'Usuário criado com sucesso: ID {usuario.id}')
@@ -47,12 +65,12 @@ class UsuarioService:
     def get_all_usuarios(session: Session, skip: int = 0, limit: int = 100) -> dict:
         try:
             # Contagem total
-            count_statement = select(Usuario)
-            total = len(session.exec(count_statement).all())
+            total = session.exec(count_statement(Usuario)).one()
 
             # Busca paginada
-            statement = select(Usuario).offset(skip).limit(limit)
-            usuarios = session.exec(statement).all()
+            usuarios = session.exec(
+                page_statement(Usuario), params={'skip': skip, 'limit': limit}
+            ).all()
 
             total_pages = ceil(total / limit) if limit > 0 else 1
             page = (skip // limit) + 1 if limit > 0 else 1
@@ -97,6 +115,7 @@ class UsuarioService:
             for field, value in update_data.items():
                 setattr(usuario, field, value)
 
+            EventoService.registrar(session, usuario, OperacaoEvento.UPDATE)
             session.commit()
             session.refresh(usuario)
             logger.info(f'Usuário atualizado com sucesso: ID {usuario_id}')
@@ -114,6 +133,7 @@ class UsuarioService:
                 logger.warning(f'Usuário não encontrado para exclusão: ID {usuario_id}')
                 return False
 
+            EventoService.registrar(session, usuario, OperacaoEvento.DELETE)
             session.delete(usuario)
             session.commit()
             logger.info(f'Usuário excluído com sucesso: ID {usuario_id}')
@@ -126,8 +146,7 @@ class UsuarioService:
     @staticmethod
     def count_usuarios(session: Session) -> int:
         try:
-            statement = select(Usuario)
-            count = len(session.exec(statement).all())
+            count = session.exec(count_statement(Usuario)).one()
             logger.info(f'Contagem de usuários: {count}')
             return count
         except Exception as e:
@@ -135,27 +154,29 @@ class UsuarioService:
             raise
 
     @staticmethod
-    def search_usuarios(
+    def search_usuarios(  # noqa: PLR0913, PLR0917
         session: Session,
         nome: Optional[str] = None,
         email: Optional[str] = None,
         ativo: Optional[bool] = None,
-    ) -> List[Usuario]:
+        skip: int = 0,
+        limit: int = 10,
+        cursor: Optional[str] = None,
+        include_total: bool = False,
+    ) -> dict:
         try:
-            statement = select(Usuario)
-
-            if nome:
-                statement = statement.where(Usuario.nome.contains(nome))
-
-            if email:
-                statement = statement.where(Usuario.email.contains(email))
-
-            if ativo is not None:
-                statement = statement.where(Usuario.ativo == ativo)
-
-            usuarios = session.exec(statement).all()
-            logger.info(f'Busca de usuários: {len(usuarios)} encontrados')
-            return usuarios
+            result = paginate_search(
+                session,
+                _busca(bool(nome), bool(email), ativo is not None),
+                Usuario,
+                skip,
+                limit,
+                cursor,
+                include_total,
+                params={'nome': nome, 'email': email, 'ativo': ativo},
+            )
+            logger.info(f'Busca de usuários: {len(result["items"])} encontrados')
+            return result
         except Exception as e:
             logger.error(f'Erro na busca de usuários: {str(e)}')
             raise
@@ -0,0 +1,125 @@
+"""Empréstimos e devoluções em lote (balcão de circulação)."""
+
+from http import HTTPStatus
+
+from models.models import Emprestimo, StatusEmprestimo
+from schemas.schemas import DevolucaoLote
+from services.emprestimo_service import EmprestimoService
+
+EXEMPLARES = 3
+
+
+def _disponivel(client, livro_id: int) -> int:
+    return client.get(f'/livros/{livro_id}').json()['quantidade_disponivel']
+
+
+def _emprestar(client, usuario_id: int, livro_ids: list) -> dict:
+    response = client.post(
+        '/emprestimos/lote',
+        json={
+            'usuario_id': usuario_id,
+            'livro_ids': livro_ids,
+            'data_devolucao_prevista': '2030-01-01',
+        },
+    )
+    assert response.status_code == HTTPStatus.OK, response.text
+    return response.json()
+
+
+def _devolver(client, emprestimo_ids: list) -> dict:
+    response = client.post(
+        '/emprestimos/lote/devolucao', json={'emprestimo_ids': emprestimo_ids}
+    )
+    assert response.status_code == HTTPStatus.OK, response.text
+    return response.json()
+
+
+def test_emprestimo_em_lote_resultado_por_item(client, fabrica):
+    usuario = fabrica.usuario()
+    livro = fabrica.livro(quantidade_total=2)
+    outro = fabrica.livro()
+    esgotado = fabrica.livro(quantidade_total=0)
+
+    livro_ids = [livro['id'], outro['id'], livro['id'], 999, esgotado['id']]
+    result = _emprestar(client, usuario['id'], livro_ids)
+
+    assert [(item['id'], item['sucesso'], item['erro']) for item in result['items']] == [
+        (livro['id'], True, None),
+        (outro['id'], True, None),
+        (livro['id'], False, 'Livro repetido no lote'),
+        (999, False, 'Livro com ID 999 não encontrado'),
+        (esgotado['id'], False, 'Livro não está disponível para empréstimo'),
+    ]
+    assert (result['sucesso'], result['falhas']) == (2, 3)
+    assert result['items'][0]['emprestimo']['status'] == StatusEmprestimo.ATIVO.value
+    assert _disponivel(client, livro['id']) == 1
+    assert _disponivel(client, outro['id']) == 0
+    assert _disponivel(client, esgotado['id']) == 0
+
+
+def test_emprestimo_em_lote_recusa_usuario_inativo(client, fabrica):
+    usuario = fabrica.usuario()
+    livro = fabrica.livro()
+    client.put(f'/usuarios/{usuario["id"]}', json={'ativo': False})
+
+    response = client.post(
+        '/emprestimos/lote',
+        json={
+            'usuario_id': usuario['id'],
+            'livro_ids': [livro['id']],
+            'data_devolucao_prevista': '2030-01-01',
+        },
+    )
+
+    assert response.status_code == HTTPStatus.BAD_REQUEST
+    assert response.json()['detail'] == 'Usuário não está ativo'
+    assert _disponivel(client, livro['id']) == 1
+
+
+def test_devolucao_em_lote_resultado_por_item_e_estoque(client, fabrica):
+    usuario = fabrica.usuario()
+    livro = fabrica.livro(quantidade_total=EXEMPLARES)
+    emprestados = _emprestar(client, usuario['id'], [livro['id']])
+    primeiro = emprestados['items'][0]['emprestimo']['id']
+    segundo = fabrica.emprestimo(usuario['id'], livro['id'])['id']
+    assert _disponivel(client, livro['id']) == EXEMPLARES - 2
+
+    result = _devolver(client, [primeiro, segundo, primeiro, 999])
+
+    assert [(item['id'], item['sucesso'], item['erro']) for item in result['items']] == [
+        (primeiro, True, None),
+        (segundo, True, None),
+        (primeiro, False, 'Empréstimo repetido no lote'),
+        (999, False, 'Empréstimo com ID 999 não encontrado'),
+    ]
+    assert result['items'][0]['emprestimo']['status'] == StatusEmprestimo.DEVOLVIDO.value
+    assert _disponivel(client, livro['id']) == EXEMPLARES
+
+    # Já devolvidos: recusados, sem devolver o exemplar de novo
+    result = _devolver(client, [primeiro, segundo])
+    assert [item['erro'] for item in result['items']] == ['Empréstimo não está ativo'] * 2
+    assert _disponivel(client, livro['id']) == EXEMPLARES
+
+
+def test_devolucao_em_lote_concorrente_libera_o_exemplar_uma_vez(
+    client, fabrica, session, outra_session, ler_antes
+):
+    usuario = fabrica.usuario()
+    livro = fabrica.livro()
+    emprestimo_id = fabrica.emprestimo(usuario['id'], livro['id'])['id']
+
+    # Lido como ativo antes da devolução feita por outro balcão
+    emprestimo = ler_antes(Emprestimo, emprestimo_id)
+    assert emprestimo.status == StatusEmprestimo.ATIVO
+    result = EmprestimoService.devolver_lote(
+        outra_session, DevolucaoLote(emprestimo_ids=[emprestimo_id])
+    )
+    outra_session.close()
+    assert result['sucesso'] == 1
+
+    result = EmprestimoService.devolver_lote(
+        session, DevolucaoLote(emprestimo_ids=[emprestimo_id])
+    )
+
+    assert result['items'][0]['erro'] == 'Empréstimo não está ativo'
+    assert _disponivel(client, livro['id']) == 1
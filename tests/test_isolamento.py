@@ -0,0 +1,55 @@
+"""Testes de fumaça das fixtures: API pelo ``client`` e isolamento entre testes.
+
+Cada teste grava as mesmas linhas (nomes únicos) e confere que é o único a
+vê-las: se a transação de um teste vazasse para o seguinte no mesmo worker, a
+segunda gravação falharia ou a contagem passaria de um. Os testes
+parametrizados se espalham pelos workers com ``pytest -n 2``.
+"""
+
+from http import HTTPStatus
+
+import pytest
+from sqlmodel import select
+
+from models.models import Categoria
+
+RODADAS = range(4)
+
+
+@pytest.mark.parametrize('rodada', RODADAS)
+def test_categoria_criada_nao_vaza_entre_testes(client, rodada):
+    response = client.post('/categorias/', json={'nome': 'Isolamento'})
+    assert response.status_code == HTTPStatus.OK
+
+    response = client.get('/categorias/count')
+    assert response.status_code == HTTPStatus.OK
+    assert response.json()['total'] == 1
+
+
+@pytest.mark.parametrize('rodada', RODADAS)
+def test_livro_disponivel_nao_fica_em_cache_entre_testes(client, rodada):
+    response = client.get('/livros/disponiveis')
+    assert response.status_code == HTTPStatus.OK
+    assert response.json()['items'] == []
+
+    response = client.post(
+        '/livros/',
+        json={
+            'titulo': 'Isolamento',
+            'isbn': '978-0000000000',
+            'ano_publicacao': 2024,
+            'editora': 'Editora',
+            'numero_paginas': 100,
+        },
+    )
+    assert response.status_code == HTTPStatus.OK
+
+    response = client.get('/livros/disponiveis')
+    assert [item['titulo'] for item in response.json()['items']] == ['Isolamento']
+
+
+def test_commit_do_servico_fica_na_transacao_do_teste(client, session):
+    client.post('/categorias/', json={'nome': 'Mesma transação'})
+
+    nomes = session.exec(select(Categoria.nome)).all()
+    assert nomes == ['Mesma transação']
@@ -0,0 +1,65 @@
+"""Vínculos de livros com autores e categorias (sincronização em conjunto)."""
+
+from http import HTTPStatus
+
+from models.models import Livro
+
+
+def _ids(itens: list) -> list:
+    return sorted(item['id'] for item in itens)
+
+
+def test_livro_criado_com_ids_inexistentes_e_recusado(client, fabrica):
+    autor = fabrica.autor()
+
+    response = client.post(
+        '/livros/',
+        json={
+            'titulo': 'Sem vínculo',
+            'isbn': 'isbn-inexistente',
+            'ano_publicacao': 2000,
+            'editora': 'Editora',
+            'numero_paginas': 100,
+            'autor_ids': [autor['id'], 998, 999],
+        },
+    )
+
+    assert response.status_code == HTTPStatus.BAD_REQUEST
+    assert response.json()['detail'] == 'IDs de autor não encontrados: 998, 999'
+    assert client.get('/livros/count').json()['total'] == 0
+
+
+def test_atualizacao_troca_somente_os_vinculos_alterados(client, fabrica, session):
+    autores = [fabrica.autor() for _ in range(3)]
+    categorias = [fabrica.categoria() for _ in range(2)]
+    livro = fabrica.livro(
+        autor_ids=[autores[0]['id'], autores[1]['id'], autores[0]['id']],
+        categoria_ids=[categorias[0]['id']],
+    )
+    assert _ids(livro['autores']) == [autores[0]['id'], autores[1]['id']]
+
+    response = client.put(
+        f'/livros/{livro["id"]}',
+        json={
+            'autor_ids': [autores[1]['id'], autores[2]['id']],
+            'categoria_ids': [categorias[1]['id']],
+        },
+    )
+
+    assert response.status_code == HTTPStatus.OK
+    atualizado = client.get(f'/livros/{livro["id"]}').json()
+    assert _ids(atualizado['autores']) == [autores[1]['id'], autores[2]['id']]
+    assert _ids(atualizado['categorias']) == [categorias[1]['id']]
+    assert session.get(Livro, livro['id']).categorias_nomes == [categorias[1]['nome']]
+
+
+def test_atualizacao_com_ids_inexistentes_mantem_os_vinculos(client, fabrica):
+    categoria = fabrica.categoria()
+    livro = fabrica.livro(categoria_ids=[categoria['id']])
+
+    response = client.put(f'/livros/{livro["id"]}', json={'categoria_ids': [999]})
+
+    assert response.status_code == HTTPStatus.BAD_REQUEST
+    assert response.json()['detail'] == 'IDs de categoria não encontrados: 999'
+    atual = client.get(f'/livros/{livro["id"]}').json()
+    assert _ids(atual['categorias']) == [categoria['id']]
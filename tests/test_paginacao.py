@@ -0,0 +1,64 @@
+"""Paginação por cursor (keyset) das buscas e do histórico do usuário."""
+
+from http import HTTPStatus
+
+from models.models import StatusEmprestimo
+
+
+def _percorrer(client, caminho: str, params: dict) -> list:
+    """Segue ``next_cursor`` até o fim e devolve as páginas"""
+    paginas = []
+    params = dict(params)
+    while True:
+        response = client.get(caminho, params=params)
+        assert response.status_code == HTTPStatus.OK, response.text
+        pagina = response.json()
+        paginas.append(pagina)
+        if not pagina['has_more']:
+            return paginas
+        params['cursor'] = pagina['next_cursor']
+
+
+def test_busca_por_cursor_percorre_todos_sem_repetir(client, fabrica):
+    autores = [fabrica.autor(nacionalidade='PT') for _ in range(7)]
+    fabrica.autor(nacionalidade='BR')
+
+    paginas = _percorrer(client, '/autores/search', {'nacionalidade': 'PT', 'limit': 3})
+
+    assert [len(pagina['items']) for pagina in paginas] == [3, 3, 1]
+    assert paginas[-1]['next_cursor'] is None
+    ids = [item['id'] for pagina in paginas for item in pagina['items']]
+    assert sorted(ids) == sorted(autor['id'] for autor in autores)
+
+
+def test_busca_recusa_limite_acima_do_maximo(client):
+    response = client.get('/autores/search', params={'limit': 101})
+
+    assert response.status_code == HTTPStatus.UNPROCESSABLE_ENTITY
+
+
+def test_historico_do_usuario_do_mais_recente_ao_mais_antigo(client, fabrica):
+    usuario = fabrica.usuario()
+    emprestimos = [
+        fabrica.emprestimo(usuario['id'], fabrica.livro()['id']) for _ in range(5)
+    ]
+    client.post(f'/emprestimos/{emprestimos[1]["id"]}/devolver')
+    caminho = f'/usuarios/{usuario["id"]}/emprestimos'
+
+    paginas = _percorrer(client, caminho, {'limit': 2})
+
+    ids = [item['id'] for pagina in paginas for item in pagina['items']]
+    assert ids == [emprestimo['id'] for emprestimo in reversed(emprestimos)]
+
+    paginas = _percorrer(
+        client, caminho, {'limit': 2, 'status': StatusEmprestimo.ATIVO.value}
+    )
+    ids = [item['id'] for pagina in paginas for item in pagina['items']]
+    assert emprestimos[1]['id'] not in ids
+    assert len(ids) == len(emprestimos) - 1
+
+
+def test_historico_de_usuario_inexistente(client):
+    response = client.get('/usuarios/999/emprestimos')
+
+    assert response.status_code == HTTPStatus.NOT_FOUND
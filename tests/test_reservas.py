@@ -0,0 +1,135 @@
+"""Fila de reservas: promoção na devolução, no cancelamento e na expiração."""
+
+from datetime import date, datetime, timedelta
+from http import HTTPStatus
+
+import pytest
+
+from models.models import Emprestimo, Livro, Reserva, StatusEmprestimo, StatusReserva
+from schemas.schemas import EmprestimoUpdate
+from services.emprestimo_service import EmprestimoService
+from services.reserva_service import ReservaService
+
+
+@pytest.fixture
+def fila(client, fabrica):
+    """Livro de um exemplar emprestado, com duas reservas na fila"""
+    livro = fabrica.livro()
+    leitor, primeiro, segundo = fabrica.usuario(), fabrica.usuario(), fabrica.usuario()
+    emprestimo = fabrica.emprestimo(leitor['id'], livro['id'])
+    return {
+        'livro': livro['id'],
+        'emprestimo': emprestimo['id'],
+        'primeira': fabrica.reserva(primeiro['id'], livro['id'])['id'],
+        'segunda': fabrica.reserva(segundo['id'], livro['id'])['id'],
+    }
+
+
+def _status(client, reserva_id: int) -> str:
+    return client.get(f'/reservas/{reserva_id}').json()['status']
+
+
+def _disponivel(client, livro_id: int) -> int:
+    return client.get(f'/livros/{livro_id}').json()['quantidade_disponivel']
+
+
+def _vencer(session, reserva_id: int):
+    session.get(Reserva, reserva_id).expira_em = datetime.now() - timedelta(minutes=1)
+    session.commit()
+
+
+def test_reserva_de_livro_disponivel_e_recusada(client, fabrica):
+    usuario = fabrica.usuario()
+    livro = fabrica.livro()
+
+    response = client.post(
+        '/reservas/', json={'usuario_id': usuario['id'], 'livro_id': livro['id']}
+    )
+
+    assert response.status_code == HTTPStatus.BAD_REQUEST
+
+
+def test_devolucao_separa_o_exemplar_para_o_primeiro_da_fila(client, fila):
+    response = client.post(f'/emprestimos/{fila["emprestimo"]}/devolver')
+    assert response.status_code == HTTPStatus.OK
+
+    assert _status(client, fila['primeira']) == StatusReserva.DISPONIVEL.value
+    assert _status(client, fila['segunda']) == StatusReserva.AGUARDANDO.value
+    assert _disponivel(client, fila['livro']) == 0
+
+
+def test_cancelamento_passa_o_exemplar_para_o_proximo(client, fila):
+    client.post(f'/emprestimos/{fila["emprestimo"]}/devolver')
+
+    response = client.delete(f'/reservas/{fila["primeira"]}')
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.json()['status'] == StatusReserva.CANCELADA.value
+    assert _status(client, fila['segunda']) == StatusReserva.DISPONIVEL.value
+    assert _disponivel(client, fila['livro']) == 0
+
+    response = client.delete(f'/reservas/{fila["segunda"]}')
+    assert response.status_code == HTTPStatus.OK
+    assert _disponivel(client, fila['livro']) == 1
+
+    response = client.delete(f'/reservas/{fila["segunda"]}')
+    assert response.status_code == HTTPStatus.BAD_REQUEST
+
+
+def test_expiracao_passa_o_exemplar_para_o_proximo(client, session, fila):
+    client.post(f'/emprestimos/{fila["emprestimo"]}/devolver')
+    _vencer(session, fila['primeira'])
+
+    ReservaService.expirar_reservas(session, session.get(Livro, fila['livro']))
+    session.commit()
+
+    assert _status(client, fila['primeira']) == StatusReserva.EXPIRADA.value
+    assert _status(client, fila['segunda']) == StatusReserva.DISPONIVEL.value
+    assert _disponivel(client, fila['livro']) == 0
+
+    _vencer(session, fila['segunda'])
+    ReservaService.expirar_reservas(session, session.get(Livro, fila['livro']))
+    session.commit()
+
+    assert _status(client, fila['segunda']) == StatusReserva.EXPIRADA.value
+    assert _disponivel(client, fila['livro']) == 1
+
+
+def test_devolucao_concorrente_libera_o_exemplar_uma_vez(
+    client, fabrica, session, outra_session, ler_antes
+):
+    usuario = fabrica.usuario()
+    livro = fabrica.livro()
+    emprestimo_id = fabrica.emprestimo(usuario['id'], livro['id'])['id']
+    devolucao = EmprestimoUpdate(data_devolucao_real=date.today())
+
+    # Lido como ativo antes da devolução feita por outro balcão
+    emprestimo = ler_antes(Emprestimo, emprestimo_id)
+    assert emprestimo.status == StatusEmprestimo.ATIVO
+    EmprestimoService.update_emprestimo(outra_session, emprestimo_id, devolucao)
+    outra_session.close()
+    EmprestimoService.update_emprestimo(session, emprestimo_id, devolucao)
+
+    assert _disponivel(client, livro['id']) == 1
+
+
+def test_cancelamento_de_reserva_ja_expirada_nao_libera_o_exemplar(
+    client, fila, session, outra_session, ler_antes
+):
+    client.post(f'/emprestimos/{fila["emprestimo"]}/devolver')
+    client.delete(f'/reservas/{fila["segunda"]}')
+    _vencer(session, fila['primeira'])
+
+    # Lida como separada antes de a tarefa de expiração rodar
+    reserva = ler_antes(Reserva, fila['primeira'])
+    assert reserva.status == StatusReserva.DISPONIVEL
+    # Mesmos passos da tarefa de expiração: bloqueia o livro e expira
+    livro = outra_session.get(Livro, fila['livro'], with_for_update=True)
+    ReservaService.expirar_reservas(outra_session, livro)
+    outra_session.commit()
+    outra_session.close()
+
+    with pytest.raises(ValueError, match='Reserva já está expirada'):
+        ReservaService.cancel_reserva(session, fila['primeira'])
+
+    assert _disponivel(client, fila['livro']) == 1